@@ -0,0 +1,43 @@
+import unittest
+
+from Benchmarks import pipeline_benchmark, synthetic
+
+
+class SyntheticPayloadTestCase(unittest.TestCase):
+
+    def test_payload_shape(self):
+        payload = synthetic.repository_payload(runids=3, testpoints=8, captures=5)
+        self.assertEqual(len(payload), 3 * 8 * 5)
+        self.assertEqual(payload["runid"].nunique(), 3)
+        self.assertEqual(payload.groupby(["runid", "waveforms.testpoint"]).size().unique().tolist(), [5])
+        self.assertTrue(set(payload["waveforms.testpoint"]) <= set(synthetic.testpoint_definitions(8)["testpoint"]))
+        # Each runid has a single test category
+        self.assertEqual(payload.groupby("runid")["test_category"].nunique().max(), 1)
+
+
+class PipelineBenchmarkTestCase(unittest.TestCase):
+
+    def test_run_reports_every_stage(self):
+        report = pipeline_benchmark.run(runids=2, testpoints=4, captures=2, repeat=1, pipelines=["overview"])
+        names = [result["name"] for result in report["results"]]
+        for name in ("overview.repository", "overview.WaveformCombinationProcessor", "overview.xlsx",
+                     "overview.end_to_end", "WaveformCombinationProcessor.capture"):
+            self.assertIn(name, names)
+        self.assertEqual(report["results"][0]["rows"], 16)
+
+    def test_compare(self):
+        baseline = {"parameters": {"runids": 1}, "results": [{"name": "a", "seconds": 0.1},
+                                                             {"name": "b", "seconds": 0.1},
+                                                             {"name": "c", "seconds": 0.001}]}
+        current = {"parameters": {"runids": 1}, "results": [{"name": "a", "seconds": 0.2},
+                                                            {"name": "b", "seconds": 0.11},
+                                                            {"name": "c", "seconds": 0.002},
+                                                            {"name": "d", "seconds": 1.0}]}
+        regressions = pipeline_benchmark.compare(baseline, current, tolerance=0.25)
+        self.assertListEqual([regression["name"] for regression in regressions], ["a"])
+        with self.assertRaises(ValueError):
+            pipeline_benchmark.compare(baseline, dict(current, parameters={"runids": 2}))
+
+
+if __name__ == '__main__':
+    unittest.main()
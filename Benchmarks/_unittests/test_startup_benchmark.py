@@ -0,0 +1,19 @@
+import unittest
+
+from Benchmarks.startup_benchmark import TARGETS, probe
+
+
+class StartupTestCase(unittest.TestCase):
+
+    def test_web_app_starts_without_heavy_modules(self):
+        code, env = TARGETS["web"]
+        result = probe(code, env=env)
+        self.assertListEqual(result["heavy_modules"], [])
+
+    def test_preloading_imports_pipelines(self):
+        code, env = TARGETS["web_preloaded"]
+        self.assertIn("pandas", probe(code, env=env)["heavy_modules"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Compare output formatters on a sheets dict shaped like a SequencingDataProcessingPipeline report.
+
+    python -m Benchmarks.formatter_benchmark --rows 200000
+"""
+import argparse
+import json
+import time
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+from ResultFormatting import FORMATTERS, XLSXFormatter, available_formats
+
+
+def report_sheets(rows: int = 200000, seed: int = 0) -> t.Dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    testpoints = np.array([f"TP{index:03d}" for index in range(64)])
+    runids = rng.integers(6000, 7000, size=rows)
+    repository = pd.DataFrame({
+        "runid": runids,
+        "project": "Clara Peak",
+        "test_category": rng.choice(["Main To Aux", "Off to Aux and Main", "Aux To Main"], size=rows),
+        "status.status": "Complete",
+        "waveforms.testpoint": rng.choice(testpoints, size=rows),
+        "waveforms.capture": rng.integers(0, 50, size=rows),
+        "waveforms.max": rng.normal(3.3, 0.05, size=rows),
+        "waveforms.min": rng.normal(0.0, 0.01, size=rows),
+        "waveforms.location": [f"/captures/{runid}/{index}.bin" for index, runid in enumerate(runids)],
+    })
+    sequencing = repository.groupby(["runid", "waveforms.testpoint"], as_index=False)["waveforms.max"].mean()
+    power_on = repository.groupby("waveforms.testpoint", as_index=False)["waveforms.min"].agg(["min", "max"])
+    title = pd.DataFrame({"product": ["Clara Peak"], "runids": [int(repository["runid"].nunique())]})
+    return {"Title": title, "Repository Data": repository, "Sequencing": sequencing, "Power-on Time": power_on}
+
+
+def benchmark(sheets: t.Dict[str, pd.DataFrame], formats: t.Iterable[str], repeat: int = 3) -> t.List[t.Dict]:
+    formatters = [("xlsx (pandas)", XLSXFormatter())] + [(name, FORMATTERS[name]()) for name in formats]
+    results = []
+    for name, formatter in formatters:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = formatter.format_bytesIO(sheets=sheets)
+            timings.append(time.perf_counter() - start)
+        results.append({"format": name, "seconds": min(timings), "bytes": len(output)})
+    baseline = results[0]
+    for result in results:
+        result["speedup"] = baseline["seconds"] / result["seconds"]
+        result["size_ratio"] = result["bytes"] / baseline["bytes"]
+    return results
+
+
+def main(argv: t.Optional[t.List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--formats", nargs="*", default=available_formats())
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = benchmark(report_sheets(rows=args.rows), formats=args.formats, repeat=args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'format':<16}{'seconds':>10}{'MB':>10}{'speedup':>10}{'size':>8}")
+    for result in results:
+        print(f"{result['format']:<16}{result['seconds']:>10.3f}{result['bytes'] / 1e6:>10.2f}"
+              f"{result['speedup']:>9.1f}x{result['size_ratio']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Benchmark the report pipelines stage by stage on synthetic repository data served by a local stub repository.
+
+    python -m Benchmarks.pipeline_benchmark --runids 50 --save baseline.json
+    python -m Benchmarks.pipeline_benchmark --runids 50 --compare baseline.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import typing as t
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from Benchmarks.synthetic import repository_payload, stub_repository
+from config import Config
+from Processing import DataProcessingPipeline
+from Processing.dataprocessor_usecase import REPOSITORY_INPUT
+from Processing.pandas_options import configure_copy_on_write
+from Processing.RepoProcessors.stub_repository import StubRepositoryServer
+from Processing.TestDataPipelines import OverviewDataProcessingPipeline, SequencingDataProcessingPipeline
+from Processing.TestDataProcessors.waveform_combination import GROUPINGS, WaveformCombinationProcessor
+from ResultFormatting import XLSXFormatter
+
+PIPELINES = {
+    "sequencing": SequencingDataProcessingPipeline,
+    "overview": OverviewDataProcessingPipeline,
+}
+
+
+def measure(name: str, function: t.Callable[[], t.Any], repeat: int = 3,
+            rows: t.Optional[int] = None) -> t.Tuple[t.Dict, t.Any]:
+    """
+    Best and median wall time of `repeat` calls, plus throughput when the number of input rows is known.
+    Returns the measurement and the result of the last call.
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    measurement = {"name": name, "seconds": min(timings), "median_seconds": statistics.median(timings)}
+    if rows is not None:
+        set_rows(measurement, rows)
+    return measurement, result
+
+
+def set_rows(measurement: t.Dict, rows: int):
+    measurement["rows"] = rows
+    measurement["rows_per_second"] = rows / measurement["seconds"] if measurement["seconds"] else None
+
+
+@contextmanager
+def repository_url(host_url: str, shard_size: int = 0) -> t.Iterator[None]:
+    # Repository processors read their URL and shard size from the config when they are created
+    previous = Config.REPOSITORY_URL, Config.REPOSITORY_SHARD_SIZE
+    Config.REPOSITORY_URL, Config.REPOSITORY_SHARD_SIZE = host_url, shard_size
+    try:
+        yield
+    finally:
+        Config.REPOSITORY_URL, Config.REPOSITORY_SHARD_SIZE = previous
+
+
+def pipeline_stages(name: str, pipeline: DataProcessingPipeline, json_request: t.Dict,
+                    repeat: int = 3) -> t.List[t.Dict]:
+    """
+    Time every stage of a sequential run: the repository query, dtype normalisation, each processor and the
+    XLSX workbook.  Then time the pipeline as configured (e.g. parallel) end to end, workbook included.
+    """
+    results = []
+    repository_processor = pipeline.processors[0]
+    result, response = measure(f"{name}.repository", lambda: repository_processor.execute(json_request=json_request),
+                               repeat=repeat)
+    if not response:
+        raise RuntimeError(f"{name} repository query failed: {response.message}")
+    dataframe = response.dataframe
+    set_rows(result, len(dataframe))
+    results.append(result)
+
+    if pipeline.normalizer is not None:
+        result, dataframe = measure(f"{name}.normalize", lambda: pipeline.normalizer.normalize(dataframe),
+                                    repeat=repeat, rows=len(dataframe))
+        results.append(result)
+
+    sheets = {}
+    dataframes = {REPOSITORY_INPUT: dataframe}
+    for processor in pipeline.processors[1:]:
+        processor_input = dataframes.get(processor.input_name)
+        result, response = measure(f"{name}.{type(processor).__name__}",
+                                   lambda: processor.execute(processor.isolated_input(processor_input)),
+                                   repeat=repeat, rows=len(processor_input))
+        results.append(result)
+        if response:
+            dataframes[response.title] = response.dataframe
+            sheets[response.title] = response.dataframe
+
+    formatter = XLSXFormatter()
+    result, workbook = measure(f"{name}.xlsx", lambda: formatter.format_bytesIO(sheets=sheets), repeat=repeat,
+                               rows=sum(len(sheet) for sheet in sheets.values()))
+    result["bytes"] = len(workbook)
+    results.append(result)
+
+    result, _ = measure(f"{name}.end_to_end",
+                        lambda: formatter.format_bytesIO(sheets=pipeline.process_data(json_request=json_request)),
+                        repeat=repeat, rows=len(dataframe))
+    results.append(result)
+    return results
+
+
+def combination_benchmark(dataframe: pd.DataFrame, repeat: int = 3) -> t.List[t.Dict]:
+    results = []
+    for group_by in GROUPINGS:
+        processor = WaveformCombinationProcessor(group_by=group_by)
+        result, _ = measure(f"WaveformCombinationProcessor.{group_by}", lambda: processor.combine(dataframe),
+                            repeat=repeat, rows=len(dataframe))
+        results.append(result)
+    return results
+
+
+def _revision() -> t.Optional[str]:
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def environment() -> t.Dict:
+    return {"revision": _revision(), "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "pandas": pd.__version__, "numpy": np.__version__}
+
+
+def run(runids: int = 20, testpoints: int = 64, captures: int = 10, repeat: int = 3,
+        pipelines: t.Iterable[str] = tuple(PIPELINES), columnar: bool = True, seed: int = 0,
+        shard_size: int = 0) -> t.Dict:
+    parameters = {"runids": runids, "testpoints": testpoints, "captures": captures, "repeat": repeat,
+                  "columnar": columnar, "seed": seed, "shard_size": shard_size}
+    payload = repository_payload(runids=runids, testpoints=testpoints, captures=captures, seed=seed)
+    json_request = {"product": payload["project"].iat[0], "runid_status": ["Complete"],
+                    "runid_list": payload["runid"].unique().tolist()}
+
+    configure_copy_on_write()
+    results = []
+    with StubRepositoryServer(stub_repository(payload, columnar=columnar)) as server, \
+            repository_url(server.host_url, shard_size=shard_size):
+        for name in pipelines:
+            results.extend(pipeline_stages(name, PIPELINES[name](), json_request=json_request, repeat=repeat))
+    normalizer = DataProcessingPipeline().normalizer
+    combination_input = normalizer.normalize(payload) if normalizer is not None else payload
+    results.extend(combination_benchmark(combination_input, repeat=repeat))
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": environment(), "parameters": parameters,
+            "results": results}
+
+
+def compare(baseline: t.Dict, current: t.Dict, tolerance: float = 0.25,
+            min_seconds: float = 0.005) -> t.List[t.Dict]:
+    """
+    Benchmarks that got more than `tolerance` (relative) and `min_seconds` slower than in `baseline`.  Both
+    reports must have been run with the same parameters.
+    """
+    if baseline["parameters"] != current["parameters"]:
+        raise ValueError(f"Benchmarks ran with different parameters: {baseline['parameters']} and "
+                         f"{current['parameters']}")
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result["name"])
+        if before is None or not before["seconds"]:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        if ratio > 1 + tolerance and result["seconds"] - before["seconds"] > min_seconds:
+            regressions.append({"name": result["name"], "baseline_seconds": before["seconds"],
+                                "seconds": result["seconds"], "ratio": ratio})
+    return regressions
+
+
+def save(report: t.Dict, path: str):
+    with open(path, "w") as handle:
+        json.dump(report, handle, indent=2)
+
+
+def load(path: str) -> t.Dict:
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runids", type=int, default=20)
+    parser.add_argument("--testpoints", type=int, default=64)
+    parser.add_argument("--captures", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pipelines", nargs="*", choices=list(PIPELINES), default=list(PIPELINES))
+    parser.add_argument("--json-transport", action="store_true", help="serve JSON instead of Arrow/Parquet")
+    parser.add_argument("--shard-size", type=int, default=0, help="runids per concurrent repository query")
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="baseline results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+    # Pipelines log every step at DEBUG and the stub server every request
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    report = run(runids=args.runids, testpoints=args.testpoints, captures=args.captures, repeat=args.repeat,
+                 pipelines=args.pipelines, columnar=not args.json_transport, shard_size=args.shard_size)
+    if args.save:
+        save(report, args.save)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'benchmark':<48}{'seconds':>10}{'median':>10}{'rows/s':>14}")
+        for result in report["results"]:
+            throughput = result.get("rows_per_second")
+            print(f"{result['name']:<48}{result['seconds']:>10.4f}{result['median_seconds']:>10.4f}"
+                  f"{throughput if throughput is not None else float('nan'):>14,.0f}")
+
+    if args.compare:
+        regressions = compare(load(args.compare), report, tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']}: {regression['baseline_seconds']:.4f}s -> "
+                  f"{regression['seconds']:.4f}s ({regression['ratio']:.2f}x)", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
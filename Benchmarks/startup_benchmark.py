@@ -0,0 +1,101 @@
+"""
+Measure process startup: import time, peak RSS and the heavy modules loaded when a web or worker process boots.
+
+    python -m Benchmarks.startup_benchmark --repeat 5 --save startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import typing as t
+
+from Benchmarks.pipeline_benchmark import compare, environment, load, save
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "scipy", "matplotlib", "pymongo", "openpyxl", "xlsxwriter",
+                 "requests", "celery")
+
+# Code each target runs in a fresh interpreter, and extra environment variables
+TARGETS: t.Dict[str, t.Tuple[str, t.Dict[str, str]]] = {
+    "web": ("from WebApp import create_app; create_app()", {}),
+    "web_preloaded": ("from WebApp import create_app; create_app()", {"PRELOAD_MODULES": "true"}),
+    "worker": ("import celery_worker, WebApp.tasks", {}),
+}
+
+# ru_maxrss survives exec on Linux (it would report this process' peak), so VmHWM is preferred where available
+_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+exec({code!r})
+seconds = time.perf_counter() - start
+try:
+    with open("/proc/self/status") as status:
+        max_rss_kb = next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+except (OSError, StopIteration):
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": seconds, "max_rss_kb": max_rss_kb, "modules": len(sys.modules),
+                  "heavy_modules": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def probe(code: str, env: t.Optional[t.Dict[str, str]] = None) -> t.Dict:
+    """
+    Run `code` in a new interpreter and return its import time, peak RSS and loaded modules.
+    """
+    process_env = dict(os.environ, **(env or {}))
+    process_env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, process_env.get("PYTHONPATH")]))
+    output = subprocess.run([sys.executable, "-c", _PROBE.format(code=code, heavy=HEAVY_MODULES)], cwd=ROOT,
+                            env=process_env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def benchmark(targets: t.Iterable[str] = tuple(TARGETS), repeat: int = 5) -> t.List[t.Dict]:
+    results = []
+    for name in targets:
+        code, env = TARGETS[name]
+        probes = [probe(code, env=env) for _ in range(repeat)]
+        results.append({"name": f"startup.{name}",
+                        "seconds": min(result["seconds"] for result in probes),
+                        "median_seconds": statistics.median(result["seconds"] for result in probes),
+                        "max_rss_mb": statistics.median(result["max_rss_kb"] for result in probes) / 1024,
+                        "modules": probes[-1]["modules"],
+                        "heavy_modules": probes[-1]["heavy_modules"]})
+    return results
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--targets", nargs="*", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="baseline results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    report = {"environment": environment(), "parameters": {"targets": args.targets, "repeat": args.repeat},
+              "results": benchmark(targets=args.targets, repeat=args.repeat)}
+    if args.save:
+        save(report, args.save)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'target':<24}{'seconds':>10}{'RSS MB':>10}{'modules':>10}  heavy modules")
+        for result in report["results"]:
+            print(f"{result['name']:<24}{result['seconds']:>10.3f}{result['max_rss_mb']:>10.1f}"
+                  f"{result['modules']:>10}  {', '.join(result['heavy_modules']) or '-'}")
+
+    if args.compare:
+        regressions = compare(load(args.compare), report, tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']}: {regression['baseline_seconds']:.3f}s -> "
+                  f"{regression['seconds']:.3f}s ({regression['ratio']:.2f}x)", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Synthetic repository payloads for offline benchmarks, shaped like the repository's data-processing responses.
+"""
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+from Processing.RepoProcessors.stub_repository import StubRepository
+
+PRODUCT = "Clara Peak"
+TEST_CATEGORIES = ("Main To Aux", "Off to Aux and Main", "Aux To Main")
+RAILS = (("12V_EXT", 12.0), ("V5P0", 5.0), ("V3P3", 3.3), ("V1P8", 1.8), ("V1P2", 1.2), ("V0P9", 0.9))
+
+# Repository routes used by the pipelines
+SEQUENCING_ROUTE = "sequencing_processor"
+WAVEFORM_ROUTE = "waveform_processor"
+TESTPOINT_ROUTE = "testpoint_definitions_processor"
+
+
+def testpoint_definitions(testpoints: int = 64, product: str = PRODUCT) -> pd.DataFrame:
+    names, nominal = [], []
+    for index in range(testpoints):
+        rail, value = RAILS[index % len(RAILS)]
+        names.append(rail if index < len(RAILS) else f"{rail}_{index // len(RAILS)}")
+        nominal.append(value)
+    nominal = np.array(nominal)
+    return pd.DataFrame({"product": product, "testpoint": names, "nominal_value": nominal,
+                         "spec_min": nominal * 0.95, "spec_max": nominal * 1.05})
+
+
+def repository_payload(runids: int = 20, testpoints: int = 64, captures: int = 10, first_runid: int = 6000,
+                       seed: int = 0, product: str = PRODUCT) -> pd.DataFrame:
+    """
+    One row per (runid, testpoint, capture), as the waveform and sequencing routes return them: every runid is
+    Complete, has one test category, and each capture of a testpoint settles around the rail's nominal value.
+    """
+    rng = np.random.default_rng(seed)
+    definitions = testpoint_definitions(testpoints=testpoints, product=product)
+    rows = runids * testpoints * captures
+
+    runid = np.repeat(np.arange(first_runid, first_runid + runids), testpoints * captures)
+    testpoint_index = np.tile(np.repeat(np.arange(testpoints), captures), runids)
+    capture = np.tile(np.arange(captures), runids * testpoints)
+    nominal = definitions["nominal_value"].to_numpy()[testpoint_index]
+    category = np.array(TEST_CATEGORIES)[rng.integers(0, len(TEST_CATEGORIES), size=runids)]
+    channel = np.array([f"CH{index % 8 + 1}" for index in range(testpoints)])
+
+    maximum = nominal * (1 + rng.normal(0.01, 0.005, size=rows))
+    minimum = nominal * rng.normal(0.0, 0.002, size=rows)
+    # A few captures failed to trigger and have no measurements
+    missing = rng.random(rows) < 0.001
+    maximum[missing] = np.nan
+    minimum[missing] = np.nan
+
+    return pd.DataFrame({
+        "runid": runid,
+        "project": product,
+        "test_category": np.repeat(category, testpoints * captures),
+        "status.status": "Complete",
+        "waveforms.runid": runid,
+        "waveforms.testpoint": definitions["testpoint"].to_numpy()[testpoint_index],
+        "waveforms.test_category": np.repeat(category, testpoints * captures),
+        "waveforms.capture": capture,
+        "waveforms.scope_channel": channel[testpoint_index],
+        "waveforms.units": "V",
+        "waveforms.max": maximum,
+        "waveforms.min": minimum,
+        "waveforms.steady_state_mean": np.where(missing, np.nan, nominal * (1 + rng.normal(0, 0.001, size=rows))),
+        "waveforms.location": [f"/captures/{r}/{t}/{c}.bin" for r, t, c in zip(runid, testpoint_index, capture)],
+    })
+
+
+def stub_repository(payload: pd.DataFrame, testpoints: t.Optional[pd.DataFrame] = None,
+                    columnar: bool = True) -> StubRepository:
+    """
+    StubRepository serving `payload` on the sequencing and waveform routes, filtered by each request.
+    """
+    if testpoints is None:
+        testpoints = testpoint_definitions(testpoints=payload["waveforms.testpoint"].nunique())
+    return StubRepository({SEQUENCING_ROUTE: payload, WAVEFORM_ROUTE: payload, TESTPOINT_ROUTE: testpoints},
+                          columnar=columnar)
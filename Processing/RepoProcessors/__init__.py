@@ -1 +1,13 @@
-from .repository_processor import RepositoryProcessor, SequencingRepositoryProcessor, WaveformRepositoryProcessor, TestPointProcessor
+from lazy_imports import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "RepositoryProcessor": ".repository_processor",
+    "SequencingRepositoryProcessor": ".repository_processor",
+    "WaveformRepositoryProcessor": ".repository_processor",
+    "TestPointProcessor": ".repository_processor",
+    "RepositoryClient": ".repository_client",
+    "AsyncRepositoryClient": ".async_repository_client",
+    "ShardedFetcher": ".sharded_fetch",
+    "ShardedFetchFailure": ".sharded_fetch",
+    "StreamingResultDecoder": ".streaming_decoder",
+})
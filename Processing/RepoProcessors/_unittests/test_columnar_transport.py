@@ -0,0 +1,68 @@
+import unittest
+
+import pandas as pd
+
+from Processing.RepoProcessors import RepositoryClient, SequencingRepositoryProcessor, columnar_transport
+from Processing.RepoProcessors.stub_repository import StubRepository, StubRepositoryServer
+
+
+def repository_dataframe() -> pd.DataFrame:
+    return pd.DataFrame({
+        "runid": [6799, 6799, 6800, 6801],
+        "project": ["Clara Peak"] * 4,
+        "test_category": ["Main To Aux", "Main To Aux", "Main To Aux", "Aux To Main"],
+        "waveforms.testpoint": ["V3P3", "V5P0", "V3P3", "V5P0"],
+        "waveforms.max": [3.31, 5.02, 3.30, 5.01],
+        "waveforms.min": [0.0, 0.01, 0.0, 0.02],
+    })
+
+
+@unittest.skipUnless(columnar_transport.columnar_available(), "pyarrow is not installed")
+class ColumnarTransportTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dataframe = repository_dataframe()
+        self.client = RepositoryClient(retries=0)
+
+    def tearDown(self) -> None:
+        self.client.close()
+
+    def _execute(self, columnar_server: bool, columnar_client: bool) -> pd.DataFrame:
+        repository = StubRepository({"sequencing_processor": self.dataframe}, columnar=columnar_server)
+        with StubRepositoryServer(repository) as server:
+            processor = SequencingRepositoryProcessor()
+            processor.url = server.url_for("sequencing_processor")
+            processor._client = self.client
+            processor.columnar = columnar_client
+            response = processor.execute(json_request={"product": "Clara Peak", "runid_list": [6799, 6800],
+                                                       "test_category_list": ["Main To Aux"]})
+        self.assertTrue(response)
+        return response.dataframe
+
+    def test_arrow_and_json_paths_agree(self):
+        arrow = self._execute(columnar_server=True, columnar_client=True)
+        json = self._execute(columnar_server=False, columnar_client=True)
+        expected = self.dataframe.iloc[:3].reset_index(drop=True)
+        pd.testing.assert_frame_equal(arrow, expected)
+        pd.testing.assert_frame_equal(json, expected)
+
+    def test_client_can_disable_columnar(self):
+        dataframe = self._execute(columnar_server=True, columnar_client=False)
+        self.assertEqual(dataframe.shape, (3, 6))
+
+    def test_negotiate(self):
+        self.assertEqual(columnar_transport.negotiate(columnar_transport.accept_header()),
+                         columnar_transport.ARROW_STREAM_MIMETYPE)
+        self.assertEqual(columnar_transport.negotiate("application/vnd.apache.parquet, application/json;q=0.1"),
+                         columnar_transport.PARQUET_MIMETYPE)
+        self.assertEqual(columnar_transport.negotiate("text/html"), columnar_transport.JSON_MIMETYPE)
+
+    def test_parquet_struct_columns_are_flattened(self):
+        import pyarrow as pa
+        table = pa.table({"runid": [1], "waveforms": pa.array([{"testpoint": "V3P3", "max": 3.3}])})
+        dataframe = columnar_transport.table_to_dataframe(table)
+        self.assertCountEqual(dataframe.columns.tolist(), ["runid", "waveforms.testpoint", "waveforms.max"])
+
+
+if __name__ == '__main__':
+    unittest.main()
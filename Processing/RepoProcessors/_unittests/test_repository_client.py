@@ -0,0 +1,100 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Processing.RepoProcessors import RepositoryClient, RepositoryProcessor
+
+
+class RepositoryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures_remaining = 0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if RepositoryHandler.failures_remaining > 0:
+            RepositoryHandler.failures_remaining -= 1
+            status, body = 503, b"{}"
+        else:
+            status, body = 200, json.dumps({"result": [{"runid": 1, "waveforms": {"testpoint": "V3P3"}}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RepositoryClientTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), RepositoryHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/api/test"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        RepositoryHandler.failures_remaining = 0
+        self.client = RepositoryClient(pool_size=2, retries=2, backoff_factor=0)
+
+    def tearDown(self) -> None:
+        self.client.close()
+
+    def test_connections_are_reused(self):
+        for _ in range(5):
+            response = self.client.post(self.url, json_request={"product": "Clara Peak"})
+            self.assertEqual(response.status_code, 200)
+        metrics = self.client.metrics()
+        self.assertEqual(metrics["requests"], 5)
+        self.assertEqual(metrics["connections_opened"], 1)
+        self.assertEqual(metrics["connections_reused"], 4)
+
+    def test_metrics_are_thread_safe(self):
+        threads = [threading.Thread(target=lambda: [self.client.post(self.url, json_request={}).close()
+                                                    for _ in range(10)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.client.metrics()["requests"], 40)
+
+    def test_retries_unavailable_repository(self):
+        RepositoryHandler.failures_remaining = 2
+        response = self.client.post(self.url, json_request={})
+        self.assertEqual(response.status_code, 200)
+
+    def test_sharded_queries_are_sent_once(self):
+        RepositoryHandler.failures_remaining = 1
+        response = self.client.post(self.url, json_request={}, retry=False)
+        self.assertEqual(response.status_code, 503)
+
+        # Shards are only retried by the fetcher, so without shard retries an unavailable shard fails
+        RepositoryHandler.failures_remaining = 1
+        processor = RepositoryProcessor(url=self.url, client=self.client, shard_size=1)
+        processor.shard_concurrency = 1
+        processor.shard_retries = 0
+        response = processor.execute(json_request={"runid_list": [1, 2]})
+        self.assertFalse(response)
+        self.assertIn("status code 503", response.message)
+
+    def test_processor_uses_client(self):
+        processor = RepositoryProcessor(url=self.url, client=self.client)
+        response = processor.execute(json_request={})
+        self.assertTrue(response)
+        self.assertListEqual(response.dataframe.columns.tolist(), ["runid", "waveforms.testpoint"])
+
+    def test_shared_client_is_per_process(self):
+        self.assertIs(RepositoryClient.shared(), RepositoryClient.shared())
+
+
+if __name__ == '__main__':
+    unittest.main()
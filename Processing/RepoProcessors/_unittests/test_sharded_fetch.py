@@ -0,0 +1,128 @@
+import threading
+import unittest
+
+import pandas as pd
+import requests
+
+from Processing.processing_responses import RepositoryResponseFailure
+from Processing.RepoProcessors import RepositoryClient, RepositoryProcessor, ShardedFetchFailure
+from Processing.RepoProcessors.sharded_fetch import ShardedFetcher, shard_requests
+from Processing.RepoProcessors.stub_repository import StubRepository, StubRepositoryServer
+from Processing.request_batching import filter_repository_dataframe
+
+
+def repository_dataframe() -> pd.DataFrame:
+    rows = []
+    for runid in range(6000, 6010):
+        for testpoint in ("V3P3", "V5P0", "V1P8"):
+            rows.append({"runid": runid, "project": "Clara Peak", "test_category": "Aux To Main",
+                         "waveforms.testpoint": testpoint, "waveforms.max": runid / 1000})
+    return pd.DataFrame(rows)
+
+
+class ShardedFetchTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.dataframe = repository_dataframe()
+        cls.repository = StubRepository({"waveform_processor": cls.dataframe, "flaky": cls.flaky_route})
+        cls.server = StubRepositoryServer(cls.repository).start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.stop()
+
+    # Runids whose queries fail, and how many more times they fail
+    failing = {}
+    failing_lock = threading.Lock()
+
+    @classmethod
+    def flaky_route(cls, json_request):
+        with cls.failing_lock:
+            for runid in json_request["runid_list"]:
+                if cls.failing.get(runid, 0) > 0:
+                    cls.failing[runid] -= 1
+                    raise RuntimeError(f"runid {runid} is unavailable")
+        return filter_repository_dataframe(cls.dataframe, json_request)
+
+    def setUp(self) -> None:
+        ShardedFetchTestCase.failing = {}
+        self.repository.requests.clear()
+        self.client = RepositoryClient(pool_size=4, backoff_factor=0)
+        self.request = {"product": "Clara Peak", "runid_status": ["Complete"], "runid_list": list(range(6000, 6010))}
+
+    def tearDown(self) -> None:
+        self.client.close()
+
+    def processor(self, route: str = "waveform_processor", shard_size: int = 3) -> RepositoryProcessor:
+        processor = RepositoryProcessor(url=self.server.url_for(route), client=self.client, shard_size=shard_size)
+        processor.shard_concurrency = 3
+        return processor
+
+    def test_shard_requests(self):
+        shards = shard_requests(self.request, shard_size=4)
+        self.assertListEqual([shard["runid_list"] for shard in shards],
+                             [[6000, 6001, 6002, 6003], [6004, 6005, 6006, 6007], [6008, 6009]])
+        self.assertTrue(all(shard["product"] == "Clara Peak" for shard in shards))
+        categories = {"product": "Clara Peak", "test_category_list": ["A", "B", "C"]}
+        self.assertEqual(len(shard_requests(categories, shard_size=2)), 2)
+        self.assertListEqual(shard_requests(self.request, shard_size=10), [self.request])
+        self.assertListEqual(shard_requests(self.request, shard_size=0), [self.request])
+
+    def test_sharded_fetch_matches_single_query(self):
+        sharded = self.processor().execute(json_request=self.request)
+        self.assertEqual(len(self.repository.requests), 4)
+        single = self.processor(shard_size=0).execute(json_request=self.request)
+        pd.testing.assert_frame_equal(sharded.dataframe, single.dataframe)
+        self.assertListEqual(sharded.shard_failures, [])
+
+    def test_failed_shards_are_retried(self):
+        ShardedFetchTestCase.failing = {6004: 1}
+        response = self.processor(route="flaky").execute(json_request=self.request)
+        self.assertTrue(response)
+        self.assertEqual(len(self.repository.requests), 5)
+        pd.testing.assert_frame_equal(response.dataframe, self.dataframe)
+
+    def test_client_errors_are_not_retried(self):
+        processor = self.processor(route="missing")
+        processor.shard_retries = 2
+        response = processor.execute(json_request=self.request)
+        self.assertIsInstance(response, ShardedFetchFailure)
+        self.assertListEqual([failure.attempts for failure in response.failures], [1] * 4)
+        self.assertIn("status code 404", response.message)
+
+    def test_connection_errors_are_retried(self):
+        attempts = []
+
+        def query(json_request):
+            attempts.append(json_request["runid_list"])
+            if len(attempts) == 1:
+                raise requests.ConnectionError("connection refused")
+            return RepositoryResponseFailure(message="Repository returned status code 503", status_code=503)
+
+        fetcher = ShardedFetcher(query=query, shard_size=0, retries=2, backoff_seconds=0)
+        failure = fetcher._fetch_shard(0, self.request)
+        self.assertEqual(failure.attempts, 3)
+        fetcher.query = lambda json_request: RepositoryResponseFailure(message="bad request", status_code=400)
+        self.assertEqual(fetcher._fetch_shard(0, self.request).attempts, 1)
+
+    def test_failures_are_reported_per_shard(self):
+        ShardedFetchTestCase.failing = {6004: 5, 6009: 5}
+        processor = self.processor(route="flaky")
+        processor.shard_retries = 0
+        response = processor.execute(json_request=self.request)
+        self.assertIsInstance(response, ShardedFetchFailure)
+        self.assertListEqual([failure.shard for failure in response.failures], [1, 3])
+        self.assertListEqual([failure.json_request["runid_list"] for failure in response.failures],
+                             [[6003, 6004, 6005], [6009]])
+        self.assertIn("2 of 4 repository shards failed", response.message)
+
+        processor.allow_partial_shards = True
+        partial = processor.execute(json_request=self.request)
+        self.assertTrue(partial)
+        self.assertListEqual(sorted(partial.dataframe["runid"].unique()), [6000, 6001, 6002, 6006, 6007, 6008])
+        self.assertListEqual([failure.shard for failure in partial.shard_failures], [1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import unittest
+
+import pandas as pd
+
+from Processing.RepoProcessors.streaming_decoder import StreamingResultDecoder
+
+
+def repository_payload(rows: int = 25):
+    records = []
+    for i in range(rows):
+        record = {"runid": 6790 + i // 10, "project": "Clara Peak", "test_category": "Main To Aux",
+                  "status": {"status": "Complete"},
+                  "waveforms": {"testpoint": f"V{i % 3}P3", "capture": i, "max": 3.3 + i, "min": -0.01 * i,
+                                "location": f"/captures/µ{i}.bin"}}
+        if i % 4 == 0:
+            record["waveforms"]["steady_state_mean"] = 3.29
+        records.append(record)
+    return {"status": "ok", "result": records}
+
+
+class StreamingResultDecoderTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.payload = repository_payload()
+        self.body = json.dumps(self.payload).encode("utf-8")
+        self.expected = pd.json_normalize(self.payload["result"])
+
+    def _chunks(self, size: int):
+        return (self.body[i:i + size] for i in range(0, len(self.body), size))
+
+    def test_matches_json_normalize(self):
+        for chunk_size in (1, 7, 64, len(self.body)):
+            with self.subTest(chunk_size=chunk_size):
+                dataframe = StreamingResultDecoder.decode_stream(self._chunks(chunk_size), chunk_rows=4)
+                pd.testing.assert_frame_equal(dataframe, self.expected)
+
+    def test_decode_text(self):
+        dataframe = StreamingResultDecoder.decode_text(self.body.decode("utf-8"), chunk_size=13)
+        pd.testing.assert_frame_equal(dataframe, self.expected)
+
+    def test_empty_result(self):
+        dataframe = StreamingResultDecoder.decode_stream([b'{"result": []}'])
+        self.assertTrue(dataframe.empty)
+
+    def test_missing_result(self):
+        with self.assertRaises(ValueError):
+            StreamingResultDecoder.decode_stream([b'{"error": "bad request"}'])
+
+    def test_truncated_result(self):
+        with self.assertRaises(ValueError):
+            StreamingResultDecoder.decode_stream([self.body[:-40]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+import time
+import typing as t
+import weakref
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is optional, requests then run on the pooled synchronous client in a thread
+    aiohttp = None
+
+import requests
+
+from config import Config
+from Processing.RepoProcessors.repository_client import RepositoryClient
+
+RETRY_STATUSES = (502, 503, 504)
+
+# Errors a failed request raises, with or without aiohttp
+CLIENT_ERRORS: t.Tuple[t.Type[BaseException], ...] = (requests.RequestException, asyncio.TimeoutError)
+# Errors of a request that got no response at all, which are worth retrying
+CONNECTION_ERRORS: t.Tuple[t.Type[BaseException], ...] = (requests.ConnectionError, requests.Timeout,
+                                                          asyncio.TimeoutError)
+if aiohttp is not None:
+    CLIENT_ERRORS += (aiohttp.ClientError,)
+    CONNECTION_ERRORS += (aiohttp.ClientConnectionError,)
+
+
+class AsyncRepositoryResponse(t.NamedTuple):
+    status_code: int
+    headers: t.Mapping[str, str]
+    content: bytes
+
+
+class AsyncRepositoryClient:
+    """
+    Connection-pooled asyncio HTTP client for the repository, the counterpart of RepositoryClient.  With aiohttp
+    installed, requests share one aiohttp session per event loop and retry connection errors and 502/503/504
+    with exponential backoff, like the synchronous client's retry policy; `retry=False` sends a request once.
+    Without aiohttp, each request runs on the shared synchronous client in a worker thread, so the event loop is
+    still never blocked.
+    """
+    _clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncRepositoryClient]" = \
+        weakref.WeakKeyDictionary()
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 5, read_timeout: float = 300,
+                 retries: int = 3, backoff_factor: float = 0.5):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._session: t.Optional["aiohttp.ClientSession"] = None
+        self.request_count = 0
+        self.failure_count = 0
+        self.request_seconds = 0.0
+
+    @classmethod
+    def log(cls):
+        logging_handler = logging.getLogger(cls.__name__)
+        return logging_handler
+
+    @staticmethod
+    def available() -> bool:
+        return aiohttp is not None
+
+    @classmethod
+    def from_config(cls, config=Config) -> "AsyncRepositoryClient":
+        return cls(pool_size=config.REPOSITORY_POOL_SIZE,
+                   connect_timeout=config.REPOSITORY_CONNECT_TIMEOUT,
+                   read_timeout=config.REPOSITORY_READ_TIMEOUT,
+                   retries=config.REPOSITORY_RETRIES,
+                   backoff_factor=config.REPOSITORY_BACKOFF_FACTOR)
+
+    @classmethod
+    def shared(cls) -> "AsyncRepositoryClient":
+        # aiohttp sessions are bound to the event loop they were created on
+        loop = asyncio.get_running_loop()
+        client = cls._clients.get(loop)
+        if client is None:
+            client = cls._clients[loop] = cls.from_config()
+        return client
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout),
+                headers={"Content-Type": "application/json"})
+        return self._session
+
+    async def post(self, url: str, json_request: t.Dict, headers: t.Optional[t.Dict] = None,
+                   retry: bool = True) -> AsyncRepositoryResponse:
+        start = time.perf_counter()
+        try:
+            if aiohttp is None:
+                return await asyncio.to_thread(self._post_blocking, url, json_request, headers, retry)
+            return await self._post(url, json_request=json_request, headers=headers,
+                                    retries=self.retries if retry else 0)
+        except Exception:
+            self.failure_count += 1
+            raise
+        finally:
+            self.request_count += 1
+            self.request_seconds += time.perf_counter() - start
+
+    async def _post(self, url: str, json_request: t.Dict, headers: t.Optional[t.Dict],
+                    retries: int) -> AsyncRepositoryResponse:
+        data = json.dumps(json_request)
+        attempt = 0
+        while True:
+            try:
+                async with self._get_session().post(url, data=data, headers=headers) as response:
+                    if response.status not in RETRY_STATUSES or attempt >= retries:
+                        return AsyncRepositoryResponse(status_code=response.status, headers=response.headers,
+                                                       content=await response.read())
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= retries:
+                    raise
+            attempt += 1
+            await asyncio.sleep(self.backoff_factor * 2 ** (attempt - 1))
+
+    @staticmethod
+    def _post_blocking(url: str, json_request: t.Dict, headers: t.Optional[t.Dict],
+                       retry: bool = True) -> AsyncRepositoryResponse:
+        with RepositoryClient.shared().post(url, json_request=json_request, headers=headers,
+                                            retry=retry) as response:
+            return AsyncRepositoryResponse(status_code=response.status_code, headers=response.headers,
+                                           content=response.content)
+
+    def metrics(self) -> t.Dict[str, t.Union[int, float]]:
+        return {
+            "requests": self.request_count,
+            "failures": self.failure_count,
+            "request_seconds": round(self.request_seconds, 6),
+        }
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
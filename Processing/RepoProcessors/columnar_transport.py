@@ -0,0 +1,98 @@
+import typing as t
+from io import BytesIO
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, responses fall back to JSON
+    pa = None
+    pq = None
+
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+JSON_MIMETYPE = "application/json"
+
+COLUMNAR_MIMETYPES = (ARROW_STREAM_MIMETYPE, PARQUET_MIMETYPE)
+
+
+def columnar_available() -> bool:
+    return pa is not None
+
+
+def accept_header(columnar: bool = True) -> str:
+    """
+    Accept header sent to the repository, preferring columnar formats when pyarrow is installed.
+    """
+    if columnar and columnar_available():
+        return f"{ARROW_STREAM_MIMETYPE}, {PARQUET_MIMETYPE};q=0.9, {JSON_MIMETYPE};q=0.5"
+    return JSON_MIMETYPE
+
+
+def content_mimetype(content_type: t.Optional[str]) -> str:
+    if not content_type:
+        return JSON_MIMETYPE
+    return content_type.split(";")[0].strip().lower()
+
+
+def negotiate(accept: t.Optional[str]) -> str:
+    """
+    Pick the response format for an Accept header (server side, used by the stub repository).
+    """
+    if not accept or not columnar_available():
+        return JSON_MIMETYPE
+    offered = []
+    for position, item in enumerate(accept.split(",")):
+        parts = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        offered.append((-quality, position, parts[0].lower()))
+    for _, _, mimetype in sorted(offered):
+        if mimetype in COLUMNAR_MIMETYPES or mimetype == JSON_MIMETYPE:
+            return mimetype
+    return JSON_MIMETYPE
+
+
+def _flatten_structs(table: "pa.Table") -> "pa.Table":
+    # Nested struct columns (e.g. waveforms) become dotted columns, matching pd.json_normalize
+    while any(pa.types.is_struct(field.type) for field in table.schema):
+        table = table.flatten()
+    return table
+
+
+def table_to_dataframe(table: "pa.Table") -> pd.DataFrame:
+    table = _flatten_structs(table)
+    # split_blocks avoids consolidating columns into 2D blocks, so null-free numeric columns are not copied
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def decode_columnar(mimetype: str, body: bytes) -> pd.DataFrame:
+    if not columnar_available():
+        raise ValueError(f"Cannot decode {mimetype} without pyarrow installed")
+    if mimetype == ARROW_STREAM_MIMETYPE:
+        with pa.ipc.open_stream(pa.py_buffer(body)) as reader:
+            table = reader.read_all()
+    elif mimetype == PARQUET_MIMETYPE:
+        table = pq.read_table(pa.BufferReader(pa.py_buffer(body)))
+    else:
+        raise ValueError(f"Unsupported columnar format {mimetype}")
+    return table_to_dataframe(table)
+
+
+def encode_columnar(mimetype: str, dataframe: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(dataframe, preserve_index=False)
+    sink = BytesIO()
+    if mimetype == ARROW_STREAM_MIMETYPE:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif mimetype == PARQUET_MIMETYPE:
+        pq.write_table(table, sink)
+    else:
+        raise ValueError(f"Unsupported columnar format {mimetype}")
+    return sink.getvalue()
@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import threading
+import time
+import typing as t
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import Config
+
+
+class RepositoryClient:
+    """
+    Connection-pooled HTTP client shared by every RepositoryProcessor.  One client is created per process so
+    keep-alive connections are never shared across a fork.
+    """
+    _clients: t.Dict[int, "RepositoryClient"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 5, read_timeout: float = 300,
+                 retries: int = 3, backoff_factor: float = 0.5):
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                   max_retries=self._retry_policy(retries=retries, backoff_factor=backoff_factor))
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        # Requests for callers that retry failures themselves (see ShardedFetcher) are sent exactly once
+        self.single_attempt_adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                                  max_retries=self._retry_policy(retries=0, backoff_factor=0))
+        self.single_attempt_session = requests.Session()
+        self.single_attempt_session.mount("http://", self.single_attempt_adapter)
+        self.single_attempt_session.mount("https://", self.single_attempt_adapter)
+        self.single_attempt_session.headers.update({"Content-Type": "application/json"})
+        # Counters are updated from pipeline executor and shard threads
+        self._metrics_lock = threading.Lock()
+        self.request_count = 0
+        self.failure_count = 0
+        self.request_seconds = 0.0
+
+    @classmethod
+    def log(cls):
+        logging_handler = logging.getLogger(cls.__name__)
+        return logging_handler
+
+    @staticmethod
+    def _retry_policy(retries: int, backoff_factor: float) -> Retry:
+        # Repository routes are read-only queries, so POSTs are safe to retry
+        return Retry(total=retries, connect=retries, read=retries, status=retries,
+                     backoff_factor=backoff_factor, status_forcelist=(502, 503, 504),
+                     allowed_methods=frozenset(["GET", "POST"]), raise_on_status=False)
+
+    @classmethod
+    def from_config(cls, config=Config) -> "RepositoryClient":
+        return cls(pool_size=config.REPOSITORY_POOL_SIZE,
+                   connect_timeout=config.REPOSITORY_CONNECT_TIMEOUT,
+                   read_timeout=config.REPOSITORY_READ_TIMEOUT,
+                   retries=config.REPOSITORY_RETRIES,
+                   backoff_factor=config.REPOSITORY_BACKOFF_FACTOR)
+
+    @classmethod
+    def shared(cls) -> "RepositoryClient":
+        pid = os.getpid()
+        client = cls._clients.get(pid)
+        if client is None:
+            with cls._lock:
+                client = cls._clients.get(pid)
+                if client is None:
+                    # Forked children start with a fresh pool
+                    cls._clients = {pid: cls.from_config()}
+                    client = cls._clients[pid]
+        return client
+
+    def post(self, url: str, json_request: t.Dict, headers: t.Optional[t.Dict] = None,
+             stream: bool = False, retry: bool = True) -> requests.Response:
+        start = time.perf_counter()
+        failed = False
+        session = self.session if retry else self.single_attempt_session
+        try:
+            response = session.post(url, data=json.dumps(json_request), headers=headers,
+                                         timeout=self.timeout, stream=stream)
+        except requests.RequestException:
+            failed = True
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            with self._metrics_lock:
+                self.request_count += 1
+                self.failure_count += failed
+                self.request_seconds += seconds
+        return response
+
+    def connection_stats(self) -> t.Dict[str, int]:
+        connections = 0
+        pooled_requests = 0
+        for adapter in (self.adapter, self.single_attempt_adapter):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                connections += pool.num_connections
+                pooled_requests += pool.num_requests
+        return {
+            "connections_opened": connections,
+            "pooled_requests": pooled_requests,
+            "connections_reused": max(pooled_requests - connections, 0),
+        }
+
+    def metrics(self) -> t.Dict[str, t.Union[int, float]]:
+        with self._metrics_lock:
+            metrics = {
+                "requests": self.request_count,
+                "failures": self.failure_count,
+                "request_seconds": round(self.request_seconds, 6),
+            }
+        metrics.update(self.connection_stats())
+        return metrics
+
+    def close(self):
+        self.session.close()
+        self.single_attempt_session.close()
@@ -1,4 +1,4 @@
-import json
+import asyncio
 import typing
 
 from config import Config
@@ -6,13 +6,40 @@ from Entities.config import PostProcessingConfig
 import requests
 import pandas as pd
 
-from Processing.processing_responses import ProcessorResponseFailure, ProcessorResponseSuccess
+from Processing.processing_responses import ProcessorResponseFailure, ProcessorResponseSuccess, \
+    RepositoryResponseFailure
+from Processing.RepoProcessors import columnar_transport
+from Processing.RepoProcessors.async_repository_client import AsyncRepositoryClient, CLIENT_ERRORS
+from Processing.RepoProcessors.repository_client import RepositoryClient
+from Processing.RepoProcessors.sharded_fetch import ShardedFetcher
+from Processing.RepoProcessors.streaming_decoder import StreamingResultDecoder
 
 
 class RepositoryProcessor:
 
-    def __init__(self, url):
+    def __init__(self, url, client: typing.Optional[RepositoryClient] = None,
+                 columnar: bool = Config.REPOSITORY_COLUMNAR_TRANSPORT,
+                 shard_size: typing.Optional[int] = None, async_client: typing.Optional[AsyncRepositoryClient] = None):
         self.url = url
+        self._client = client
+        self._async_client = async_client
+        # Ask the repository for Arrow/Parquet payloads, falling back to JSON when it does not support them
+        self.columnar = columnar
+        # Requests over more runids (or test categories) than this are fetched as concurrent shards; 0 disables
+        self.shard_size = Config.REPOSITORY_SHARD_SIZE if shard_size is None else shard_size
+        self.shard_concurrency = Config.REPOSITORY_SHARD_CONCURRENCY
+        self.shard_retries = Config.REPOSITORY_SHARD_RETRIES
+        # Return the rows of the shards that were fetched instead of failing when some shards fail
+        self.allow_partial_shards = False
+
+    @property
+    def client(self) -> RepositoryClient:
+        # Resolved lazily so processors stay picklable and pick up the per-process pool after a fork
+        return self._client or RepositoryClient.shared()
+
+    @property
+    def async_client(self) -> AsyncRepositoryClient:
+        return self._async_client or AsyncRepositoryClient.shared()
 
     def _create_repository_api_url(self, route: str) -> str:
         url_fmt = "{host}{url_prefix}/{route}"
@@ -21,26 +48,89 @@ class RepositoryProcessor:
         url = url_fmt.format(host=host_url, url_prefix=url_prefix, route=route)
         return url
 
-    def _query_repository(self, json_request: typing.Dict) -> ProcessorResponseSuccess | ProcessorResponseFailure:
-        # Set the headers for the request (specify the content type as JSON)
-        headers = {"Content-Type": "application/json"}
-
-        response = requests.post(self.url, data=json.dumps(json_request),
-                                 headers=headers)
-        if response.status_code == 200:
-            data = response.json()  # Website returns JSON data
-            json_data = data['result']
-            dataframe = pd.json_normalize(json_data)
-            return ProcessorResponseSuccess(dataframe=dataframe,
-                                            title="repository response")
-        else:
-            print("Failed to retrieve data from the website.")
-            return ProcessorResponseFailure(
-                message=f"Repository returned status code {response.status_code}. Failed to retrieve data from the repository")
+    def _query_repository(self, json_request: typing.Dict,
+                          retry: bool = True) -> ProcessorResponseSuccess | ProcessorResponseFailure:
+        headers = {"Accept": columnar_transport.accept_header(columnar=self.columnar)}
+        try:
+            response = self.client.post(self.url, json_request=json_request, headers=headers, stream=True,
+                                        retry=retry)
+        except requests.RequestException as e:
+            return RepositoryResponseFailure(message=e, error=e)
+        with response:
+            if response.status_code == 200:
+                try:
+                    dataframe = self._decode_response(response=response)
+                except (ValueError, requests.RequestException) as e:
+                    return ProcessorResponseFailure(message=e)
+                return ProcessorResponseSuccess(dataframe=dataframe,
+                                                title="repository response")
+            else:
+                print("Failed to retrieve data from the website.")
+                return RepositoryResponseFailure(
+                    message=f"Repository returned status code {response.status_code}. Failed to retrieve data from the repository",
+                    status_code=response.status_code)
+
+    async def _query_repository_async(self, json_request: typing.Dict, retry: bool = True
+                                      ) -> ProcessorResponseSuccess | ProcessorResponseFailure:
+        headers = {"Accept": columnar_transport.accept_header(columnar=self.columnar)}
+        try:
+            response = await self.async_client.post(self.url, json_request=json_request, headers=headers,
+                                                    retry=retry)
+        except CLIENT_ERRORS as e:
+            return RepositoryResponseFailure(message=e, error=e)
+        if response.status_code != 200:
+            return RepositoryResponseFailure(message=f"Repository returned status code {response.status_code}. "
+                                                     f"Failed to retrieve data from the repository",
+                                             status_code=response.status_code)
+        try:
+            # Decoding is CPU-bound, so it runs off the event loop
+            dataframe = await asyncio.to_thread(self._decode_content, response.headers.get("Content-Type"),
+                                                response.content)
+        except ValueError as e:
+            return ProcessorResponseFailure(message=e)
+        return ProcessorResponseSuccess(dataframe=dataframe, title="repository response")
+
+    def _decode_content(self, content_type: typing.Optional[str], content: bytes) -> pd.DataFrame:
+        mimetype = columnar_transport.content_mimetype(content_type)
+        if mimetype in columnar_transport.COLUMNAR_MIMETYPES:
+            return columnar_transport.decode_columnar(mimetype=mimetype, body=content)
+        return StreamingResultDecoder.decode_stream([content], chunk_rows=Config.REPOSITORY_STREAM_CHUNK_ROWS)
+
+    def _decode_response(self, response: requests.Response) -> pd.DataFrame:
+        mimetype = columnar_transport.content_mimetype(response.headers.get("Content-Type"))
+        if mimetype in columnar_transport.COLUMNAR_MIMETYPES:
+            return columnar_transport.decode_columnar(mimetype=mimetype, body=response.content)
+        # Website returns JSON data, decoded incrementally straight into a dataframe
+        return self._decode_json_response(response=response)
+
+    def _decode_json_response(self, response: requests.Response) -> pd.DataFrame:
+        chunks = response.iter_content(chunk_size=Config.REPOSITORY_STREAM_CHUNK_BYTES)
+        return StreamingResultDecoder.decode_stream(chunks, chunk_rows=Config.REPOSITORY_STREAM_CHUNK_ROWS)
+
+    def _sharded_fetcher(self) -> ShardedFetcher:
+        # Shards are retried by the fetcher, so the client sends each shard query once instead of retrying too
+        return ShardedFetcher(query=lambda shard_request: self._query_repository(json_request=shard_request,
+                                                                                 retry=False),
+                              shard_size=self.shard_size, max_concurrency=self.shard_concurrency,
+                              retries=self.shard_retries, backoff_seconds=Config.REPOSITORY_BACKOFF_FACTOR,
+                              allow_partial=self.allow_partial_shards)
 
     def execute(self, json_request: typing.Dict) -> ProcessorResponseSuccess | ProcessorResponseFailure:
+        if self.shard_size > 0:
+            return self._sharded_fetcher().fetch(json_request=json_request)
         return self._query_repository(json_request=json_request)
 
+    async def execute_async(self, json_request: typing.Dict) -> ProcessorResponseSuccess | ProcessorResponseFailure:
+        """
+        `execute` on the event loop: the query goes through the asyncio client and large requests are sharded
+        the same way.
+        """
+        if self.shard_size > 0:
+            return await self._sharded_fetcher().fetch_async(
+                json_request=json_request,
+                query=lambda shard_request: self._query_repository_async(json_request=shard_request, retry=False))
+        return await self._query_repository_async(json_request=json_request)
+
 
 class SequencingRepositoryProcessor(RepositoryProcessor):
 
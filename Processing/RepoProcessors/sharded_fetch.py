@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from Processing.processing_responses import ProcessorResponseFailure, ProcessorResponseSuccess, \
+    RepositoryResponseFailure
+from Processing.RepoProcessors.async_repository_client import CONNECTION_ERRORS
+
+# Request filters a query can be sharded on, in order of preference
+SHARD_FIELDS = ("runid_list", "test_category_list")
+
+RepositoryResponse = t.Union[ProcessorResponseSuccess, ProcessorResponseFailure]
+
+
+def shard_requests(json_request: t.Dict, shard_size: int, fields: t.Sequence[str] = SHARD_FIELDS) -> t.List[t.Dict]:
+    """
+    Split a request into requests over at most `shard_size` values of the first filter in `fields` that has more
+    values than that.  Requests that need no splitting are returned as the only shard.
+    """
+    if shard_size > 0:
+        for name in fields:
+            values = json_request.get(name) or []
+            if len(values) > shard_size:
+                return [dict(json_request, **{name: values[start:start + shard_size]})
+                        for start in range(0, len(values), shard_size)]
+    return [json_request]
+
+
+def is_retryable(response: ProcessorResponseFailure) -> bool:
+    """
+    Whether a failed query is worth repeating: the repository could not be reached or answered with a server
+    error.  Client errors (4xx) and responses that could not be decoded fail the same way again.
+    """
+    status_code = getattr(response, "status_code", None)
+    if status_code is not None:
+        return status_code >= 500
+    return isinstance(getattr(response, "error", None), CONNECTION_ERRORS)
+
+
+class ShardFailure(t.NamedTuple):
+    shard: int
+    json_request: t.Dict
+    message: str
+    attempts: int
+
+
+class ShardedFetchFailure(ProcessorResponseFailure):
+    """
+    Failure of a sharded fetch, with the shards that could not be fetched in `failures`.
+    """
+
+    def __init__(self, failures: t.List[ShardFailure], shards: int):
+        self.failures = failures
+        details = "; ".join(f"shard {failure.shard} after {failure.attempts} attempts: {failure.message}"
+                            for failure in failures)
+        super(ShardedFetchFailure, self).__init__(message=f"{len(failures)} of {shards} repository shards failed: "
+                                                          f"{details}")
+
+
+class ShardedFetcher:
+    """
+    Runs a repository query as concurrent queries over shards of its runid (or test category) list and
+    concatenates their frames in shard order.  Every shard is retried on its own after connection errors and
+    server errors (5xx), so `query` should send each request once (RepositoryProcessor queries shards with
+    `retry=False`) for this to be the only retry layer.  When shards still fail, the fetch fails with a
+    ShardedFetchFailure listing them, unless `allow_partial` is set, in which case the rows of the other shards
+    are returned and the failures are attached to the response as `shard_failures`.
+    """
+
+    def __init__(self, query: t.Callable[[t.Dict], RepositoryResponse], shard_size: int, max_concurrency: int = 4,
+                 retries: int = 1, backoff_seconds: float = 0.5, allow_partial: bool = False):
+        self.query = query
+        self.shard_size = shard_size
+        self.max_concurrency = max(1, max_concurrency)
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.allow_partial = allow_partial
+
+    @classmethod
+    def log(cls):
+        logging_handler = logging.getLogger(cls.__name__)
+        return logging_handler
+
+    def fetch(self, json_request: t.Dict) -> RepositoryResponse:
+        shards = shard_requests(json_request, shard_size=self.shard_size)
+        if len(shards) == 1:
+            return self.query(shards[0])
+
+        start = time.perf_counter()
+        results: t.List[t.Union[pd.DataFrame, ShardFailure, None]] = [None] * len(shards)
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(shards)),
+                                thread_name_prefix="repository-shard") as executor:
+            futures = {executor.submit(self._fetch_shard, index, shard): index for index, shard in enumerate(shards)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        self.log().debug(f"Fetched {len(shards)} shards in {time.perf_counter() - start:.3f}s")
+        return self._response(results)
+
+    def _response(self, results: t.List[t.Union[pd.DataFrame, ShardFailure]]) -> RepositoryResponse:
+        failures = [result for result in results if isinstance(result, ShardFailure)]
+        frames = [result for result in results if not isinstance(result, ShardFailure)]
+        for failure in failures:
+            self.log().warning(f"Repository shard {failure.shard} failed: {failure.message}")
+
+        if failures and (not self.allow_partial or not frames):
+            return ShardedFetchFailure(failures=failures, shards=len(results))
+        response = ProcessorResponseSuccess(dataframe=self._concat(frames), title="repository response")
+        response.shard_failures = failures
+        return response
+
+    async def fetch_async(self, json_request: t.Dict,
+                          query: t.Callable[[t.Dict], t.Awaitable[RepositoryResponse]]) -> RepositoryResponse:
+        """
+        `fetch` on the event loop, with `query` a coroutine function; at most `max_concurrency` shards are in
+        flight at a time.
+        """
+        shards = shard_requests(json_request, shard_size=self.shard_size)
+        if len(shards) == 1:
+            return await query(shards[0])
+
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch_shard(index: int, shard: t.Dict) -> t.Union[pd.DataFrame, ShardFailure]:
+            async with semaphore:
+                return await self._fetch_shard_async(index, shard, query=query)
+
+        results = await asyncio.gather(*(fetch_shard(index, shard) for index, shard in enumerate(shards)))
+        self.log().debug(f"Fetched {len(shards)} shards in {time.perf_counter() - start:.3f}s")
+        return self._response(results)
+
+    def _fetch_shard(self, index: int, json_request: t.Dict) -> t.Union[pd.DataFrame, ShardFailure]:
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                response = self.query(json_request)
+            except Exception as e:
+                response = RepositoryResponseFailure(message=e, error=e)
+            if response:
+                return response.dataframe
+            if attempts > self.retries or not is_retryable(response):
+                return ShardFailure(shard=index, json_request=json_request, message=str(response.message),
+                                    attempts=attempts)
+            time.sleep(self.backoff_seconds * 2 ** (attempts - 1))
+
+    async def _fetch_shard_async(self, index: int, json_request: t.Dict,
+                                 query: t.Callable[[t.Dict], t.Awaitable[RepositoryResponse]]
+                                 ) -> t.Union[pd.DataFrame, ShardFailure]:
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                response = await query(json_request)
+            except Exception as e:
+                response = RepositoryResponseFailure(message=e, error=e)
+            if response:
+                return response.dataframe
+            if attempts > self.retries or not is_retryable(response):
+                return ShardFailure(shard=index, json_request=json_request, message=str(response.message),
+                                    attempts=attempts)
+            await asyncio.sleep(self.backoff_seconds * 2 ** (attempts - 1))
+
+    @staticmethod
+    def _concat(frames: t.List[pd.DataFrame]) -> pd.DataFrame:
+        # Shards without rows carry no columns worth keeping and would upcast the dtypes of the others
+        non_empty = [frame for frame in frames if not frame.empty]
+        if not non_empty:
+            return frames[0]
+        if len(non_empty) == 1:
+            return non_empty[0]
+        return pd.concat(non_empty, ignore_index=True)
@@ -0,0 +1,142 @@
+import codecs
+import json
+import re
+import typing as t
+
+import pandas as pd
+
+_ARRAY_START = re.compile(r'"{key}"\s*:\s*\[')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+class StreamingResultDecoder:
+    """
+    Incrementally decodes the `result` array of a repository JSON response into a DataFrame.
+
+    Records are parsed one at a time from the byte stream and flattened into columnar buffers, producing the same
+    dotted column names as `pd.json_normalize` (e.g. `waveforms.testpoint`).  Buffers are converted into DataFrame
+    chunks every `chunk_rows` records, so the full Python object tree of the response is never held in memory.
+    """
+    _SEEKING = 0
+    _IN_ARRAY = 1
+    _DONE = 2
+
+    def __init__(self, key: str = "result", chunk_rows: int = 50000, sep: str = "."):
+        self.key = key
+        self.chunk_rows = chunk_rows
+        self.sep = sep
+        self._array_start = re.compile(_ARRAY_START.pattern.format(key=re.escape(key)))
+        self._json_decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._state = self._SEEKING
+        self._column_order: t.List[str] = []
+        self._columns: t.Dict[str, t.List] = {}
+        self._buffered_rows = 0
+        self._frames: t.List[pd.DataFrame] = []
+        self.row_count = 0
+
+    @classmethod
+    def decode_stream(cls, chunks: t.Iterable[t.Union[bytes, str]], **kwargs) -> pd.DataFrame:
+        decoder = cls(**kwargs)
+        for chunk in chunks:
+            decoder.feed(chunk)
+        return decoder.close()
+
+    @classmethod
+    def decode_text(cls, text: str, chunk_size: int = 1 << 20, **kwargs) -> pd.DataFrame:
+        return cls.decode_stream((text[i:i + chunk_size] for i in range(0, len(text), chunk_size)), **kwargs)
+
+    def feed(self, chunk: t.Union[bytes, str]):
+        if isinstance(chunk, bytes):
+            chunk = self._text_decoder.decode(chunk)
+        if not chunk or self._state == self._DONE:
+            return
+        self._buffer += chunk
+        self._consume(final=False)
+
+    def close(self) -> pd.DataFrame:
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        self._consume(final=True)
+        if self._state == self._SEEKING:
+            raise ValueError(f"Response does not contain a '{self.key}' array")
+        if self._state == self._IN_ARRAY:
+            raise ValueError(f"Response ended inside the '{self.key}' array")
+        self._flush()
+        if not self._frames:
+            return pd.DataFrame(columns=self._column_order)
+        if len(self._frames) == 1:
+            dataframe = self._frames[0]
+        else:
+            dataframe = pd.concat(self._frames, ignore_index=True)
+        self._frames = []
+        return dataframe.reindex(columns=self._column_order)
+
+    def _consume(self, final: bool):
+        if self._state == self._SEEKING:
+            match = self._array_start.search(self._buffer)
+            if match is None:
+                # Keep a tail long enough to hold a key split across chunks
+                self._buffer = self._buffer[-(len(self.key) + 64):]
+                return
+            self._buffer = self._buffer[match.end():]
+            self._state = self._IN_ARRAY
+
+        if self._state == self._IN_ARRAY:
+            buffer = self._buffer
+            position = 0
+            while True:
+                position = _SEPARATORS.match(buffer, position).end()
+                if position >= len(buffer):
+                    break
+                if buffer[position] == "]":
+                    self._state = self._DONE
+                    position += 1
+                    break
+                try:
+                    record, end = self._json_decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break  # record is split across chunks
+                if end >= len(buffer) and not final:
+                    break  # a trailing scalar may still be incomplete
+                self._append_record(record)
+                position = end
+            self._buffer = "" if self._state == self._DONE else buffer[position:]
+
+    def _flatten(self, record: t.Dict, prefix: str, flat: t.Dict):
+        for key, value in record.items():
+            name = f"{prefix}{key}"
+            if isinstance(value, dict):
+                self._flatten(value, f"{name}{self.sep}", flat)
+            else:
+                flat[name] = value
+
+    def _append_record(self, record: t.Dict):
+        if not isinstance(record, dict):
+            raise ValueError(f"Expected '{self.key}' to contain objects, found {type(record).__name__}")
+        flat = {}
+        self._flatten(record, "", flat)
+        for name, value in flat.items():
+            column = self._columns.get(name)
+            if column is None:
+                if name not in self._column_order:
+                    self._column_order.append(name)
+                column = [None] * self._buffered_rows
+                self._columns[name] = column
+            column.append(value)
+        self._buffered_rows += 1
+        self.row_count += 1
+        if len(flat) != len(self._columns):
+            for column in self._columns.values():
+                if len(column) < self._buffered_rows:
+                    column.append(None)
+        if self._buffered_rows >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        if self._buffered_rows:
+            self._frames.append(pd.DataFrame(self._columns))
+        self._columns = {}
+        self._buffered_rows = 0
@@ -0,0 +1,113 @@
+import threading
+import typing as t
+
+import numpy as np
+import pandas as pd
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+
+from Entities.config import PostProcessingConfig
+from Processing.RepoProcessors import columnar_transport
+from Processing.request_batching import filter_repository_dataframe
+
+RouteData = t.Union[pd.DataFrame, t.Callable[[t.Dict], pd.DataFrame]]
+
+
+def _nest_record(record: t.Dict, sep: str = ".") -> t.Dict:
+    # Inverse of json_normalize: {"waveforms.testpoint": x} -> {"waveforms": {"testpoint": x}}
+    nested = {}
+    for name, value in record.items():
+        if isinstance(value, float) and np.isnan(value):
+            value = None
+        elif isinstance(value, np.generic):
+            value = value.item()
+        keys = name.split(sep)
+        target = nested
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return nested
+
+
+class StubRepository:
+    """
+    In-memory stand-in for the repository's data-processing API, so RepositoryProcessors can run offline.
+
+    Each route serves a dataframe (filtered by the request's runid_list/test_category_list) or the result of a
+    callable taking the JSON request.  Responses honour the Accept header: Arrow IPC or Parquet when pyarrow is
+    installed and `columnar` is enabled, JSON rows otherwise.
+    """
+
+    def __init__(self, routes: t.Optional[t.Dict[str, RouteData]] = None, columnar: bool = True):
+        self.routes: t.Dict[str, RouteData] = dict(routes or {})
+        self.columnar = columnar
+        self.requests: t.List[t.Tuple[str, t.Dict]] = []
+
+    def add_route(self, route: str, data: RouteData):
+        self.routes[route] = data
+
+    def _route_dataframe(self, route: str, json_request: t.Dict) -> pd.DataFrame:
+        data = self.routes[route]
+        if callable(data):
+            return data(json_request)
+        return filter_repository_dataframe(data, json_request=json_request)
+
+    def create_app(self) -> Flask:
+        app = Flask(__name__)
+        app.json.sort_keys = False
+        url_prefix = PostProcessingConfig.repository_dataprocessing_route
+
+        @app.route(f"{url_prefix}/<route>", methods=["POST"])
+        def repository_route(route):
+            if route not in self.routes:
+                return jsonify({"error": f"Unknown route {route}"}), 404
+            json_request = request.get_json(force=True, silent=True) or {}
+            self.requests.append((route, json_request))
+            dataframe = self._route_dataframe(route, json_request=json_request)
+
+            mimetype = columnar_transport.JSON_MIMETYPE
+            if self.columnar:
+                mimetype = columnar_transport.negotiate(request.headers.get("Accept"))
+            if mimetype in columnar_transport.COLUMNAR_MIMETYPES:
+                body = columnar_transport.encode_columnar(mimetype=mimetype, dataframe=dataframe)
+                return Response(body, mimetype=mimetype)
+            records = [_nest_record(record) for record in dataframe.to_dict(orient="records")]
+            return jsonify({"result": records})
+
+        return app
+
+
+class StubRepositoryServer:
+    """
+    Runs a StubRepository on a local port in a background thread.
+
+        with StubRepositoryServer(StubRepository({"sequencing_processor": df})) as server:
+            processor = SequencingRepositoryProcessor()
+            processor.url = server.url_for("sequencing_processor")
+    """
+
+    def __init__(self, repository: StubRepository, host: str = "127.0.0.1", port: int = 0):
+        self.repository = repository
+        self._server = make_server(host, port, repository.create_app(), threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def host_url(self) -> str:
+        return f"http://{self._server.host}:{self._server.port}"
+
+    def url_for(self, route: str) -> str:
+        return f"{self.host_url}{PostProcessingConfig.repository_dataprocessing_route}/{route}"
+
+    def start(self) -> "StubRepositoryServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubRepositoryServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
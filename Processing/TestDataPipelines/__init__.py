@@ -1,2 +1,12 @@
-from .sequencing_pipeline import SequencingDataProcessingPipeline
-from .overview_pipeline import OverviewDataProcessingPipeline
+from lazy_imports import LazyRegistry, lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "SequencingDataProcessingPipeline": ".sequencing_pipeline",
+    "OverviewDataProcessingPipeline": ".overview_pipeline",
+})
+
+# Pipelines addressable by name, e.g. from asynchronous report jobs; a pipeline module is imported when first used
+PIPELINES = LazyRegistry({
+    "sequencing": "Processing.TestDataPipelines.sequencing_pipeline:SequencingDataProcessingPipeline",
+    "overview": "Processing.TestDataPipelines.overview_pipeline:OverviewDataProcessingPipeline",
+})
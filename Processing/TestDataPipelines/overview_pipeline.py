@@ -1,16 +1,27 @@
-from Processing.RepoProcessors import WaveformRepositoryProcessor
+import typing as t
+
+from config import Config
 from Processing import DataProcessingPipeline
-from Processing.TestDataProcessors import TitleSheetProcessor, NoProcessor, SequencingProcessor, PowerOnTimeProcessor, \
-    WaveformCombinationProcessor
+from Processing.processor_registry import create_processors
 
 
 class OverviewDataProcessingPipeline(DataProcessingPipeline):
+    # Registry names, so only the processors this pipeline uses are imported
+    processor_names = [
+        "WaveformRepositoryProcessor",
+        "WaveformCombinationProcessor",
+        "TitleSheetProcessor",
+        "NoProcessor",
+    ]
 
-    def __init__(self):
-        super(OverviewDataProcessingPipeline, self).__init__()
-        self.processors = [
-            WaveformRepositoryProcessor(),
-            WaveformCombinationProcessor(),
-            TitleSheetProcessor(),
-            NoProcessor(),
-        ]
+    def __init__(self, parallel: bool = True, max_workers: t.Optional[int] = None, executor: str = "thread",
+                 server_statistics: t.Optional[bool] = None):
+        super(OverviewDataProcessingPipeline, self).__init__(parallel=parallel, max_workers=max_workers,
+                                                             executor=executor)
+        if server_statistics is None:
+            server_statistics = Config.OVERVIEW_SERVER_STATISTICS
+        names = self.processor_names
+        if server_statistics:
+            # The combination statistics are reduced in Mongo rather than from the repository rows
+            names = ["RunidStatisticsProcessor" if name == "WaveformCombinationProcessor" else name for name in names]
+        self.processors = create_processors(names)
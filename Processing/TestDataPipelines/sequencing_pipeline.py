@@ -1,16 +1,20 @@
-from Processing.RepoProcessors import SequencingRepositoryProcessor
+import typing as t
+
 from Processing import DataProcessingPipeline
-from Processing.TestDataProcessors import TitleSheetProcessor, NoProcessor, SequencingProcessor, PowerOnTimeProcessor
+from Processing.processor_registry import create_processors
 
 
 class SequencingDataProcessingPipeline(DataProcessingPipeline):
+    # Registry names, so only the processors this pipeline uses are imported
+    processor_names = [
+        "SequencingRepositoryProcessor",
+        "TitleSheetProcessor",
+        "NoProcessor",
+        "SequencingProcessor",
+        "PowerOnTimeProcessor",
+    ]
 
-    def __init__(self):
-        super(SequencingDataProcessingPipeline, self).__init__()
-        self.processors = [
-            SequencingRepositoryProcessor(),
-            TitleSheetProcessor(),
-            NoProcessor(),
-            SequencingProcessor(),
-            PowerOnTimeProcessor()
-        ]
+    def __init__(self, parallel: bool = True, max_workers: t.Optional[int] = None, executor: str = "thread"):
+        super(SequencingDataProcessingPipeline, self).__init__(parallel=parallel, max_workers=max_workers,
+                                                               executor=executor)
+        self.processors = create_processors(self.processor_names)
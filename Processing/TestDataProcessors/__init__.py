@@ -1,4 +1,5 @@
 from .waveform_combination import WaveformCombinationProcessor
+from .runid_statistics import RunidStatisticsProcessor
 from .TitleSheetProcessor import TitleSheetProcessor
 from .NoProcessor import NoProcessor
 from .WaveformSequencingProcessor import SequencingProcessor
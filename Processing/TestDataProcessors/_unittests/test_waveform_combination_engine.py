@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from Benchmarks.synthetic import repository_payload
+from Processing.TestDataProcessors import WaveformCombinationProcessor
+from Processing.dtype_normalizer import DtypeNormalizer
+
+
+def reference_statistics(dataframe: pd.DataFrame, keys) -> pd.DataFrame:
+    grouped = dataframe.groupby(keys, observed=True)
+    statistics = grouped.agg({"waveforms.max": ["min", "mean", "max"], "waveforms.min": ["min", "mean", "max"]})
+    statistics.columns = [f"{column}_{statistic}" for column, statistic in statistics.columns]
+    return statistics.reset_index()
+
+
+class WaveformCombinationEngineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = repository_payload(runids=10, testpoints=40, captures=15)
+        self.frame.loc[::13, "waveforms.max"] = np.nan
+
+    def assertStatisticsEqual(self, result: pd.DataFrame, expected: pd.DataFrame, keys):
+        for key in keys:
+            self.assertEqual(result[key].astype(str).tolist(), expected[key].astype(str).tolist())
+        for column in expected.columns.difference(keys):
+            np.testing.assert_allclose(result[column].to_numpy(dtype=float), expected[column], rtol=1e-6, atol=1e-6,
+                                       err_msg=column)
+
+    def test_matches_groupby(self):
+        for group_by, keys in (("testpoint", ["waveforms.testpoint"]),
+                               ("runid", ["runid", "waveforms.testpoint"]),
+                               ("capture", ["waveforms.testpoint", "waveforms.capture"])):
+            with self.subTest(group_by=group_by):
+                result = WaveformCombinationProcessor(group_by=group_by).combine(self.frame).statistics
+                self.assertStatisticsEqual(result, reference_statistics(self.frame, keys), keys)
+
+    def test_locations(self):
+        result = WaveformCombinationProcessor().combine(self.frame)
+        expected = self.frame.groupby("waveforms.testpoint")["waveforms.location"].apply(list)
+        self.assertEqual(len(result.locations), len(self.frame))
+        for row, testpoint in enumerate(result.statistics["waveforms.testpoint"]):
+            self.assertEqual(list(result.locations_of(row)), expected[testpoint])
+        self.assertEqual(result.statistics["waveforms.location_count"].sum(), len(self.frame))
+        self.assertEqual(result.statistics.columns[-1], "project")
+
+    def test_sheet_locations(self):
+        processor = WaveformCombinationProcessor()
+        sheet = processor.execute(self.frame).dataframe
+        expected = self.frame.groupby("waveforms.testpoint")["waveforms.location"].apply("; ".join)
+        self.assertListEqual(list(sheet.columns[-2:]), ["waveforms.location", "project"])
+        self.assertNotIn("waveforms.location_offset", sheet.columns)
+        self.assertListEqual(sheet["waveforms.location"].tolist(), expected[sheet["waveforms.testpoint"]].tolist())
+
+        # Merging the partials of two halves gives the sheet of the whole frame
+        halves = [self.frame.iloc[:len(self.frame) // 2], self.frame.iloc[len(self.frame) // 2:]]
+        merged = processor.merge_partials([processor.partial(half) for half in halves])
+        pd.testing.assert_frame_equal(merged, sheet, check_exact=False, rtol=1e-6)
+
+    def test_normalized_frame(self):
+        normalized = DtypeNormalizer(arrow_strings=False).normalize(self.frame)
+        result = WaveformCombinationProcessor(group_by="runid").combine(normalized).statistics
+        self.assertIsInstance(result["waveforms.testpoint"].dtype, pd.CategoricalDtype)
+        keys = ["runid", "waveforms.testpoint"]
+        self.assertStatisticsEqual(result, reference_statistics(self.frame, keys), keys)
+
+    def test_partials(self):
+        result = WaveformCombinationProcessor(partials=True).combine(self.frame).statistics
+        mean = result["waveforms.max_sum"] / result["waveforms.max_count"]
+        np.testing.assert_allclose(mean, result["waveforms.max_mean"])
+        self.assertEqual(result["waveforms.min_count"].sum(), self.frame["waveforms.min"].notna().sum())
+
+    def test_empty_and_unknown_grouping(self):
+        result = WaveformCombinationProcessor().combine(self.frame.iloc[:0])
+        self.assertEqual(len(result.statistics), 0)
+        with self.assertRaises(ValueError):
+            WaveformCombinationProcessor(group_by="scope")
+
+
+if __name__ == '__main__':
+    unittest.main()
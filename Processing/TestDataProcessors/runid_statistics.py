@@ -0,0 +1,97 @@
+import copy
+import typing as t
+
+import pandas as pd
+
+from Processing import DataFrameProcessor
+from Processing.request_batching import TEST_CATEGORY_COLUMNS
+from Processing.TestDataProcessors.waveform_combination import LOCATION_COLUMN, LOCATION_SEPARATOR, \
+    WaveformCombinationProcessor
+
+
+class RunidStatisticsProcessor(DataFrameProcessor):
+    """
+    "Combination Waveforms" sheet reduced in Mongo: the per-testpoint statistics of every runid and test category
+    of the request are computed by one $group stage (ProcessingUseCase.query_runid_statistics) and merged like
+    WaveformCombinationProcessor partials, so the sheet matches the one computed locally.  The statistics are
+    queried from the request, so the repository rows are only fetched when another processor reads them; without
+    `locations` the sheet leaves out the waveform locations and the query does not return them.
+    """
+
+    def __init__(self, use_case=None, locations: bool = True):
+        super(RunidStatisticsProcessor, self).__init__()
+        self.dataframe_name = "Combination Waveforms"
+        self._use_case = use_case
+        self.locations = locations
+        self.combination = WaveformCombinationProcessor()
+        self.needs_repository_rows = False
+        self.json_request: t.Optional[t.Dict] = None
+
+    @property
+    def use_case(self):
+        if self._use_case is None:
+            # processing_usecase pulls in pymongo, so it is only imported when statistics are actually queried
+            from Processing.processing_usecase import ProcessingUseCase
+            self._use_case = ProcessingUseCase()
+        return self._use_case
+
+    @use_case.setter
+    def use_case(self, use_case):
+        self._use_case = use_case
+
+    def configuration(self) -> t.Dict[str, t.Any]:
+        return {"locations": self.locations}
+
+    def for_request(self, json_request: t.Dict) -> "RunidStatisticsProcessor":
+        processor = copy.copy(self)
+        processor.json_request = json_request
+        return processor
+
+    def _process_dataframe(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        statistics_request = self._statistics_request(dataframe)
+        statistics = pd.DataFrame()
+        if statistics_request is not None:
+            statistics = self.use_case.query_runid_statistics(statistics_request=statistics_request,
+                                                              include_locations=self.locations)
+        if statistics.empty:
+            if dataframe.empty:
+                return statistics
+            self.log().warning("No runid statistics were returned, combining the repository rows locally")
+            return self._sheet(self.combination._process_dataframe(dataframe))
+        return self._sheet(self.combination.merge_partials([self._partial(statistics)]))
+
+    def _statistics_request(self, dataframe: pd.DataFrame):
+        # processing_usecase pulls in pymongo, so it is only imported when statistics are actually queried
+        from Processing.processing_usecase import RunidStatisticsRequestObject
+
+        if self.json_request is not None and self.json_request.get("product"):
+            return RunidStatisticsRequestObject(product=self.json_request["product"],
+                                                runid_list=self.json_request.get("runid_list"),
+                                                test_category_list=self.json_request.get("test_category_list"),
+                                                runid_status=self.json_request.get("runid_status") or ["Complete"])
+
+        category_column = next((column for column in TEST_CATEGORY_COLUMNS if column in dataframe.columns), None)
+        if dataframe.empty or "runid" not in dataframe.columns or category_column is None:
+            return None
+        runid_status = ["Complete"]
+        if "status.status" in dataframe.columns:
+            runid_status = [str(status) for status in dataframe["status.status"].dropna().unique()] or runid_status
+        return RunidStatisticsRequestObject(
+            product=self._product_name(dataframe=dataframe),
+            runid_list=[int(runid) for runid in dataframe["runid"].dropna().unique()],
+            test_category_list=[str(category) for category in dataframe[category_column].dropna().unique()],
+            runid_status=runid_status)
+
+    def _partial(self, statistics: pd.DataFrame) -> pd.DataFrame:
+        partial = statistics.rename(columns={"count": "waveforms.location_count"})
+        if self.locations and LOCATION_COLUMN in partial.columns:
+            partial[LOCATION_COLUMN] = [LOCATION_SEPARATOR.join(map(str, locations))
+                                        for locations in partial[LOCATION_COLUMN]]
+        else:
+            partial[LOCATION_COLUMN] = ""
+        return partial
+
+    def _sheet(self, sheet: pd.DataFrame) -> pd.DataFrame:
+        if self.locations or LOCATION_COLUMN not in sheet.columns:
+            return sheet
+        return sheet.drop(columns=[LOCATION_COLUMN])
@@ -1,46 +1,189 @@
+import typing as t
+
+import numpy as np
 import pandas as pd
-from pathlib import Path
-import matplotlib.pyplot as plt
 
 from Processing import DataFrameProcessor
 
-from Entities.WaveformFunctions.waveform_analysis import WaveformAnalysis
+MEASUREMENTS = ("max", "min")
+STATISTICS = ("min", "mean", "max")
+LOCATION_COLUMN = "waveforms.location"
+# Separates the waveform locations of a group in the report sheet
+LOCATION_SEPARATOR = "; "
+
+# Group keys of each supported grouping
+GROUPINGS = {
+    "testpoint": ["waveforms.testpoint"],
+    "runid": ["runid", "waveforms.testpoint"],
+    "capture": ["waveforms.testpoint", "waveforms.capture"],
+}
+
+
+class CombinationResult(t.NamedTuple):
+    """
+    Statistics per group plus the waveform locations of every group, stored once in `locations`: the locations of
+    row `i` are `locations[offset:offset + count]` using its `waveforms.location_offset`/`_count` columns.
+    """
+    statistics: pd.DataFrame
+    locations: np.ndarray
+
+    def locations_of(self, row: int) -> np.ndarray:
+        offset = self.statistics["waveforms.location_offset"].iat[row]
+        count = self.statistics["waveforms.location_count"].iat[row]
+        return self.locations[offset:offset + count]
+
+    def joined_locations(self, separator: str = LOCATION_SEPARATOR) -> t.List[str]:
+        offsets = self.statistics["waveforms.location_offset"].to_numpy()
+        counts = self.statistics["waveforms.location_count"].to_numpy()
+        return [separator.join(self.locations[offset:offset + count]) for offset, count in zip(offsets, counts)]
+
+    def sheet(self) -> pd.DataFrame:
+        """
+        The "Combination Waveforms" sheet: the statistics with the locations of each group joined into one
+        `waveforms.location` column, in place of the offsets into `locations`.
+        """
+        return _location_sheet(self.statistics, self.joined_locations())
 
 
 class WaveformCombinationProcessor(DataFrameProcessor):
 
-    def __init__(self):
+    def __init__(self, group_by: str = "testpoint", partials: bool = False):
         super(WaveformCombinationProcessor, self).__init__()
+        if group_by not in GROUPINGS:
+            raise ValueError(f"Unknown grouping '{group_by}', expected one of {list(GROUPINGS)}")
         self.dataframe_name = "Combination Waveforms"
+        self.group_by = group_by
+        # Also return sum/count columns, so statistics of separate runs can be merged
+        self.partials = partials
+        self.supports_partials = True
+
+    @property
+    def group_keys(self) -> t.List[str]:
+        return GROUPINGS[self.group_by]
 
     def _process_dataframe(self, dataframe: pd.DataFrame) -> pd.DataFrame:
-        # Group the DataFrame by 'Waveform' column
-        grouped = dataframe.groupby('waveforms.testpoint')
-
-        # Calculate the minimum, mean, and maximum values for 'Min' and 'Max' columns
-        stats_df = grouped.agg({
-            'waveforms.max': ['min', 'mean', 'max'],
-            'waveforms.min': ['min', 'mean', 'max'],
-            'waveforms.location': lambda x: list(x),
-            'project': 'first'
-        })
-
-        # Flatten the multi-level column names
-        stats_df.columns = [f"{col[0]}_{col[1]}" if col[1] in ['min', 'mean', 'max'] else col[0] for col in
-                            stats_df.columns]
-        stats_df = stats_df.reset_index()
-
-        # for group, grouped_df in dataframe.groupby(by=["waveforms.testpoint", "runid"]):
-        '''
-        wa = WaveformAnalysis()
-        for i, row in stats_df.iterrows():
-            waveforms = row['waveforms.location']
-            for wf_loc in waveforms:
-                wf = wa.read_binary_waveform(wfm_path=Path(wf_loc), compressed=False)
-                downsample_y = wa.min_max_downsample_1d(wf, size=600)
-                plt.plot(downsample_y)
-            #plt.show()
-            plt.close()
-        '''
-
-        return stats_df
+        return self.combine(dataframe).sheet()
+
+    def combine(self, dataframe: pd.DataFrame) -> CombinationResult:
+        """
+        Sort-based aggregation: rows are ordered by group once, then every statistic is a single `reduceat` over
+        the sorted values.  Missing measurements are skipped like pandas' min/mean/max.
+        """
+        return self._combine(dataframe, partials=self.partials)
+
+    def _combine(self, dataframe: pd.DataFrame, partials: bool) -> CombinationResult:
+        order, starts = _group_order(dataframe, keys=self.group_keys)
+        reductions = {}
+        for measurement in MEASUREMENTS:
+            values = dataframe[f"waveforms.{measurement}"].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+            present = ~np.isnan(values)
+            reductions[measurement] = (_reduce(np.fmin, values, starts), _reduce(np.fmax, values, starts),
+                                       _reduce(np.add, np.where(present, values, 0.0), starts),
+                                       _reduce(np.add, present.astype(np.int64), starts))
+        counts = np.diff(np.append(starts, len(order)))
+        statistics = self._statistics(dataframe, first_rows=order[starts], reductions=reductions,
+                                      location_counts=counts, partials=partials)
+
+        # Locations: one array ordered by group, addressed by offset and count
+        if LOCATION_COLUMN in dataframe.columns:
+            locations = dataframe[LOCATION_COLUMN].to_numpy()[order]
+        else:
+            locations = np.empty(0, dtype=object)
+        return CombinationResult(statistics=statistics, locations=locations)
+
+    def configuration(self) -> t.Dict[str, t.Any]:
+        return {"group_by": self.group_by, "partials": self.partials}
+
+    def partial(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        # Each group keeps its location count for merging and its joined locations for the sheet
+        result = self._combine(dataframe, partials=True)
+        return result.statistics.assign(**{LOCATION_COLUMN: result.joined_locations()})
+
+    def merge_partials(self, partials: t.List[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Statistics of the union of the inputs the `partials` were computed from: min of the minimums, max of the
+        maximums, and means from the summed sums and counts.  Location offsets index the group-ordered locations
+        of the concatenated inputs.
+        """
+        dataframe = pd.concat(partials, ignore_index=True)
+        order, starts = _group_order(dataframe, keys=self.group_keys)
+        reductions = {}
+        for measurement in MEASUREMENTS:
+            column = f"waveforms.{measurement}"
+            reductions[measurement] = tuple(
+                _reduce(ufunc, dataframe[f"{column}_{name}"].to_numpy(dtype=dtype, na_value=na_value)[order], starts)
+                for ufunc, name, dtype, na_value in ((np.fmin, "min", np.float64, np.nan),
+                                                     (np.fmax, "max", np.float64, np.nan),
+                                                     (np.add, "sum", np.float64, 0.0),
+                                                     (np.add, "count", np.int64, 0)))
+        location_counts = _reduce(np.add, dataframe["waveforms.location_count"].to_numpy(dtype=np.int64)[order],
+                                  starts)
+        statistics = self._statistics(dataframe, first_rows=order[starts], reductions=reductions,
+                                      location_counts=location_counts, partials=self.partials)
+        # Locations of a group are the non-empty joined locations of its partials, in input order
+        joined = dataframe[LOCATION_COLUMN].fillna("").to_numpy(dtype=object)[order]
+        ends = np.append(starts[1:], len(order))
+        locations = [LOCATION_SEPARATOR.join(part for part in joined[start:end] if part)
+                     for start, end in zip(starts, ends)]
+        return _location_sheet(statistics, locations)
+
+    def _statistics(self, dataframe: pd.DataFrame, first_rows: np.ndarray,
+                    reductions: t.Dict[str, t.Tuple[np.ndarray, ...]], location_counts: np.ndarray,
+                    partials: bool) -> pd.DataFrame:
+        columns = {key: dataframe[key].take(first_rows).reset_index(drop=True) for key in self.group_keys}
+        for measurement, (minimum, maximum, total, count) in reductions.items():
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+            columns[f"waveforms.{measurement}_min"] = minimum
+            columns[f"waveforms.{measurement}_mean"] = mean
+            columns[f"waveforms.{measurement}_max"] = maximum
+            if partials:
+                columns[f"waveforms.{measurement}_sum"] = total
+                columns[f"waveforms.{measurement}_count"] = count
+        statistics = pd.DataFrame(columns)
+        statistics["waveforms.location_offset"] = np.cumsum(location_counts) - location_counts
+        statistics["waveforms.location_count"] = location_counts
+        if "project" in dataframe.columns:
+            statistics["project"] = dataframe["project"].take(first_rows).to_numpy()
+        return statistics
+
+
+def _location_sheet(statistics: pd.DataFrame, locations: t.List[str]) -> pd.DataFrame:
+    sheet = statistics.drop(columns=["waveforms.location_offset", "waveforms.location_count"])
+    position = sheet.columns.get_loc("project") if "project" in sheet.columns else len(sheet.columns)
+    sheet.insert(position, LOCATION_COLUMN, locations)
+    return sheet
+
+
+def _reduce(ufunc: np.ufunc, values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    if not len(starts):
+        return values[:0]
+    with np.errstate(invalid="ignore"):
+        return ufunc.reduceat(values, starts)
+
+
+def _group_order(dataframe: pd.DataFrame, keys: t.List[str]) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Row order that sorts `dataframe` by `keys` (stable, rows with a missing key dropped) and the start of every
+    group in that order.  Categorical keys are grouped on their codes.
+    """
+    combined = None
+    groups = 0
+    missing = np.zeros(len(dataframe), dtype=bool)
+    for key in keys:
+        codes, uniques = pd.factorize(dataframe[key], sort=True)
+        missing |= codes < 0
+        if combined is None:
+            combined, groups = codes.astype(np.int64), len(uniques)
+        else:
+            combined = combined * len(uniques) + codes
+            # Re-number densely so the combined code cannot overflow with many keys
+            combined, uniques = pd.factorize(combined, sort=True)
+            groups = len(uniques)
+    rows = np.flatnonzero(~missing)
+    # Stable sorts of 8/16 bit codes are radix sorts, linear in the number of rows
+    sort = np.argsort(combined[rows].astype(np.min_scalar_type(max(groups - 1, 0))), kind="stable")
+    order = rows[sort]
+    ordered = combined[order]
+    starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1]))) if len(order) else order[:0]
+    return order, starts
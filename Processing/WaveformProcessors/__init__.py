@@ -0,0 +1,17 @@
+from lazy_imports import lazy_exports
+
+# scipy is only imported when filtering is used
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "WaveformBatch": ".waveform_loader",
+    "WaveformLoader": ".waveform_loader",
+    "Envelope": ".downsampling",
+    "downsample_locations": ".downsampling",
+    "downsample_waveforms": ".downsampling",
+    "lttb": ".downsampling",
+    "min_max_envelope": ".downsampling",
+    "min_max_envelope_streaming": ".downsampling",
+    "overlay_line": ".downsampling",
+    "LowpassFilter": ".filtering",
+    "StreamingLowpassFilter": ".filtering",
+    "design_lowpass_sos": ".filtering",
+})
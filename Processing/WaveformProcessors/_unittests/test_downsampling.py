@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from Processing.WaveformProcessors import WaveformLoader, downsample_locations, downsample_waveforms, lttb, \
+    min_max_envelope, min_max_envelope_streaming, overlay_line
+
+
+def reference_envelope(waveform: np.ndarray, size: int) -> np.ndarray:
+    # One capture at a time, the way the overlay plots used to be built
+    bin_count = size // 2
+    bin_size = len(waveform) // bin_count
+    indices = []
+    for index in range(bin_count):
+        start = index * bin_size
+        stop = start + bin_size if index < bin_count - 1 else len(waveform)
+        segment = waveform[start:stop]
+        indices.extend(sorted([start + segment.argmin(), start + segment.argmax()]))
+    return np.array(indices)
+
+
+class DownsamplingTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.stack = np.random.default_rng(7).standard_normal((20, 10007)).astype("<f4")
+
+    def test_min_max_envelope_matches_per_capture(self):
+        envelope = min_max_envelope(self.stack, size=600)
+        self.assertEqual(envelope.x.shape, (20, 600))
+        for row, waveform in enumerate(self.stack):
+            np.testing.assert_array_equal(envelope.x[row], reference_envelope(waveform, size=600))
+            np.testing.assert_array_equal(envelope.y[row], waveform[envelope.x[row]])
+
+    def test_streaming_matches_batch(self):
+        batch = min_max_envelope(self.stack, size=600)
+        streamed = min_max_envelope_streaming(self.stack, size=600, chunk_samples=1000)
+        np.testing.assert_array_equal(streamed.x, batch.x)
+        np.testing.assert_array_equal(streamed.y, batch.y)
+
+    def test_short_capture_is_returned_unchanged(self):
+        envelope = min_max_envelope(self.stack[0, :100], size=600)
+        np.testing.assert_array_equal(envelope.x, np.arange(100))
+        np.testing.assert_array_equal(envelope.y, self.stack[0, :100])
+
+    def test_lttb_keeps_end_points(self):
+        envelope = lttb(self.stack, size=500)
+        self.assertEqual(envelope.x.shape, (20, 500))
+        np.testing.assert_array_equal(envelope.x[:, 0], 0)
+        np.testing.assert_array_equal(envelope.x[:, -1], 10006)
+        self.assertTrue(np.all(np.diff(envelope.x, axis=1) > 0))
+
+    def test_ragged_captures_keep_input_order(self):
+        waveforms = [self.stack[0], self.stack[1, :5000], self.stack[2]]
+        envelopes = downsample_waveforms(waveforms, size=600)
+        for waveform, envelope in zip(waveforms, envelopes):
+            np.testing.assert_array_equal(envelope.x, reference_envelope(waveform, size=600))
+
+        line = overlay_line(envelopes)
+        self.assertEqual(len(line.x), 3 * 600 + 2)
+        self.assertEqual(int(np.isnan(line.y).sum()), 2)
+
+    def test_downsample_locations(self):
+        with tempfile.TemporaryDirectory() as directory:
+            locations = []
+            for index, waveform in enumerate(self.stack[:4]):
+                location = os.path.join(directory, f"capture_{index}.bin")
+                waveform.tofile(location)
+                locations.append(location)
+            loader = WaveformLoader(dtype="<f4", header_bytes=0, max_workers=1)
+            envelopes = downsample_locations(locations, size=600, loader=loader)
+        for waveform, envelope in zip(self.stack[:4], envelopes):
+            np.testing.assert_array_equal(envelope.y, waveform[reference_envelope(waveform, size=600)])
+
+
+if __name__ == '__main__':
+    unittest.main()
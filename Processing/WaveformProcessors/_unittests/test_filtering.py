@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import scipy.signal as signal
+
+from Processing.WaveformProcessors import LowpassFilter, StreamingLowpassFilter, design_lowpass_sos
+
+
+class LowpassFilterTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(3)
+        steps = np.where(np.arange(20000) > 5000, 3.3, 0.2)
+        self.stack = (steps + rng.normal(scale=0.05, size=(8, 20000))).astype("<f4")
+
+    def test_design_is_cached(self):
+        sos = design_lowpass_sos(4, 20e6, 1.25e9)
+        self.assertIs(design_lowpass_sos(4, 20e6, 1.25e9), sos)
+        self.assertEqual(sos.shape, (2, 6))
+
+    def test_batch_matches_padded_lfilter(self):
+        # The previous per-capture cleanup: pad with the first sample, lfilter, drop the padding
+        b, a = signal.butter(4, 20e6, fs=1.25e9, btype='low', analog=False)
+        filtered = LowpassFilter(order=4, cutoff=20e6, fs=1.25e9).apply(self.stack)
+        for waveform, result in zip(self.stack, filtered):
+            padded = np.concatenate(([waveform[0]] * 10000, waveform))
+            expected = signal.lfilter(b, a, padded)[10000:]
+            np.testing.assert_allclose(result, expected, atol=1e-4)
+
+    def test_zero_phase_does_not_delay_edges(self):
+        filtered = LowpassFilter(zero_phase=True).apply(self.stack[0])
+        self.assertAlmostEqual(float(filtered[5001] - 1.75), 0, delta=0.2)
+        with self.assertRaises(ValueError):
+            LowpassFilter(zero_phase=True).streaming()
+
+    def test_streaming_matches_batch(self):
+        expected = LowpassFilter().apply(self.stack)
+        streamed = LowpassFilter().streaming().filter_array(self.stack, chunk_samples=3000)
+        np.testing.assert_allclose(streamed, expected, rtol=1e-5, atol=1e-5)
+
+    def test_streaming_memmap(self):
+        with tempfile.TemporaryDirectory() as directory:
+            location = os.path.join(directory, "capture.bin")
+            self.stack[0].tofile(location)
+            waveform = np.memmap(location, dtype="<f4", mode="r")
+            out = np.memmap(os.path.join(directory, "filtered.bin"), dtype="<f4", mode="w+", shape=waveform.shape)
+            StreamingLowpassFilter().filter_array(waveform, chunk_samples=4096, out=out)
+            np.testing.assert_allclose(out, LowpassFilter().apply(self.stack[0]), rtol=1e-5, atol=1e-5)
+            del waveform, out
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from Processing.WaveformProcessors import WaveformLoader
+from Processing.WaveformProcessors import waveform_loader
+
+
+def read_raw_capture(location: str) -> np.ndarray:
+    # Stands in for the compressed reader in the loader's worker processes
+    return np.fromfile(location, dtype="<f4", offset=16)
+
+
+class WaveformLoaderTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.captures = {}
+        for index, length in enumerate((1000, 1000, 1000, 600)):
+            location = os.path.join(self.directory.name, f"capture_{index}.bin")
+            samples = np.arange(length, dtype="<f4") + index * 10000
+            with open(location, "wb") as handle:
+                handle.write(b"\x00" * 16)
+                handle.write(samples.tobytes())
+            self.captures[location] = samples
+        self.locations = list(self.captures)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def loader(self, **kwargs) -> WaveformLoader:
+        return WaveformLoader(dtype="<f4", header_bytes=16, memory_budget=2 * 2 * 4000, **kwargs)
+
+    def test_open_is_memory_mapped(self):
+        waveform = self.loader().open(self.locations[0])
+        self.assertIsInstance(waveform, np.memmap)
+        self.assertFalse(waveform.flags.writeable)
+        np.testing.assert_array_equal(waveform, self.captures[self.locations[0]])
+
+    def test_plan_batches_respects_budget(self):
+        batches = self.loader().plan_batches(self.locations)
+        self.assertListEqual([len(batch) for batch in batches], [2, 2])
+        self.assertListEqual([location for batch in batches for location, _ in batch], self.locations)
+
+    def test_iter_batches_in_process(self):
+        self._check_batches(self.loader(max_workers=1))
+
+    def test_iter_batches_process_pool(self):
+        self._check_batches(self.loader(max_workers=2))
+
+    def _write_capture(self, name: str, length: int) -> str:
+        location = os.path.join(self.directory.name, name)
+        samples = np.arange(length, dtype="<f4")
+        with open(location, "wb") as handle:
+            handle.write(b"\x00" * 16)
+            handle.write(samples.tobytes())
+        self.captures[location] = samples
+        return location
+
+    def test_oversized_capture_is_memory_mapped(self):
+        # 10000 bytes do not fit half of the 16000 byte budget alongside a prefetched batch
+        self.locations.insert(1, self._write_capture("oversized.bin", 2500))
+        batches = []
+        for batch in self.loader(max_workers=2).iter_batches(self.locations):
+            batches.append([type(array) for array in batch.arrays])
+            for location, array in zip(batch.locations, batch.arrays):
+                np.testing.assert_array_equal(array, self.captures[location])
+        self.assertListEqual(batches, [[np.ndarray], [np.memmap], [np.ndarray, np.ndarray], [np.ndarray]])
+
+        # Without prefetching the whole budget is available to one batch
+        plan = self.loader(max_workers=1).plan_batches(self.locations, prefetch=False)
+        self.assertListEqual([len(batch) for batch in plan], [2, 3])
+
+    def test_compressed_batches_respect_budget(self):
+        with mock.patch.object(waveform_loader, "_read_compressed", read_raw_capture):
+            loader = self.loader(max_workers=2, compressed=True)
+            batches = list(loader.iter_batches(self.locations))
+            self.assertListEqual([batch.locations for batch in batches], [self.locations[:2], self.locations[2:]])
+            for batch in batches:
+                self.assertLessEqual(batch.nbytes, loader.batch_limit())
+
+            self.locations.append(self._write_capture("oversized.bin", 2500))
+            with self.assertRaises(ValueError):
+                list(loader.iter_batches(self.locations))
+
+    def _check_batches(self, loader: WaveformLoader):
+        loaded = []
+        for batch in loader.iter_batches(self.locations):
+            for location, array in zip(batch.locations, batch.arrays):
+                np.testing.assert_array_equal(array, self.captures[location])
+                loaded.append(location)
+            if batch.is_uniform:
+                self.assertEqual(batch.stack.shape, (len(batch.arrays), 1000))
+            else:
+                with self.assertRaises(ValueError):
+                    batch.stack
+        self.assertListEqual(loaded, self.locations)
+        self.assertEqual(batch.arrays, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+import typing as t
+
+import numpy as np
+
+from Processing.WaveformProcessors.waveform_loader import WaveformLoader, WaveformLocation
+
+MIN_MAX = "minmax"
+LTTB = "lttb"
+
+
+class Envelope(t.NamedTuple):
+    """
+    Downsampled waveform(s): `x` holds the original sample indices of the points kept and `y` their values.
+    Both are 1D for a single capture and (captures, points) for a stack.
+    """
+    x: np.ndarray
+    y: np.ndarray
+
+
+def _as_stack(waveforms: np.ndarray) -> t.Tuple[np.ndarray, bool]:
+    waveforms = np.asarray(waveforms)
+    if waveforms.ndim == 1:
+        return waveforms[np.newaxis, :], True
+    if waveforms.ndim != 2:
+        raise ValueError(f"Expected a 1D capture or a 2D (captures, samples) stack, got {waveforms.ndim} dimensions")
+    return waveforms, False
+
+
+def _unstack(envelope: Envelope, single: bool) -> Envelope:
+    return Envelope(x=envelope.x[0], y=envelope.y[0]) if single else envelope
+
+
+def _passthrough(stack: np.ndarray) -> Envelope:
+    x = np.broadcast_to(np.arange(stack.shape[1]), stack.shape)
+    return Envelope(x=np.array(x), y=np.array(stack))
+
+
+def _envelope_bins(stack: np.ndarray, bin_size: int, start: int = 0) -> Envelope:
+    """
+    Min/max of every `bin_size` samples of `stack`, which must hold a whole number of bins.  Each bin contributes
+    two points, kept in their original order.
+    """
+    captures, samples = stack.shape
+    bins = stack.reshape(captures, samples // bin_size, bin_size)
+    first = bins.argmin(axis=2)
+    second = bins.argmax(axis=2)
+    return _ordered_pairs(stack, first, second, bin_starts=start + np.arange(samples // bin_size) * bin_size,
+                          offset=start)
+
+
+def _ordered_pairs(stack: np.ndarray, first: np.ndarray, second: np.ndarray, bin_starts: np.ndarray,
+                   offset: int) -> Envelope:
+    low = np.minimum(first, second) + bin_starts
+    high = np.maximum(first, second) + bin_starts
+    x = np.stack((low, high), axis=2).reshape(stack.shape[0], -1)
+    y = np.take_along_axis(stack, x - offset, axis=1)
+    return Envelope(x=x, y=y)
+
+
+def min_max_envelope(waveforms: np.ndarray, size: int = 1000) -> Envelope:
+    """
+    Reduce equal-length captures to `size` points each: the samples are split into `size // 2` bins and the
+    minimum and maximum of every bin are kept.  The whole stack is reduced with one reshape, and samples that do
+    not fill a whole bin are folded into the last bin.
+    """
+    stack, single = _as_stack(waveforms)
+    bin_count = size // 2
+    samples = stack.shape[1]
+    if bin_count < 1:
+        raise ValueError("size must be at least 2")
+    if samples <= size:
+        return _unstack(_passthrough(stack), single)
+
+    bin_size = samples // bin_count
+    body_samples = (bin_count - 1) * bin_size
+    body = _envelope_bins(stack[:, :body_samples], bin_size=bin_size)
+    tail = stack[:, body_samples:]
+    tail_envelope = _ordered_pairs(tail, tail.argmin(axis=1)[:, np.newaxis], tail.argmax(axis=1)[:, np.newaxis],
+                                   bin_starts=np.array([body_samples]), offset=body_samples)
+    envelope = Envelope(x=np.concatenate((body.x, tail_envelope.x), axis=1),
+                        y=np.concatenate((body.y, tail_envelope.y), axis=1))
+    return _unstack(envelope, single)
+
+
+def min_max_envelope_streaming(waveforms: np.ndarray, size: int = 1000, chunk_samples: int = 1 << 22) -> Envelope:
+    """
+    Same result as `min_max_envelope`, computed `chunk_samples` at a time (rounded to whole bins) so a memmapped
+    capture or stack is paged in chunk by chunk instead of all at once.
+    """
+    stack, single = _as_stack(waveforms)
+    bin_count = size // 2
+    samples = stack.shape[1]
+    if bin_count < 1:
+        raise ValueError("size must be at least 2")
+    if samples <= size:
+        return _unstack(_passthrough(stack), single)
+
+    bin_size = samples // bin_count
+    body_samples = (bin_count - 1) * bin_size
+    step = max(chunk_samples // bin_size, 1) * bin_size
+    parts = [_envelope_bins(np.asarray(stack[:, start:min(start + step, body_samples)]), bin_size=bin_size,
+                            start=start)
+             for start in range(0, body_samples, step)]
+    tail = np.asarray(stack[:, body_samples:])
+    parts.append(_ordered_pairs(tail, tail.argmin(axis=1)[:, np.newaxis], tail.argmax(axis=1)[:, np.newaxis],
+                                bin_starts=np.array([body_samples]), offset=body_samples))
+    envelope = Envelope(x=np.concatenate([part.x for part in parts], axis=1),
+                        y=np.concatenate([part.y for part in parts], axis=1))
+    return _unstack(envelope, single)
+
+
+def lttb(waveforms: np.ndarray, size: int = 1000) -> Envelope:
+    """
+    Largest-Triangle-Three-Buckets decimation to `size` points.  Buckets are selected in order as the algorithm
+    requires, but each step is vectorised across every capture of the stack.
+    """
+    stack, single = _as_stack(waveforms)
+    captures, samples = stack.shape
+    if size < 3:
+        raise ValueError("size must be at least 3")
+    if samples <= size:
+        return _unstack(_passthrough(stack), single)
+
+    bucket_count = size - 2
+    edges = (np.arange(bucket_count + 1) * (samples - 2) // bucket_count) + 1
+    # Average point of every bucket, used as the third vertex for the bucket before it
+    mean_x = (edges[:-1] + edges[1:] - 1) / 2
+    mean_y = np.add.reduceat(stack[:, 1:samples - 1], edges[:-1] - 1, axis=1, dtype=np.float64) / np.diff(edges)
+
+    x = np.empty((captures, size), dtype=np.int64)
+    x[:, 0] = 0
+    x[:, -1] = samples - 1
+    rows = np.arange(captures)
+    previous_x = np.zeros(captures)
+    previous_y = stack[:, 0].astype(np.float64)
+    for bucket in range(bucket_count):
+        if bucket + 1 < bucket_count:
+            third_x, third_y = mean_x[bucket + 1], mean_y[:, bucket + 1]
+        else:
+            third_x, third_y = samples - 1, stack[:, -1].astype(np.float64)
+        candidates_x = np.arange(edges[bucket], edges[bucket + 1])
+        candidates_y = stack[:, edges[bucket]:edges[bucket + 1]].astype(np.float64)
+        area = np.abs((previous_x[:, np.newaxis] - third_x) * (candidates_y - previous_y[:, np.newaxis]) -
+                      (previous_x[:, np.newaxis] - candidates_x) * (third_y - previous_y)[:, np.newaxis])
+        chosen = area.argmax(axis=1)
+        x[:, bucket + 1] = candidates_x[chosen]
+        previous_x = candidates_x[chosen].astype(np.float64)
+        previous_y = candidates_y[rows, chosen]
+    return _unstack(Envelope(x=x, y=np.take_along_axis(stack, x, axis=1)), single)
+
+
+METHODS = {
+    MIN_MAX: min_max_envelope,
+    LTTB: lttb,
+}
+
+
+def downsample_waveforms(waveforms: t.Sequence[np.ndarray], size: int = 1000, method: str = MIN_MAX) \
+        -> t.List[Envelope]:
+    """
+    Downsample ragged captures: captures of the same length are stacked and reduced together, and the envelopes
+    are returned in input order.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}', expected one of {list(METHODS)}")
+    by_length: t.Dict[int, t.List[int]] = {}
+    for index, waveform in enumerate(waveforms):
+        by_length.setdefault(len(waveform), []).append(index)
+
+    envelopes: t.List[t.Optional[Envelope]] = [None] * len(waveforms)
+    for indices in by_length.values():
+        stacked = METHODS[method](np.stack([waveforms[index] for index in indices]), size=size)
+        for row, index in enumerate(indices):
+            envelopes[index] = Envelope(x=stacked.x[row], y=stacked.y[row])
+    return envelopes
+
+
+def downsample_locations(locations: t.Iterable[WaveformLocation], size: int = 1000, method: str = MIN_MAX,
+                         loader: t.Optional[WaveformLoader] = None) -> t.List[Envelope]:
+    """
+    Load captures batch by batch with `loader` and downsample each batch; a uniform batch is reduced straight from
+    its shared memory stack.
+    """
+    loader = loader or WaveformLoader()
+    envelopes = []
+    for batch in loader.iter_batches(locations):
+        if batch.is_uniform and batch.arrays:
+            stacked = METHODS[method](batch.stack, size=size)
+            envelopes.extend(Envelope(x=x, y=y) for x, y in zip(stacked.x, stacked.y))
+        else:
+            envelopes.extend(downsample_waveforms(batch.arrays, size=size, method=method))
+    return envelopes
+
+
+def overlay_line(envelopes: t.Sequence[Envelope]) -> Envelope:
+    """
+    Join envelopes into one NaN-separated line so an overlay of many captures is drawn with a single plot call.
+    """
+    if not envelopes:
+        return Envelope(x=np.empty(0), y=np.empty(0))
+    separator = np.array([np.nan])
+    x = np.concatenate([part for envelope in envelopes for part in (envelope.x.astype(np.float64), separator)])
+    y = np.concatenate([part for envelope in envelopes for part in (envelope.y.astype(np.float64), separator)])
+    return Envelope(x=x[:-1], y=y[:-1])
@@ -0,0 +1,103 @@
+import functools
+import typing as t
+
+import numpy as np
+from scipy import signal
+
+from config import Config
+
+
+@functools.lru_cache(maxsize=64)
+def design_lowpass_sos(order: int, cutoff: float, fs: float) -> np.ndarray:
+    """
+    Butterworth low-pass filter as second-order sections.  Designs are cached and shared, so do not modify the
+    returned array.
+    """
+    return signal.butter(order, cutoff, fs=fs, btype="low", analog=False, output="sos")
+
+
+@functools.lru_cache(maxsize=64)
+def _unit_state(order: int, cutoff: float, fs: float) -> np.ndarray:
+    zi = signal.sosfilt_zi(design_lowpass_sos(order, cutoff, fs))
+    zi.setflags(write=False)
+    return zi
+
+
+def _steady_state(sos_key: t.Tuple[int, float, float], first_samples: np.ndarray) -> np.ndarray:
+    """
+    Filter state for inputs that have been at `first_samples` forever, shaped for `sosfilt` along the last axis.
+    This replaces prepending copies of the first sample before filtering.
+    """
+    zi = _unit_state(*sos_key)
+    first_samples = np.asarray(first_samples, dtype=np.float64)
+    return zi.reshape((zi.shape[0],) + (1,) * first_samples.ndim + (2,)) * first_samples[np.newaxis, ..., np.newaxis]
+
+
+class LowpassFilter:
+    """
+    Low-pass filter stage for waveform captures.  `apply` filters a single capture or a whole (captures, samples)
+    stack in one call; `zero_phase` runs the filter forwards and backwards so edges are not delayed.  Use
+    `streaming()` to filter memmapped data chunk by chunk.
+    """
+
+    def __init__(self, order: int = Config.WAVEFORM_LOWPASS_ORDER, cutoff: float = Config.WAVEFORM_LOWPASS_CUTOFF,
+                 fs: float = Config.WAVEFORM_SAMPLE_RATE, zero_phase: bool = False):
+        self.order = order
+        self.cutoff = cutoff
+        self.fs = fs
+        self.zero_phase = zero_phase
+
+    @property
+    def key(self) -> t.Tuple[int, float, float]:
+        return self.order, float(self.cutoff), float(self.fs)
+
+    @property
+    def sos(self) -> np.ndarray:
+        return design_lowpass_sos(*self.key)
+
+    def apply(self, waveforms: np.ndarray) -> np.ndarray:
+        waveforms = np.asarray(waveforms)
+        if self.zero_phase:
+            return signal.sosfiltfilt(self.sos, waveforms, axis=-1)
+        filtered, _ = signal.sosfilt(self.sos, waveforms, axis=-1, zi=_steady_state(self.key, waveforms[..., 0]))
+        return filtered
+
+    def streaming(self) -> "StreamingLowpassFilter":
+        if self.zero_phase:
+            raise ValueError("Zero-phase filtering needs the whole capture and cannot be streamed")
+        return StreamingLowpassFilter(order=self.order, cutoff=self.cutoff, fs=self.fs)
+
+
+class StreamingLowpassFilter:
+    """
+    Causal low-pass filter that carries its state between chunks, so filtering a capture chunk by chunk gives the
+    same result as `LowpassFilter.apply` on the whole capture.  Chunks are (samples,) or (captures, samples).
+    """
+
+    def __init__(self, order: int = Config.WAVEFORM_LOWPASS_ORDER, cutoff: float = Config.WAVEFORM_LOWPASS_CUTOFF,
+                 fs: float = Config.WAVEFORM_SAMPLE_RATE):
+        self.key = (order, float(cutoff), float(fs))
+        self.sos = design_lowpass_sos(*self.key)
+        self._state: t.Optional[np.ndarray] = None
+
+    def reset(self):
+        self._state = None
+
+    def filter_chunk(self, chunk: np.ndarray) -> np.ndarray:
+        chunk = np.asarray(chunk)
+        if self._state is None:
+            self._state = _steady_state(self.key, chunk[..., 0])
+        filtered, self._state = signal.sosfilt(self.sos, chunk, axis=-1, zi=self._state)
+        return filtered
+
+    def filter_array(self, waveforms: np.ndarray, chunk_samples: int = 1 << 20,
+                     out: t.Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Filter a (memmapped) capture or stack `chunk_samples` at a time into `out`, which may itself be a memmap.
+        """
+        self.reset()
+        if out is None:
+            out = np.empty(waveforms.shape, dtype=np.result_type(waveforms.dtype, np.float32))
+        for start in range(0, waveforms.shape[-1], chunk_samples):
+            out[..., start:start + chunk_samples] = self.filter_chunk(waveforms[..., start:start + chunk_samples])
+        return out
@@ -0,0 +1,290 @@
+import logging
+import os
+import sys
+import typing as t
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from config import Config
+
+WaveformLocation = t.Union[str, Path]
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    block = shared_memory.SharedMemory(name=name)
+    # Before 3.13 attaching registers the block with the resource tracker, which would unlink it when the
+    # worker exits; the loader that created the block owns its lifetime.
+    resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+def _copy_capture(block_name: str, offset: int, location: str, dtype: str, header_bytes: int, count: int) -> int:
+    """
+    Worker: memory-map one capture and copy its samples into the shared block.  Only the sample count is sent
+    back to the parent, never the samples themselves.
+    """
+    block = _attach_shared_memory(block_name)
+    try:
+        source = np.memmap(location, dtype=dtype, mode="r", offset=header_bytes, shape=(count,))
+        target = np.ndarray((count,), dtype=dtype, buffer=block.buf, offset=offset)
+        target[:] = source
+        del source, target
+    finally:
+        block.close()
+    return count
+
+
+def _free_block(block: shared_memory.SharedMemory):
+    try:
+        block.close()
+    except BufferError:
+        pass  # views are still referenced; the mapping is released when they are garbage collected
+    block.unlink()
+
+
+def _read_compressed(location: str) -> np.ndarray:
+    from Entities.WaveformFunctions.waveform_analysis import WaveformAnalysis
+    return WaveformAnalysis.read_binary_waveform(wfm_path=Path(location), compressed=True)
+
+
+class WaveformBatch:
+    """
+    A group of captures loaded into one shared memory block.  `arrays` are views into the block, and `stack` is a
+    2D (captures, samples) view when every capture has the same length.  Call `release()` (or use the batch as a
+    context manager) once the views are no longer needed.
+    """
+
+    def __init__(self, locations: t.List[str], arrays: t.List[np.ndarray],
+                 block: t.Optional[shared_memory.SharedMemory] = None, offsets: t.Optional[t.List[int]] = None):
+        self.locations = locations
+        self.arrays = arrays
+        self.offsets = offsets
+        self._block = block
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays)
+
+    @property
+    def is_uniform(self) -> bool:
+        return len({array.shape[0] for array in self.arrays}) <= 1
+
+    @property
+    def stack(self) -> np.ndarray:
+        if not self.arrays:
+            return np.empty((0, 0))
+        if not self.is_uniform:
+            raise ValueError("Captures in this batch have different lengths")
+        first = self.arrays[0]
+        if self._block is None:
+            return first[np.newaxis] if len(self.arrays) == 1 else np.stack(self.arrays)
+        # Captures are laid out back to back in the block, so equal lengths form a contiguous 2D array
+        return np.ndarray((len(self.arrays), first.shape[0]), dtype=first.dtype, buffer=self._block.buf,
+                          offset=self.offsets[0])
+
+    def release(self):
+        self.arrays = []
+        if self._block is not None:
+            _free_block(self._block)
+            self._block = None
+
+    def __enter__(self) -> "WaveformBatch":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class WaveformLoader:
+    """
+    Loads waveform captures from `waveforms.location` paths.
+
+    Uncompressed captures are raw samples of `dtype` after `header_bytes` and are opened with `np.memmap`, so
+    `open` is zero-copy and lazy.  `iter_batches` materialises captures into shared memory across a process pool,
+    keeping the batch being consumed and the one being prefetched within `memory_budget` together; a capture too
+    large for its half of the budget is yielded on its own as a memory map instead of being copied.
+    Compressed captures are decoded with WaveformAnalysis and returned as regular arrays, with the decoded batch
+    and the decodes in flight held to the same budget; a capture that decodes to more than half of it is rejected.
+    """
+
+    def __init__(self, dtype: str = Config.WAVEFORM_DTYPE, header_bytes: int = Config.WAVEFORM_HEADER_BYTES,
+                 memory_budget: int = Config.WAVEFORM_MEMORY_BUDGET_BYTES,
+                 max_workers: t.Optional[int] = Config.WAVEFORM_LOADER_WORKERS, compressed: bool = False):
+        self.dtype = np.dtype(dtype)
+        self.header_bytes = header_bytes
+        self.memory_budget = memory_budget
+        self.max_workers = max_workers
+        self.compressed = compressed
+
+    @classmethod
+    def log(cls):
+        logging_handler = logging.getLogger(cls.__name__)
+        return logging_handler
+
+    def sample_count(self, location: WaveformLocation) -> int:
+        return (os.path.getsize(location) - self.header_bytes) // self.dtype.itemsize
+
+    def open(self, location: WaveformLocation) -> np.ndarray:
+        if self.compressed:
+            return _read_compressed(str(location))
+        return np.memmap(location, dtype=self.dtype, mode="r", offset=self.header_bytes,
+                         shape=(self.sample_count(location),))
+
+    def open_many(self, locations: t.Iterable[WaveformLocation]) -> t.List[np.ndarray]:
+        return [self.open(location) for location in locations]
+
+    def batch_limit(self, prefetch: bool = True) -> int:
+        # With prefetching, the next batch is loaded while the current one is still held
+        return max(self.memory_budget // 2 if prefetch else self.memory_budget, 1)
+
+    def plan_batches(self, locations: t.Iterable[WaveformLocation],
+                     prefetch: bool = True) -> t.List[t.List[t.Tuple[str, int]]]:
+        """
+        Group captures into batches within `batch_limit` (a larger capture gets a batch of its own).
+        """
+        batch_limit = self.batch_limit(prefetch=prefetch)
+        batches, batch, batch_bytes = [], [], 0
+        for location in locations:
+            location = str(location)
+            count = self.sample_count(location)
+            nbytes = count * self.dtype.itemsize
+            if batch and batch_bytes + nbytes > batch_limit:
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append((location, count))
+            batch_bytes += nbytes
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def iter_batches(self, locations: t.Iterable[WaveformLocation]) -> t.Iterator[WaveformBatch]:
+        if self.compressed:
+            yield from self._iter_compressed_batches(locations)
+            return
+
+        prefetch = self.max_workers != 1
+        batch_limit = self.batch_limit(prefetch=prefetch)
+        plan = self.plan_batches(locations, prefetch=prefetch)
+        if not prefetch:
+            for batch in plan:
+                load = self._stream_batch if self._oversized(batch, batch_limit) else self._load_batch
+                with load(batch) as loaded:
+                    yield loaded
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = None
+            try:
+                for index, batch in enumerate(plan):
+                    if self._oversized(batch, batch_limit):
+                        loaded = self._stream_batch(batch)
+                    else:
+                        current, pending = pending or self._submit_batch(batch, pool=pool), None
+                        loaded = self._finish_batch(*current)
+                    # Prefetch the next batch while the current one is consumed
+                    if index + 1 < len(plan) and not self._oversized(plan[index + 1], batch_limit):
+                        pending = self._submit_batch(plan[index + 1], pool=pool)
+                    with loaded:
+                        yield loaded
+            finally:
+                if pending is not None:
+                    for future in pending[3]:
+                        future.cancel()
+                    wait(pending[3])
+                    _free_block(pending[1])
+
+    def _oversized(self, batch: t.List[t.Tuple[str, int]], batch_limit: int) -> bool:
+        return len(batch) == 1 and batch[0][1] * self.dtype.itemsize > batch_limit
+
+    def _stream_batch(self, batch: t.List[t.Tuple[str, int]]) -> WaveformBatch:
+        # Copying the capture would exceed the budget; the memory map is paged in from the file as it is read
+        (location, count), = batch
+        self.log().debug(f"{location} exceeds the batch memory budget, yielding it memory-mapped")
+        source = np.memmap(location, dtype=self.dtype, mode="r", offset=self.header_bytes, shape=(count,))
+        return WaveformBatch(locations=[location], arrays=[source])
+
+    def _allocate(self, batch: t.List[t.Tuple[str, int]]) -> t.Tuple[shared_memory.SharedMemory, t.List[int]]:
+        offsets, total = [], 0
+        for _, count in batch:
+            offsets.append(total)
+            total += count * self.dtype.itemsize
+        return shared_memory.SharedMemory(create=True, size=max(total, 1)), offsets
+
+    def _submit_batch(self, batch: t.List[t.Tuple[str, int]], pool: ProcessPoolExecutor) \
+            -> t.Tuple[t.List[t.Tuple[str, int]], shared_memory.SharedMemory, t.List[int], t.List[Future]]:
+        block, offsets = self._allocate(batch)
+        futures = [pool.submit(_copy_capture, block.name, offset, location, self.dtype.str, self.header_bytes, count)
+                   for (location, count), offset in zip(batch, offsets)]
+        return batch, block, offsets, futures
+
+    def _finish_batch(self, batch: t.List[t.Tuple[str, int]], block: shared_memory.SharedMemory,
+                      offsets: t.List[int], futures: t.List[Future]) -> WaveformBatch:
+        try:
+            for future in futures:
+                future.result()
+        except Exception:
+            wait(futures)
+            _free_block(block)
+            raise
+        return self._views(batch, block=block, offsets=offsets)
+
+    def _load_batch(self, batch: t.List[t.Tuple[str, int]]) -> WaveformBatch:
+        block, offsets = self._allocate(batch)
+        try:
+            for (location, count), offset in zip(batch, offsets):
+                source = np.memmap(location, dtype=self.dtype, mode="r", offset=self.header_bytes, shape=(count,))
+                np.ndarray((count,), dtype=self.dtype, buffer=block.buf, offset=offset)[:] = source
+                del source
+        except Exception:
+            _free_block(block)
+            raise
+        return self._views(batch, block=block, offsets=offsets)
+
+    def _views(self, batch: t.List[t.Tuple[str, int]], block: shared_memory.SharedMemory,
+               offsets: t.List[int]) -> WaveformBatch:
+        arrays = [np.ndarray((count,), dtype=self.dtype, buffer=block.buf, offset=offset)
+                  for (_, count), offset in zip(batch, offsets)]
+        return WaveformBatch(locations=[location for location, _ in batch], arrays=arrays, block=block,
+                             offsets=offsets)
+
+    def _iter_compressed_batches(self, locations: t.Iterable[WaveformLocation]) -> t.Iterator[WaveformBatch]:
+        """
+        Decoded sizes are only known once a capture is decoded, so decodes in flight are limited to as many of the
+        largest capture seen so far as fit in half the budget, and batches are cut at the other half.
+        """
+        locations = [str(location) for location in locations]
+        workers = self.max_workers or os.cpu_count() or 1
+        batch_limit = self.batch_limit(prefetch=True)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending: t.Deque[t.Tuple[str, Future]] = deque()
+            submitted, largest = 0, 0
+            batch, arrays, batch_bytes = [], [], 0
+            try:
+                while submitted < len(locations) or pending:
+                    in_flight = max(min(workers, batch_limit // largest), 1) if largest else 1
+                    while submitted < len(locations) and len(pending) < in_flight:
+                        pending.append((locations[submitted], pool.submit(_read_compressed, locations[submitted])))
+                        submitted += 1
+                    location, future = pending.popleft()
+                    array = future.result()
+                    if array.nbytes > batch_limit:
+                        raise ValueError(f"{location} decodes to {array.nbytes} bytes, more than half of the "
+                                         f"{self.memory_budget} byte waveform memory budget")
+                    largest = max(largest, array.nbytes)
+                    if batch and batch_bytes + array.nbytes > batch_limit:
+                        yield WaveformBatch(locations=batch, arrays=arrays)
+                        batch, arrays, batch_bytes = [], [], 0
+                    batch.append(location)
+                    arrays.append(array)
+                    batch_bytes += array.nbytes
+                if batch:
+                    yield WaveformBatch(locations=batch, arrays=arrays)
+            finally:
+                for _, future in pending:
+                    future.cancel()
@@ -1,4 +1,27 @@
-from .dataprocessing_pipeline_usecase import DataProcessingPipeline
-from .dataprocessor_usecase import DataFrameProcessor, DataProcessor, ModifiedDataFrameProcessor, NewDataFrameProcessor
-from .processing_usecase import ProcessingUseCase
-from .processing_responses import ProcessorResponseFailure, ProcessorResponseSuccess
+from lazy_imports import lazy_exports
+
+# Submodules are imported on first use, so importing the package does not load pandas, requests or pymongo
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "DataProcessingPipeline": ".dataprocessing_pipeline_usecase",
+    "PipelineSheets": ".dataprocessing_pipeline_usecase",
+    "ParallelPipelineExecutor": ".pipeline_executor",
+    "ProcessorGraph": ".pipeline_executor",
+    "DataFrameProcessor": ".dataprocessor_usecase",
+    "DataProcessor": ".dataprocessor_usecase",
+    "ModifiedDataFrameProcessor": ".dataprocessor_usecase",
+    "NewDataFrameProcessor": ".dataprocessor_usecase",
+    "ProcessingUseCase": ".processing_usecase",
+    "ProcessorResponseFailure": ".processing_responses",
+    "ProcessorResponseSuccess": ".processing_responses",
+    "PipelineResultCache": ".result_cache",
+    "is_cacheable": ".result_cache",
+    "request_hash": ".result_cache",
+    "DtypeNormalizer": ".dtype_normalizer",
+    "NormalizationReport": ".dtype_normalizer",
+    "IncrementalRunidCache": ".incremental_cache",
+    "PipelineRequestObject": ".pipeline_request",
+    "InvalidPipelineRequest": ".pipeline_request",
+    "PROCESSORS": ".processor_registry",
+    "create_processors": ".processor_registry",
+    "configure_copy_on_write": ".pandas_options",
+})
@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from config import Config
+from Processing.RepoProcessors import AsyncRepositoryClient, RepositoryProcessor
+from Processing.RepoProcessors.stub_repository import StubRepository, StubRepositoryServer
+from Processing.TestDataPipelines import OverviewDataProcessingPipeline
+
+
+def repository_dataframe() -> pd.DataFrame:
+    rows = []
+    for runid in range(6000, 6006):
+        for testpoint in ("V3P3", "V5P0"):
+            for capture in range(3):
+                rows.append({"runid": runid, "project": "Clara Peak", "test_category": "Aux To Main",
+                             "status.status": "Complete", "waveforms.testpoint": testpoint,
+                             "waveforms.capture": capture, "waveforms.max": 3.3 + capture * 0.01,
+                             "waveforms.min": -0.01 * capture,
+                             "waveforms.location": f"/captures/{runid}/{testpoint}/{capture}.bin"})
+    return pd.DataFrame(rows)
+
+
+class AsyncPipelineTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.dataframe = repository_dataframe()
+        cls.repository = StubRepository({"waveform_processor": cls.dataframe})
+        cls.server = StubRepositoryServer(cls.repository).start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.stop()
+
+    def setUp(self) -> None:
+        self.url_patch = mock.patch.object(Config, "REPOSITORY_URL", self.server.host_url)
+        self.url_patch.start()
+        self.repository.requests.clear()
+        self.request = {"product": "Clara Peak", "runid_status": ["Complete"], "runid_list": list(range(6000, 6006))}
+
+    def tearDown(self) -> None:
+        self.url_patch.stop()
+
+    def test_async_client(self):
+        async def post():
+            client = AsyncRepositoryClient(retries=0)
+            try:
+                return await client.post(self.server.url_for("waveform_processor"), json_request=self.request,
+                                         headers={"Accept": "application/json"})
+            finally:
+                await client.close()
+
+        response = asyncio.run(post())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("application/json", response.headers["content-type"])
+
+    def test_execute_async_matches_execute(self):
+        for columnar in (True, False):
+            for shard_size in (0, 4):
+                processor = RepositoryProcessor(url=self.server.url_for("waveform_processor"), columnar=columnar,
+                                                shard_size=shard_size)
+                expected = processor.execute(json_request=self.request)
+                response = asyncio.run(processor.execute_async(json_request=self.request))
+                pd.testing.assert_frame_equal(response.dataframe, expected.dataframe)
+
+        missing = RepositoryProcessor(url=self.server.url_for("unknown"))
+        self.assertFalse(asyncio.run(missing.execute_async(json_request=self.request)))
+
+    def test_concurrent_requests_match_process_data(self):
+        requests = [dict(self.request, runid_list=[runid]) for runid in range(6000, 6006)]
+
+        async def run_all():
+            return await asyncio.gather(*(OverviewDataProcessingPipeline().process_data_async(json_request=request)
+                                          for request in requests))
+
+        for request, sheets in zip(requests, asyncio.run(run_all())):
+            expected = OverviewDataProcessingPipeline().process_data(json_request=request)
+            self.assertListEqual(list(sheets), list(expected))
+            for name, dataframe in expected.items():
+                pd.testing.assert_frame_equal(sheets[name], dataframe)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from Processing import DataFrameProcessor, DataProcessingPipeline, ModifiedDataFrameProcessor, NewDataFrameProcessor
+from Processing.pandas_options import configure_copy_on_write
+from test_pipeline_executor import StaticRepositoryProcessor
+
+
+class InPlaceProcessor(ModifiedDataFrameProcessor):
+
+    def __init__(self, name: str):
+        super(InPlaceProcessor, self).__init__()
+        self.dataframe_name = name
+
+    def _process_dataframe(self, dataframe):
+        dataframe.loc[:, "SomeColumn"] = -1
+        return super(InPlaceProcessor, self)._process_dataframe(dataframe)
+
+
+class SnapshotProcessor(DataFrameProcessor):
+
+    def __init__(self, name: str, barrier: threading.Barrier = None):
+        super(SnapshotProcessor, self).__init__()
+        self.dataframe_name = name
+        self.barrier = barrier
+
+    def _process_dataframe(self, dataframe):
+        if self.barrier is not None:
+            self.barrier.wait(timeout=5)
+        return dataframe.assign(Snapshot=dataframe["SomeColumn"].sum())
+
+
+class CopyOnWriteTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dataframe = pd.DataFrame({"SomeColumn": np.arange(1, 5), "Column1": 1, "Column2": 2})
+
+    def pipeline(self, processors, parallel: bool) -> DataProcessingPipeline:
+        pipeline = DataProcessingPipeline(parallel=parallel)
+        pipeline.normalizer = None
+        pipeline.processors = [StaticRepositoryProcessor(self.dataframe)] + processors
+        return pipeline
+
+    def test_mutating_processor_does_not_leak(self):
+        for parallel in (False, True):
+            for cow in (False, True):
+                with self.subTest(parallel=parallel, copy_on_write=cow):
+                    processors = [InPlaceProcessor("modified"), SnapshotProcessor("snapshot")]
+                    with pd.option_context("mode.copy_on_write", cow):
+                        sheets = self.pipeline(processors, parallel=parallel).process_data({})
+                    self.assertEqual(sheets["snapshot"]["Snapshot"].iloc[0], 10)
+                    self.assertListEqual(sheets["modified"]["ModifiedColumn"].tolist(), [-2] * 4)
+                    self.assertListEqual(self.dataframe["SomeColumn"].tolist(), [1, 2, 3, 4])
+
+    def test_no_deep_copy_under_copy_on_write(self):
+        with pd.option_context("mode.copy_on_write", True), \
+                mock.patch.object(pd.DataFrame, "copy", autospec=True, side_effect=pd.DataFrame.copy) as copy:
+            sheets = self.pipeline([NewDataFrameProcessor(), SnapshotProcessor("snapshot")],
+                                   parallel=False).process_data({})
+        self.assertListEqual(sheets[None]["NewColumn"].tolist(), [3] * 4)
+        # deep=None is pandas' lazy copy under copy-on-write
+        deep_copies = [call for call in copy.call_args_list
+                       if len(call.args) < 2 and call.kwargs.get("deep", True) is True]
+        self.assertListEqual(deep_copies, [])
+
+    def test_option_is_set_for_the_process(self):
+        previous = pd.get_option("mode.copy_on_write")
+        self.addCleanup(pd.set_option, "mode.copy_on_write", previous)
+        configure_copy_on_write(True)
+        options = []
+        # Runs on other threads see the option without setting it themselves
+        thread = threading.Thread(target=lambda: options.append(pd.get_option("mode.copy_on_write")))
+        thread.start()
+        thread.join()
+        self.assertListEqual(options, [True])
+        self.pipeline([SnapshotProcessor("snapshot")], parallel=True).process_data({})
+        self.assertIs(pd.get_option("mode.copy_on_write"), True)
+        configure_copy_on_write(False)
+        self.assertIs(pd.get_option("mode.copy_on_write"), False)
+
+    def test_default_is_set_before_pandas_is_imported(self):
+        # The web app configures the option before any request imports pandas
+        with mock.patch.dict("sys.modules", {"pandas": None}), mock.patch.dict("os.environ", {}):
+            configure_copy_on_write(True)
+            self.assertEqual(os.environ["PANDAS_COPY_ON_WRITE"], "1")
+            configure_copy_on_write(False)
+            self.assertEqual(os.environ["PANDAS_COPY_ON_WRITE"], "0")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from Processing.TestDataProcessors import WaveformCombinationProcessor
+from Processing.dtype_normalizer import DtypeNormalizer
+from ResultFormatting import StreamingXLSXFormatter
+
+
+def repository_frame(rows: int = 6000) -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    return pd.DataFrame({
+        "runid": rng.integers(6000, 7000, size=rows),
+        "project": "Clara Peak",
+        "test_category": rng.choice(["Main To Aux", "Off to Aux and Main"], size=rows),
+        "status.status": "Complete",
+        "waveforms.testpoint": rng.choice([f"TP{index}" for index in range(40)], size=rows),
+        "waveforms.capture": rng.integers(0, 50, size=rows),
+        "waveforms.max": np.round(rng.normal(3.3, 0.05, size=rows), 4),
+        "waveforms.min": np.round(rng.normal(0.0, 0.01, size=rows), 4),
+        "waveforms.steady_state_mean": np.where(np.arange(rows) % 9 == 0, np.nan, 3.29),
+        "waveforms.location": [f"/captures/{index}.bin" for index in range(rows)],
+        "comment": [f"note {index}" for index in range(rows)],
+    })
+
+
+class DtypeNormalizerTestCase(unittest.TestCase):
+
+    def test_schema_conversions(self):
+        normalizer = DtypeNormalizer(arrow_strings=False)
+        normalized = normalizer.normalize(repository_frame())
+        self.assertIsInstance(normalized["waveforms.testpoint"].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(normalized["status.status"].dtype, pd.CategoricalDtype)
+        # Measurements rounded to decimals have no exact float32 value, so they are kept
+        self.assertEqual(normalized["waveforms.max"].dtype, np.float64)
+        self.assertEqual(normalized["waveforms.steady_state_mean"].dtype, np.float64)
+        self.assertEqual(normalized["runid"].dtype, np.int16)
+        self.assertEqual(normalized["waveforms.capture"].dtype, np.int8)
+        # High-cardinality strings outside the schema are left alone
+        self.assertEqual(normalized["comment"].dtype, object)
+
+        report = normalizer.last_report
+        self.assertGreater(report.ratio, 2)
+        self.assertEqual(report.conversions["runid"], ("int64", "int16"))
+
+    def test_exact_floats_are_downcast(self):
+        frame = pd.DataFrame({"waveforms.max": [3.25, 0.5, np.nan], "waveforms.min": [3.3, 0.1, 0.0]})
+        normalized = DtypeNormalizer().normalize(frame)
+        self.assertEqual(normalized["waveforms.max"].dtype, np.float32)
+        self.assertEqual(normalized["waveforms.min"].dtype, np.float64)
+        self.assertEqual(DtypeNormalizer(float_tolerance=1e-6).normalize(frame)["waveforms.min"].dtype, np.float32)
+
+    def test_unsafe_float_downcast_is_skipped(self):
+        frame = pd.DataFrame({"waveforms.max": [1e300, 1.0], "waveforms.min": [1.0 + 1e-9, 2.0]})
+        normalized = DtypeNormalizer(float_tolerance=1e-12).normalize(frame)
+        self.assertEqual(normalized["waveforms.max"].dtype, np.float64)
+        self.assertEqual(normalized["waveforms.min"].dtype, np.float64)
+
+    def test_input_is_not_modified(self):
+        frame = repository_frame(100)
+        DtypeNormalizer().normalize(frame)
+        self.assertEqual(frame["waveforms.testpoint"].dtype, object)
+
+    def test_combination_matches_on_normalized_frame(self):
+        frame = repository_frame()
+        expected = WaveformCombinationProcessor()._process_dataframe(frame)
+        result = WaveformCombinationProcessor()._process_dataframe(DtypeNormalizer().normalize(frame))
+        self.assertEqual(len(result), len(expected))
+        self.assertListEqual(result["waveforms.testpoint"].astype(str).tolist(),
+                             expected["waveforms.testpoint"].tolist())
+        np.testing.assert_allclose(result["waveforms.max_mean"], expected["waveforms.max_mean"], rtol=1e-6)
+
+    def test_report_values_match_unnormalized_path(self):
+        frame = repository_frame(500)
+        frame["waveforms.max"] = 3.3
+        frame["waveforms.min"] = 0.1
+        workbooks = []
+        for normalizer in (None, DtypeNormalizer(arrow_strings=False)):
+            dataframe = normalizer.normalize(frame) if normalizer is not None else frame
+            sheets = {"Combination Waveforms": WaveformCombinationProcessor()._process_dataframe(dataframe)}
+            data = StreamingXLSXFormatter().format_bytesIO(sheets=sheets)
+            workbooks.append(pd.read_excel(BytesIO(data), sheet_name=None))
+        for name, expected in workbooks[0].items():
+            pd.testing.assert_frame_equal(workbooks[1][name], expected, check_exact=True)
+        self.assertListEqual(workbooks[1]["Combination Waveforms"]["waveforms.max_max"].unique().tolist(), [3.3])
+        self.assertListEqual(workbooks[1]["Combination Waveforms"]["waveforms.min_min"].unique().tolist(), [0.1])
+
+
+if __name__ == '__main__':
+    unittest.main()
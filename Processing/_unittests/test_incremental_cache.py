@@ -0,0 +1,124 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from Processing import DataProcessingPipeline, IncrementalRunidCache, PipelineResultCache
+from Processing.processing_responses import ProcessorResponseSuccess
+from Processing.TestDataProcessors import NoProcessor, WaveformCombinationProcessor
+from Processing.dtype_normalizer import DtypeNormalizer
+from test_dtype_normalizer import repository_frame
+from test_pipeline_executor import StaticRepositoryProcessor
+
+
+class FilteringRepositoryProcessor(StaticRepositoryProcessor):
+    """
+    Serves the rows of the requested runids and records which runids were asked for.
+    """
+
+    def __init__(self, dataframe: pd.DataFrame):
+        super(FilteringRepositoryProcessor, self).__init__(dataframe)
+        self.requested = []
+
+    def execute(self, json_request):
+        self.requested.append(list(json_request["runid_list"]))
+        rows = self.dataframe[self.dataframe["runid"].isin(json_request["runid_list"])].reset_index(drop=True)
+        return ProcessorResponseSuccess(dataframe=rows, title="repository response")
+
+
+class IncrementalRunidCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.frame = repository_frame()
+        self.frame["runid"] = 6000 + self.frame["runid"] % 40
+        self.frame.loc[::11, "waveforms.min"] = np.nan
+        self.runids = sorted(self.frame["runid"].unique().tolist())
+        self.repository = FilteringRepositoryProcessor(self.frame)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def pipeline(self, incremental: bool = True, parallel: bool = False,
+                 group_by: str = "runid") -> DataProcessingPipeline:
+        pipeline = DataProcessingPipeline(parallel=parallel)
+        pipeline.normalizer = DtypeNormalizer(arrow_strings=False)
+        pipeline.processors = [self.repository, WaveformCombinationProcessor(group_by=group_by), NoProcessor()]
+        pipeline.incremental_cache = None
+        if incremental:
+            pipeline.incremental_cache = IncrementalRunidCache(PipelineResultCache(self.directory.name))
+        return pipeline
+
+    @staticmethod
+    def request(runids) -> dict:
+        return {"product": "Clara Peak", "runid_status": ["Complete"], "runid_list": list(runids)}
+
+    def test_only_new_runids_are_fetched(self):
+        self.pipeline().process_data(self.request(self.runids[:-1]))
+        sheets = self.pipeline().process_data(self.request(self.runids))
+        self.assertListEqual(self.repository.requested, [self.runids[:-1], self.runids[-1:]])
+        self.assertEqual(len(sheets["Repository Data"]), len(self.frame))
+
+        expected = self.pipeline(incremental=False).process_data(self.request(self.runids))
+        result, reference = sheets["Combination Waveforms"], expected["Combination Waveforms"]
+        self.assertListEqual(result.columns.tolist(), reference.columns.tolist())
+        for column in reference.columns:
+            if pd.api.types.is_float_dtype(reference[column]):
+                np.testing.assert_allclose(result[column], reference[column], rtol=1e-6, atol=1e-6,
+                                           err_msg=column)
+            else:
+                self.assertListEqual(result[column].astype(str).tolist(), reference[column].astype(str).tolist())
+
+    def test_partials_are_computed_on_normalized_rows(self):
+        pipeline = self.pipeline()
+        pipeline.process_data(self.request(self.runids[:1]))
+        entry = pipeline.incremental_cache.cache.get_sheets(
+            pipeline.incremental_cache.runid_key(pipeline, self.request(self.runids[:1]), self.runids[0]))
+        self.assertIsInstance(entry["repository"]["waveforms.testpoint"].dtype, pd.CategoricalDtype)
+        expected = self.pipeline(incremental=False).process_data(self.request(self.runids[:1]))
+        pd.testing.assert_frame_equal(entry["Combination Waveforms"][expected["Combination Waveforms"].columns],
+                                      expected["Combination Waveforms"], check_dtype=False)
+
+    def test_only_new_runids_are_normalized(self):
+        self.pipeline().process_data(self.request(self.runids[:-1]))
+        pipeline = self.pipeline()
+        with mock.patch.object(pipeline.normalizer, "normalize", wraps=pipeline.normalizer.normalize) as normalize:
+            sheets = pipeline.process_data(self.request(self.runids))
+        self.assertEqual(normalize.call_count, 1)
+        self.assertListEqual(normalize.call_args.args[0]["runid"].unique().tolist(), self.runids[-1:])
+        repository_data = sheets["Repository Data"]
+        self.assertIsInstance(repository_data["waveforms.testpoint"].dtype, pd.CategoricalDtype)
+        self.assertListEqual(sorted(repository_data["waveforms.testpoint"].astype(str).unique()),
+                             sorted(self.frame["waveforms.testpoint"].unique()))
+
+    def test_processor_configuration_is_part_of_the_key(self):
+        self.pipeline().process_data(self.request(self.runids[:3]))
+        sheets = self.pipeline(group_by="testpoint").process_data(self.request(self.runids[:3]))
+        self.assertListEqual(self.repository.requested, [self.runids[:3]] * 2)
+        expected = self.pipeline(incremental=False, group_by="testpoint").process_data(self.request(self.runids[:3]))
+        self.assertEqual(len(sheets["Combination Waveforms"]), len(expected["Combination Waveforms"]))
+
+    def test_parallel_pipeline(self):
+        self.pipeline(parallel=True).process_data(self.request(self.runids[:10]))
+        sheets = self.pipeline(parallel=True).process_data(self.request(self.runids[5:15]))
+        self.assertListEqual(self.repository.requested[-1], self.runids[10:15])
+        locations = sheets["Combination Waveforms"]["waveforms.location"].str.split("; ")
+        self.assertEqual(locations.str.len().sum(), self.frame["runid"].isin(self.runids[5:15]).sum())
+
+    def test_empty_runids_are_not_cached(self):
+        unknown = max(self.runids) + 1
+        self.pipeline().process_data(self.request([self.runids[0], unknown]))
+        self.pipeline().process_data(self.request([self.runids[0], unknown]))
+        self.assertListEqual(self.repository.requested, [[self.runids[0], unknown], [unknown]])
+
+    def test_requests_that_can_change_are_not_cached(self):
+        request = dict(self.request(self.runids[:3]), runid_status=["Complete", "Running"])
+        self.pipeline().process_data(request)
+        self.pipeline().process_data(request)
+        self.assertListEqual(self.repository.requested, [self.runids[:3]] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
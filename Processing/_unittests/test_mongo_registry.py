@@ -0,0 +1,52 @@
+import os
+import unittest
+from unittest import mock
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+from Entities.Entities.entities import TestpointEntity
+from Processing.mongo_registry import MongoClientRegistry, cursor_batches
+from Processing.processing_usecase import ProcessingUseCase, TestpointQueryRequestObject
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class MongoClientRegistryTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        MongoClientRegistry.set_client_factory(mongomock.MongoClient)
+
+    def tearDown(self) -> None:
+        MongoClientRegistry.close_all()
+        MongoClientRegistry.set_client_factory(None)
+
+    def test_client_is_reused(self):
+        self.assertIs(MongoClientRegistry.get_client(), MongoClientRegistry.get_client())
+
+    def test_client_is_recreated_after_fork(self):
+        client = MongoClientRegistry.get_client()
+        with mock.patch.object(os, "getpid", return_value=os.getpid() + 1):
+            self.assertIsNot(MongoClientRegistry.get_client(), client)
+
+    def test_query_testpoints_uses_registry(self):
+        collection = MongoClientRegistry.get_database()[TestpointEntity.get_type()]
+        collection.insert_many([{"product": "Clara Peak", "testpoint": f"TP{i}"} for i in range(5)])
+
+        uc = ProcessingUseCase()
+        uc.batch_size = 2
+        request = TestpointQueryRequestObject(product="Clara Peak", testpoint_list=["TP1", "TP3"])
+        testpoints = uc.query_testpoints(testpoint_request=request)
+        self.assertCountEqual([tp.testpoint for tp in testpoints], ["TP1", "TP3"])
+
+
+class CursorBatchesTestCase(unittest.TestCase):
+
+    def test_batches(self):
+        batches = list(cursor_batches(iter([{"i": i} for i in range(5)]), batch_size=2))
+        self.assertListEqual([len(batch) for batch in batches], [2, 2, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import time
+import unittest
+
+import pandas as pd
+
+from Processing import DataFrameProcessor, DataProcessingPipeline, ParallelPipelineExecutor, ProcessorGraph
+from Processing.RepoProcessors import RepositoryProcessor
+from Processing.processing_responses import ProcessorResponseSuccess
+
+
+class StaticRepositoryProcessor(RepositoryProcessor):
+
+    def __init__(self, dataframe: pd.DataFrame):
+        super(StaticRepositoryProcessor, self).__init__(url=None)
+        self.dataframe = dataframe
+
+    def execute(self, json_request):
+        return ProcessorResponseSuccess(dataframe=self.dataframe, title="repository response")
+
+
+class SleepingProcessor(DataFrameProcessor):
+
+    def __init__(self, name: str, delay: float, input_name: str = None):
+        super(SleepingProcessor, self).__init__()
+        self.dataframe_name = name
+        self.delay = delay
+        if input_name:
+            self.input_name = input_name
+
+    def _process_dataframe(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        time.sleep(self.delay)
+        return dataframe.assign(**{self.dataframe_name: len(dataframe)})
+
+
+class ProcessorGraphTestCase(unittest.TestCase):
+
+    def test_topological_order(self):
+        graph = ProcessorGraph(processors=[SleepingProcessor("b", 0, input_name="a"),
+                                           SleepingProcessor("a", 0)])
+        self.assertListEqual(graph.topological_order(), [1, 0])
+
+    def test_unknown_input(self):
+        with self.assertRaises(ValueError):
+            ProcessorGraph(processors=[SleepingProcessor("a", 0, input_name="missing")])
+
+    def test_cycle(self):
+        with self.assertRaises(ValueError):
+            ProcessorGraph(processors=[SleepingProcessor("a", 0, input_name="b"),
+                                       SleepingProcessor("b", 0, input_name="a")])
+
+
+class ParallelPipelineExecutorTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dataframe = pd.DataFrame({"value": [1, 2, 3]})
+
+    def test_independent_processors_run_concurrently(self):
+        processors = [SleepingProcessor(f"sheet{i}", 0.2) for i in range(4)]
+        start = time.perf_counter()
+        sheets = ParallelPipelineExecutor(max_workers=4).run(processors=processors,
+                                                             repository_dataframe=self.dataframe)
+        elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, 0.6)
+        self.assertListEqual(list(sheets.keys()), ["sheet0", "sheet1", "sheet2", "sheet3"])
+
+    def test_sheet_order_is_deterministic(self):
+        processors = [SleepingProcessor("slow", 0.2), SleepingProcessor("fast", 0)]
+        sheets = ParallelPipelineExecutor().run(processors=processors, repository_dataframe=self.dataframe)
+        self.assertListEqual(list(sheets.keys()), ["slow", "fast"])
+
+    def test_dependent_processor_receives_upstream_output(self):
+        processors = [SleepingProcessor("second", 0, input_name="first"), SleepingProcessor("first", 0)]
+        sheets = ParallelPipelineExecutor().run(processors=processors, repository_dataframe=self.dataframe)
+        self.assertIn("first", sheets["second"].columns)
+
+    def test_pipeline_parallel_matches_sequential(self):
+        def build(parallel):
+            pipeline = DataProcessingPipeline(parallel=parallel)
+            pipeline.processors = [StaticRepositoryProcessor(self.dataframe),
+                                   SleepingProcessor("a", 0),
+                                   SleepingProcessor("b", 0, input_name="a")]
+            return pipeline.process_data(json_request={})
+
+        sequential = build(parallel=False)
+        parallel = build(parallel=True)
+        self.assertListEqual(list(sequential.keys()), list(parallel.keys()))
+        for name in sequential:
+            pd.testing.assert_frame_equal(sequential[name], parallel[name])
+
+
+class FailingProcessor(DataFrameProcessor):
+
+    def __init__(self, name: str):
+        super(FailingProcessor, self).__init__()
+        self.dataframe_name = name
+
+    def _process_dataframe(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        raise RuntimeError(f"{self.dataframe_name} failed")
+
+
+class SequentialPipelineTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dataframe = pd.DataFrame({"value": [1, 2, 3]})
+
+    def pipeline(self, processors):
+        pipeline = DataProcessingPipeline(parallel=False)
+        pipeline.processors = [StaticRepositoryProcessor(self.dataframe)] + processors
+        return pipeline
+
+    def test_dependency_listed_after_its_consumer(self):
+        sheets = self.pipeline([SleepingProcessor("second", 0, input_name="first"),
+                                SleepingProcessor("first", 0)]).process_data(json_request={})
+        self.assertListEqual(list(sheets.keys()), ["second", "first"])
+        self.assertIn("first", sheets["second"].columns)
+
+    def test_failing_processor_is_recorded(self):
+        for parallel in (False, True):
+            with self.subTest(parallel=parallel):
+                pipeline = self.pipeline([FailingProcessor("failing"),
+                                          SleepingProcessor("dependent", 0, input_name="failing"),
+                                          SleepingProcessor("independent", 0)])
+                pipeline.parallel = parallel
+                sheets = pipeline.process_data(json_request={})
+                self.assertListEqual(list(sheets.keys()), ["independent"])
+                self.assertListEqual(sheets.failed_processors, ["failing", "dependent"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from lazy_imports import LazyRegistry
+from Processing import DataFrameProcessor, PROCESSORS, create_processors
+from Processing.RepoProcessors import RepositoryProcessor
+from Processing.TestDataPipelines import PIPELINES
+from ResultFormatting import FORMATTERS, Formatter
+
+
+class ProcessorRegistryTestCase(unittest.TestCase):
+
+    def test_registries_resolve(self):
+        for name in PROCESSORS:
+            self.assertTrue(issubclass(PROCESSORS[name], (DataFrameProcessor, RepositoryProcessor)), name)
+        for name in FORMATTERS:
+            self.assertTrue(issubclass(FORMATTERS[name], Formatter), name)
+        self.assertListEqual(list(PIPELINES), ["sequencing", "overview"])
+
+    def test_pipeline_processors(self):
+        pipeline = PIPELINES["overview"]()
+        self.assertListEqual([type(processor).__name__ for processor in pipeline.processors],
+                             pipeline.processor_names)
+        processors = create_processors(["NoProcessor", "TitleSheetProcessor"])
+        self.assertListEqual([processor.dataframe_name for processor in processors], ["Repository Data", "Title"])
+
+    def test_lazy_registry(self):
+        registry = LazyRegistry({"dumps": "json:dumps", "missing": "json:does_not_exist"})
+        self.assertFalse(registry.is_loaded("dumps"))
+        self.assertEqual(registry["dumps"]([1]), "[1]")
+        self.assertTrue(registry.is_loaded("dumps"))
+        with self.assertRaises(AttributeError):
+            registry["missing"]
+        with self.assertRaises(KeyError):
+            registry["unknown"]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+
+import pandas as pd
+
+from Processing import DataProcessingPipeline
+from Processing.processing_responses import ProcessorResponseSuccess
+from Processing.pipeline_request import InvalidPipelineRequest, PipelineRequestObject
+from Processing.request_batching import merge_requests
+from Processing.TestDataProcessors import NoProcessor, WaveformCombinationProcessor
+from Processing.dtype_normalizer import DtypeNormalizer
+from test_dtype_normalizer import repository_frame
+from test_incremental_cache import FilteringRepositoryProcessor
+
+
+def request(runids=None, **fields) -> dict:
+    json_request = dict({"product": "Clara Peak", "runid_status": ["Complete"]}, **fields)
+    if runids is not None:
+        json_request["runid_list"] = list(runids)
+    return json_request
+
+
+class RequestBatchingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = repository_frame()
+        self.frame["runid"] = 6000 + self.frame["runid"] % 10
+        self.repository = FilteringRepositoryProcessor(self.frame)
+
+    def pipeline(self, parallel: bool = False) -> DataProcessingPipeline:
+        pipeline = DataProcessingPipeline(parallel=parallel)
+        pipeline.normalizer = DtypeNormalizer(arrow_strings=False)
+        pipeline.processors = [self.repository, WaveformCombinationProcessor(group_by="runid"), NoProcessor()]
+        pipeline.incremental_cache = None
+        return pipeline
+
+    def test_merge_requests(self):
+        requests = [request([1, 2]), request([2, 3], test_category_list=["A"]), request([4], runid_status=["Running"]),
+                    request([5], test_category_list=["B"])]
+        merged = merge_requests(requests)
+        self.assertListEqual([indices for _, indices in merged], [[0, 1, 3], [2]])
+        # Only one request of the first group filters on test category, so the merged query cannot
+        self.assertDictEqual(merged[0][0], request([1, 2, 3, 5]))
+        # Requests without row filters cannot be picked out of a merged response, so they are not merged
+        self.assertListEqual(merge_requests([request([1]), request(), request()]),
+                             [(request([1]), [0]), (request(), [1]), (request(), [2])])
+
+    def test_batch_matches_single_requests(self):
+        runids = sorted(self.frame["runid"].unique().tolist())
+        requests = [request(runids[:3]), request(runids[2:6]), request(runids[-1:]), request(runids[:2])]
+        for parallel in (False, True):
+            self.repository.requested.clear()
+            batch = self.pipeline(parallel=parallel).process_batch(requests)
+            self.assertListEqual(self.repository.requested, [runids[:6] + runids[-1:]])
+            for json_request, sheets in zip(requests, batch):
+                expected = self.pipeline().process_data(json_request)
+                self.assertListEqual(list(sheets), list(expected))
+                for name, dataframe in expected.items():
+                    pd.testing.assert_frame_equal(sheets[name], dataframe, check_exact=False, rtol=1e-6, atol=1e-6)
+
+    def test_requests_without_rows_get_none(self):
+        unknown = int(self.frame["runid"].max()) + 1
+        batch = self.pipeline().process_batch([request([6000]), request([unknown])])
+        self.assertListEqual(self.repository.requested, [[6000, unknown]])
+        self.assertIsNone(batch[1])
+        pd.testing.assert_frame_equal(batch[0]["Repository Data"],
+                                      self.pipeline().process_data(request([6000]))["Repository Data"])
+
+    def test_unsplittable_response_is_queried_separately(self):
+        execute = self.repository.execute
+        # Responses without the runid column cannot be split by runid
+        self.repository.execute = lambda json_request: ProcessorResponseSuccess(
+            dataframe=execute(json_request).dataframe.drop(columns=["runid"]), title="repository response")
+        pipeline = self.pipeline()
+        pipeline.processors = [self.repository, NoProcessor()]
+        batch = pipeline.process_batch([request([6000]), request([6001])])
+        self.assertListEqual(self.repository.requested, [[6000, 6001], [6000], [6001]])
+        self.assertListEqual([len(sheets["Repository Data"]) for sheets in batch],
+                             [(self.frame["runid"] == runid).sum() for runid in (6000, 6001)])
+
+    def test_split_by_waveform_test_category(self):
+        frame = self.frame.rename(columns={"test_category": "waveforms.test_category"})
+        self.repository.dataframe = frame
+        pipeline = self.pipeline()
+        pipeline.processors = [self.repository, NoProcessor()]
+        categories = sorted(frame["waveforms.test_category"].unique())
+        requests = [request([6000, 6001], test_category_list=[category]) for category in categories]
+        batch = pipeline.process_batch(requests)
+        # The merged response is split on waveforms.test_category, without querying the requests again
+        self.assertListEqual(self.repository.requested, [[6000, 6001]])
+        for category, sheets in zip(categories, batch):
+            expected = frame[frame["runid"].isin([6000, 6001]) & (frame["waveforms.test_category"] == category)]
+            self.assertEqual(len(sheets["Repository Data"]), len(expected))
+
+    def test_request_validation(self):
+        self.assertDictEqual(PipelineRequestObject.from_dict({"product": "Clara Peak", "runid_list": [1]}).to_dict(),
+                             request([1]))
+        for invalid in ([], {}, {"product": ""}, {"product": "Clara Peak", "runid_list": [True]},
+                        {"product": "Clara Peak", "runid_list": []}, {"product": "Clara Peak", "runid_status": "x"},
+                        {"product": "Clara Peak", "runid": 6799}):
+            with self.assertRaises(InvalidPipelineRequest, msg=invalid):
+                PipelineRequestObject.from_dict(invalid)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import tempfile
+import unittest
+
+import pandas as pd
+
+from Processing import DataFrameProcessor, DataProcessingPipeline, PipelineResultCache, PipelineSheets, \
+    is_cacheable, request_hash
+from test_pipeline_executor import StaticRepositoryProcessor
+
+
+class OtherPipeline(DataProcessingPipeline):
+    pass
+
+
+class FailingProcessor(DataFrameProcessor):
+
+    def __init__(self):
+        super(FailingProcessor, self).__init__()
+        self.dataframe_name = "Failing"
+
+    def _process_dataframe(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        return None
+
+
+class RequestHashTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.request = {"product": "Clara Peak", "runid_status": ["Complete"], "runid_list": [6799, 6793]}
+
+    def test_hash_ignores_list_order(self):
+        reordered = {"runid_list": [6793, 6799, 6793], "runid_status": ["Complete"], "product": "Clara Peak"}
+        self.assertEqual(request_hash(self.request, DataProcessingPipeline),
+                         request_hash(reordered, DataProcessingPipeline))
+
+    def test_hash_depends_on_pipeline_and_version(self):
+        base = request_hash(self.request, DataProcessingPipeline)
+        self.assertNotEqual(base, request_hash(self.request, OtherPipeline))
+
+        class NewVersion(DataProcessingPipeline):
+            version = "2"
+        NewVersion.__qualname__ = DataProcessingPipeline.__qualname__
+        NewVersion.__module__ = DataProcessingPipeline.__module__
+        self.assertNotEqual(base, request_hash(self.request, NewVersion))
+
+    def test_only_complete_requests_are_cacheable(self):
+        self.assertTrue(is_cacheable(self.request))
+        self.assertFalse(is_cacheable({**self.request, "runid_status": ["Complete", "Running"]}))
+        self.assertFalse(is_cacheable({"product": "Clara Peak"}))
+        # Without an explicit runid list, new runids change the result
+        self.assertFalse(is_cacheable({"product": "Clara Peak", "runid_status": ["Complete"]}))
+
+    def test_incomplete_results_are_not_cacheable(self):
+        self.assertTrue(is_cacheable(self.request, sheets=PipelineSheets({"Title": pd.DataFrame()})))
+        self.assertFalse(is_cacheable(self.request, sheets=PipelineSheets(missing_runids=[6793])))
+        self.assertFalse(is_cacheable(self.request, sheets=PipelineSheets(failed_processors=["Sequencing"])))
+
+    def test_pipeline_reports_incomplete_results(self):
+        pipeline = DataProcessingPipeline()
+        pipeline.normalizer = None
+        pipeline.processors = [StaticRepositoryProcessor(pd.DataFrame({"runid": [6799], "value": [1.0]})),
+                               FailingProcessor()]
+        sheets = pipeline.process_data(self.request)
+        self.assertListEqual(sheets.failed_processors, ["Failing"])
+        self.assertListEqual(sheets.missing_runids, [6793])
+        self.assertFalse(is_cacheable(self.request, sheets=sheets))
+
+
+class PipelineResultCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = PipelineResultCache(directory=self.directory.name, max_bytes=250)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_bytes_round_trip(self):
+        self.assertIsNone(self.cache.get_bytes("a"))
+        self.cache.put_bytes("a", b"workbook")
+        self.assertEqual(self.cache.get_bytes("a"), b"workbook")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_sheets_round_trip(self):
+        cache = PipelineResultCache(directory=self.directory.name)
+        sheets = {"Title": pd.DataFrame({"a": [1, 2]})}
+        cache.put_sheets("a", sheets)
+        pd.testing.assert_frame_equal(cache.get_sheets("a")["Title"], sheets["Title"])
+
+    def test_size_bounded_eviction(self):
+        for key in ("a", "b", "c"):
+            self.cache.put_bytes(key, b"x" * 100)
+        self.assertLessEqual(self.cache.size(), 250)
+        self.assertIsNone(self.cache.get_bytes("a"))
+        self.assertIsNotNone(self.cache.get_bytes("c"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+from Benchmarks.synthetic import repository_payload
+from Entities.Entities.entities import RunidEntity, WaveformEntity
+from Processing import DataProcessingPipeline
+from Processing.TestDataPipelines import OverviewDataProcessingPipeline
+from Processing.TestDataProcessors import RunidStatisticsProcessor, WaveformCombinationProcessor
+from Processing.mongo_registry import MongoClientRegistry
+from Processing.processing_usecase import ProcessingUseCase, RunidStatisticsRequestObject
+from test_pipeline_executor import StaticRepositoryProcessor
+
+
+def unwound_waveforms():
+    # Documents as they leave the $lookup/$unwind stages of the runid pipeline
+    return [{"runid": runid, "project": "Clara Peak",
+             "waveforms": {"testpoint": testpoint, "test_category": "Main To Aux", "capture": capture,
+                           "max": 3.3 + capture * 0.01 + runid, "min": -0.01 * capture,
+                           "location": f"/{runid}/{testpoint}/{capture}.bin"}}
+            for runid in (1, 2) for testpoint in ("V3P3", "V5P0") for capture in range(3)]
+
+
+class FrameStatisticsUseCase:
+    """
+    Answers query_runid_statistics from a repository dataframe, the way the $group stage reduces it.
+    """
+
+    def __init__(self, dataframe: pd.DataFrame):
+        self.dataframe = dataframe
+        self.requests = []
+
+    def query_runid_statistics(self, statistics_request: RunidStatisticsRequestObject,
+                               include_locations: bool = False):
+        self.requests.append((statistics_request, include_locations))
+        rows = self.dataframe[self.dataframe["project"] == statistics_request.product]
+        if statistics_request.runid_list:
+            rows = rows[rows["runid"].isin(statistics_request.runid_list)]
+        if statistics_request.test_category_list:
+            rows = rows[rows["waveforms.test_category"].isin(statistics_request.test_category_list)]
+        grouped = rows.groupby(["runid", "waveforms.test_category", "waveforms.testpoint"], sort=True)
+        statistics = pd.DataFrame({"project": grouped["project"].first(), "count": grouped.size()})
+        for measurement in ("max", "min"):
+            values = grouped[f"waveforms.{measurement}"]
+            for statistic in ("min", "mean", "max", "sum", "count"):
+                statistics[f"waveforms.{measurement}_{statistic}"] = values.agg(statistic)
+        if include_locations:
+            statistics["waveforms.location"] = grouped["waveforms.location"].agg(list)
+        return statistics.reset_index()
+
+
+class OverviewServerStatisticsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = repository_payload(runids=4, testpoints=6, captures=5)
+        self.frame.loc[::7, "waveforms.max"] = np.nan
+        self.request = {"product": "Clara Peak", "runid_status": ["Complete"]}
+
+    def pipeline(self, server_statistics: bool) -> OverviewDataProcessingPipeline:
+        pipeline = OverviewDataProcessingPipeline(parallel=False, server_statistics=server_statistics)
+        pipeline.processors[0] = StaticRepositoryProcessor(self.frame)
+        pipeline.normalizer = None
+        pipeline.incremental_cache = None
+        return pipeline
+
+    def test_pipeline_uses_server_statistics(self):
+        pipeline = self.pipeline(server_statistics=True)
+        processor = pipeline.processors[1]
+        self.assertIsInstance(processor, RunidStatisticsProcessor)
+        processor.use_case = FrameStatisticsUseCase(self.frame)
+        sheet = pipeline.process_data(self.request)["Combination Waveforms"]
+        # One query for every runid of the request
+        self.assertEqual(len(processor.use_case.requests), 1)
+        statistics_request, include_locations = processor.use_case.requests[0]
+        self.assertEqual(statistics_request.product, "Clara Peak")
+        self.assertTrue(include_locations)
+
+        local = self.pipeline(server_statistics=False)
+        self.assertIsInstance(local.processors[1], WaveformCombinationProcessor)
+        expected = local.process_data(self.request)["Combination Waveforms"]
+        pd.testing.assert_frame_equal(sheet, expected, check_exact=False, rtol=1e-9)
+
+    def test_statistics_without_locations(self):
+        processor = RunidStatisticsProcessor(use_case=FrameStatisticsUseCase(self.frame), locations=False)
+        sheet = processor._process_dataframe(self.frame)
+        self.assertFalse(processor.use_case.requests[0][1])
+        self.assertNotIn("waveforms.location", sheet.columns)
+        expected = WaveformCombinationProcessor()._process_dataframe(self.frame)
+        pd.testing.assert_frame_equal(sheet, expected.drop(columns=["waveforms.location"]), check_exact=False,
+                                      rtol=1e-9)
+
+    def test_repository_is_not_queried_for_statistics_alone(self):
+        repository = StaticRepositoryProcessor(self.frame)
+        repository.execute = mock.Mock(side_effect=AssertionError("the repository was queried"))
+        pipeline = DataProcessingPipeline(parallel=False)
+        pipeline.normalizer = None
+        pipeline.incremental_cache = None
+        statistics = RunidStatisticsProcessor(use_case=FrameStatisticsUseCase(self.frame))
+        pipeline.processors = [repository, statistics]
+        request = dict(self.request, runid_list=[6000, 6001])
+        sheet = pipeline.process_data(request)["Combination Waveforms"]
+        self.assertListEqual(statistics.use_case.requests[0][0].runid_list, [6000, 6001])
+        expected = WaveformCombinationProcessor()._process_dataframe(self.frame[self.frame["runid"] < 6002])
+        pd.testing.assert_frame_equal(sheet, expected, check_exact=False, rtol=1e-9)
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class RunidStatisticsTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        MongoClientRegistry.set_client_factory(mongomock.MongoClient)
+        self.uc = ProcessingUseCase()
+        self.request = RunidStatisticsRequestObject(product="Clara Peak", runid_list=[1, 2])
+
+    def tearDown(self) -> None:
+        MongoClientRegistry.close_all()
+        MongoClientRegistry.set_client_factory(None)
+
+    def test_group_stage_matches_waveform_combination(self):
+        collection = MongoClientRegistry.get_database()["unwound"]
+        collection.insert_many(unwound_waveforms())
+        pipeline = self.uc._runid_statistics_pipeline(statistics_request=self.request, include_locations=True)
+        self.assertDictEqual(pipeline[0]["$match"]["runid"], {"$in": [1, 2]})
+        # mongomock does not implement $lookup with `let`, so run the reduction stages on unwound documents
+        reduced = pd.DataFrame(list(collection.aggregate(pipeline[-2:])))
+        self.assertEqual(len(reduced), 4)
+
+        keys = pd.DataFrame(reduced["_id"].tolist())
+        expected = WaveformCombinationProcessor(group_by="runid")._process_dataframe(
+            pd.json_normalize(unwound_waveforms()))
+        self.assertListEqual(keys["runid"].tolist(), expected["runid"].tolist())
+        self.assertListEqual(keys["testpoint"].tolist(), expected["waveforms.testpoint"].tolist())
+        for measurement in ("max", "min"):
+            for statistic in ("min", "mean", "max"):
+                self.assertListEqual(reduced[f"{measurement}_{statistic}"].round(9).tolist(),
+                                     expected[f"waveforms.{measurement}_{statistic}"].round(9).tolist())
+        self.assertNotIn("location", self.uc._runid_statistics_pipeline(statistics_request=self.request)[-2]["$group"])
+
+    def test_index_advice(self):
+        advice = self.uc.runid_index_advice()
+        self.assertFalse(advice["covered"])
+        self.assertEqual(len(advice["missing_indexes"]), 2)
+
+        database = MongoClientRegistry.get_database()
+        database[RunidEntity.get_type()].create_index([("runid", 1)])
+        database[WaveformEntity.get_type()].create_index([("runid", 1), ("test_category", 1), ("capture", 1)])
+        advice = self.uc.runid_index_advice()
+        self.assertTrue(advice["covered"])
+
+
+if __name__ == '__main__':
+    unittest.main()
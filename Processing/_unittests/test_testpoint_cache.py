@@ -0,0 +1,102 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from Processing.processing_responses import ProcessorResponseFailure
+from Processing.testpoint_cache import TestpointDefinitionCache
+
+DEFINITIONS = pd.DataFrame({"product": ["Clara Peak"] * 3, "testpoint": ["12V_EXT", "V3P3", "V5P0"],
+                            "nominal_value": [12.0, 3.3, 5.0]})
+
+
+class CountingRepository:
+
+    def __init__(self):
+        self.requests = []
+
+    def fetch(self, product, testpoint_list):
+        self.requests.append(testpoint_list)
+        if testpoint_list is None:
+            return DEFINITIONS
+        return DEFINITIONS[DEFINITIONS["testpoint"].isin(testpoint_list)].reset_index(drop=True)
+
+
+class TestpointDefinitionCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.repository = CountingRepository()
+        self.cache = TestpointDefinitionCache(ttl=60)
+
+    def test_repeat_request_is_a_hit(self):
+        first = self.cache.get("Clara Peak", ["V3P3", "V5P0"], fetch=self.repository.fetch)
+        second = self.cache.get("Clara Peak", ["V3P3", "V5P0"], fetch=self.repository.fetch)
+        pd.testing.assert_frame_equal(first, second)
+        self.assertEqual(len(self.repository.requests), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_partial_hit_fetches_only_missing(self):
+        self.cache.get("Clara Peak", ["V3P3"], fetch=self.repository.fetch)
+        result = self.cache.get("Clara Peak", ["V5P0", "V3P3"], fetch=self.repository.fetch)
+        self.assertListEqual(self.repository.requests, [["V3P3"], ["V5P0"]])
+        self.assertListEqual(result["testpoint"].tolist(), ["V5P0", "V3P3"])
+        self.assertEqual(self.cache.stats()["partial_hits"], 1)
+
+    def test_full_product_query_populates_testpoints(self):
+        self.cache.get("Clara Peak", None, fetch=self.repository.fetch)
+        self.cache.get("Clara Peak", ["12V_EXT"], fetch=self.repository.fetch)
+        self.assertListEqual(self.repository.requests, [None])
+
+    def test_unknown_testpoint_is_not_refetched(self):
+        self.cache.get("Clara Peak", ["MISSING"], fetch=self.repository.fetch)
+        result = self.cache.get("Clara Peak", ["MISSING"], fetch=self.repository.fetch)
+        self.assertTrue(result.empty)
+        self.assertEqual(len(self.repository.requests), 1)
+
+    def test_ttl_expiry(self):
+        cache = TestpointDefinitionCache(ttl=-1)
+        cache.get("Clara Peak", ["V3P3"], fetch=self.repository.fetch)
+        cache.get("Clara Peak", ["V3P3"], fetch=self.repository.fetch)
+        self.assertEqual(len(self.repository.requests), 2)
+
+    def test_lru_eviction(self):
+        cache = TestpointDefinitionCache(ttl=60, max_entries=2)
+        for testpoint in ("12V_EXT", "V3P3", "V5P0"):
+            cache.get("Clara Peak", [testpoint], fetch=self.repository.fetch)
+        cache.get("Clara Peak", ["12V_EXT"], fetch=self.repository.fetch)
+        self.assertEqual(len(self.repository.requests), 4)
+
+    def test_failures_are_not_cached(self):
+        failure = ProcessorResponseFailure(message="repository down")
+        self.assertIs(self.cache.get("Clara Peak", ["V3P3"], fetch=lambda product, testpoints: failure), failure)
+        self.cache.get("Clara Peak", ["V3P3"], fetch=self.repository.fetch)
+        self.assertEqual(len(self.repository.requests), 1)
+
+    def test_cached_frames_are_not_shared(self):
+        for testpoint_list in (None, ["V3P3"]):
+            with self.subTest(testpoint_list=testpoint_list):
+                first = self.cache.get("Clara Peak", testpoint_list, fetch=self.repository.fetch)
+                first["nominal_value"] = 0.0
+                second = self.cache.get("Clara Peak", testpoint_list, fetch=self.repository.fetch)
+                self.assertNotEqual(second["nominal_value"].iloc[0], 0.0)
+
+    def test_response_without_key_column_is_returned(self):
+        response = DEFINITIONS.drop(columns=["testpoint"])
+        result = self.cache.get("Clara Peak", ["V3P3", "V5P0"], fetch=lambda product, testpoints: response)
+        self.assertIs(result, response)
+        self.cache.get("Clara Peak", ["V3P3"], fetch=self.repository.fetch)
+        self.assertEqual(len(self.repository.requests), 1)
+
+    def test_disk_cache_is_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(Path(directory) / "testpoints.sqlite")
+            TestpointDefinitionCache(disk_path=path).get("Clara Peak", ["V3P3"], fetch=self.repository.fetch)
+            other_worker = TestpointDefinitionCache(disk_path=path)
+            result = other_worker.get("Clara Peak", ["V3P3"], fetch=self.repository.fetch)
+            self.assertEqual(len(self.repository.requests), 1)
+            self.assertEqual(result["nominal_value"].iloc[0], 3.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
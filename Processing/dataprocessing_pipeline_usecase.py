@@ -1,10 +1,17 @@
+import asyncio
 import typing as t
 import logging
 
 import pandas as pd
 
 from Processing.RepoProcessors import RepositoryProcessor
-from Processing.dataprocessor_usecase import DataProcessor
+from config import Config
+from Processing.dataprocessor_usecase import DataFrameProcessor, DataProcessor, REPOSITORY_INPUT
+from Processing.dtype_normalizer import DtypeNormalizer
+from Processing.incremental_cache import IncrementalFetch, IncrementalRunidCache
+from Processing.pipeline_executor import ParallelPipelineExecutor, ProcessorGraph
+from Processing.processing_responses import ProcessorResponseFailure
+from Processing.request_batching import can_split, merge_requests, split_response
 
 logging.basicConfig(format='[%(asctime)s] %(levelname)s [%(name)s.%(funcName)s:%(lineno)s] : %(message)s',
                     level=logging.DEBUG)
@@ -12,10 +19,55 @@ logging.basicConfig(format='[%(asctime)s] %(levelname)s [%(name)s.%(funcName)s:%
 LOG_LEVEL = logging.DEBUG
 
 
+class PipelineSheets(dict):
+    """
+    The sheets of a pipeline run by name, with what kept the run from being complete: the processors that failed
+    (their sheets are missing) and the requested runids the repository returned no rows for.
+    """
+
+    def __init__(self, sheets=(), failed_processors: t.Optional[t.List[str]] = None,
+                 missing_runids: t.Optional[t.List] = None):
+        super(PipelineSheets, self).__init__(sheets)
+        self.failed_processors = list(failed_processors or [])
+        self.missing_runids = list(missing_runids or [])
+
+    @property
+    def complete(self) -> bool:
+        return not self.failed_processors and not self.missing_runids
+
+
+def missing_runids(json_request: t.Dict, dataframe: pd.DataFrame) -> t.List:
+    """
+    Requested runids without rows in a repository dataframe.  Without a runid column only an empty dataframe
+    shows that runids are missing.
+    """
+    runids = list(dict.fromkeys(json_request.get("runid_list") or []))
+    if "runid" not in dataframe.columns:
+        return runids if dataframe.empty else []
+    returned = set(dataframe["runid"].unique().tolist())
+    return [runid for runid in runids if runid not in returned]
+
+
 class DataProcessingPipeline:
-    def __init__(self):
+    # Bump when processor output changes so cached results of older runs are not served
+    version = "1"
+
+    def __init__(self, parallel: bool = False, max_workers: t.Optional[int] = None, executor: str = "thread"):
         self.processors = []
         self.formatters = []
+        self.parallel = parallel
+        self.max_workers = max_workers
+        self.executor = executor
+        # Optional progress hook, called as progress_callback(step_name, completed_steps, total_steps)
+        self.progress_callback: t.Optional[t.Callable[[str, int, int], None]] = None
+        # Compacts the repository dataframe's dtypes before any processor sees it
+        self.normalizer: t.Optional[DtypeNormalizer] = None
+        if Config.REPOSITORY_NORMALIZE_DTYPES:
+            self.normalizer = DtypeNormalizer()
+        # Caches completed runids, so refreshing a report only fetches and processes the new ones
+        self.incremental_cache: t.Optional[IncrementalRunidCache] = None
+        if Config.PIPELINE_INCREMENTAL:
+            self.incremental_cache = IncrementalRunidCache.from_config()
 
     @classmethod
     def log(cls):
@@ -29,30 +81,168 @@ class DataProcessingPipeline:
         """
         self.processors.append(processor)
 
+    def _report_progress(self, step: str, completed: int):
+        if self.progress_callback is not None:
+            self.progress_callback(step, completed, len(self.processors))
+
+    def _repository_processor(self) -> t.Optional[RepositoryProcessor]:
+        if len(self.processors) < 1:
+            print("No processors found in the pipeline.")
+            return None
+
+        repository_processor = self.processors[0]
+        if not isinstance(repository_processor, RepositoryProcessor):
+            print("The first processor should be a RepositoryProcessor.")
+            return None
+        return repository_processor
+
     def process_data(self, json_request: t.Dict) -> t.Dict[str, pd.DataFrame]:
         """
-        Process data through the pipeline by applying each processor sequentially.
+        Process data through the pipeline.  The first processor queries the repository; the remaining processors are
+        applied sequentially, or as a concurrent dependency graph when the pipeline is parallel.
         """
-        sheets = {}
-        if len(self.processors) < 1:
-            print("No processors found in the pipeline.")
+        repository_processor = self._repository_processor()
+        if repository_processor is None:
+            return None
+
+        processors = [processor.for_request(json_request) if isinstance(processor, DataFrameProcessor) else processor
+                      for processor in self.processors[1:]]
+        if not self._needs_repository_rows(processors):
+            self.log().debug("No processor reads the repository rows, skipping the repository query")
+            self._report_progress(step=type(repository_processor).__name__, completed=1)
+            return self._run_processors(repository_dataframe=pd.DataFrame(), processors=processors,
+                                        json_request=json_request)
+        if self.incremental_cache is not None and self.incremental_cache.applies(json_request):
+            repository_response = self.incremental_cache.fetch(pipeline=self, json_request=json_request,
+                                                               repository_processor=repository_processor,
+                                                               processors=processors)
+        else:
+            repository_response = repository_processor.execute(json_request=json_request)
+        if not repository_response:
+            print("No data available for processing.")
             return None
+        self._report_progress(step=type(repository_processor).__name__, completed=1)
+        if isinstance(repository_response, IncrementalFetch):
+            # The incremental cache normalises the rows it fetches itself
+            repository_dataframe, processors = repository_response.repository_dataframe, repository_response.processors
+        else:
+            repository_dataframe = repository_response.dataframe
+            if self.normalizer is not None:
+                repository_dataframe = self.normalizer.normalize(repository_dataframe)
+        return self._run_processors(repository_dataframe=repository_dataframe, processors=processors,
+                                    json_request=json_request)
+
+    @staticmethod
+    def _needs_repository_rows(processors: t.List[DataProcessor]) -> bool:
+        return any(getattr(processor, "needs_repository_rows", True) for processor in processors
+                   if getattr(processor, "input_name", REPOSITORY_INPUT) == REPOSITORY_INPUT)
+
+    async def process_data_async(self, json_request: t.Dict) -> t.Dict[str, pd.DataFrame]:
+        """
+        `process_data` for asyncio callers.  The repository query runs on the event loop; normalisation and the
+        CPU-bound processors run on a worker thread, so the loop keeps serving other requests meanwhile.
+        """
+        repository_processor = self._repository_processor()
+        if repository_processor is None:
+            return None
+        if self.incremental_cache is not None and self.incremental_cache.applies(json_request):
+            # The incremental cache reads and writes its entries synchronously
+            return await asyncio.to_thread(self.process_data, json_request)
+
+        repository_response = await repository_processor.execute_async(json_request=json_request)
+        if not repository_response:
+            print("No data available for processing.")
+            return None
+        self._report_progress(step=type(repository_processor).__name__, completed=1)
+        return await asyncio.to_thread(self._process_repository_dataframe, repository_response.dataframe,
+                                       json_request)
+
+    def _process_repository_dataframe(self, repository_dataframe: pd.DataFrame,
+                                      json_request: t.Optional[t.Dict] = None) -> PipelineSheets:
+        if self.normalizer is not None:
+            repository_dataframe = self.normalizer.normalize(repository_dataframe)
+        return self._run_processors(repository_dataframe=repository_dataframe, processors=self.processors[1:],
+                                    json_request=json_request)
 
-        processed_data = None
-        for i, processor in enumerate(self.processors):
-            if i == 0:  # Handle the first processor separately
-                if isinstance(processor, RepositoryProcessor):
-                    repository_response = processor.execute(json_request=json_request)
-                else:
-                    print("The first processor should be a RepositoryProcessor.")
-                    return None
+    def _run_processors(self, repository_dataframe: pd.DataFrame, processors: t.List[DataProcessor],
+                        json_request: t.Optional[t.Dict] = None) -> PipelineSheets:
+        if self.parallel:
+            executor = ParallelPipelineExecutor(max_workers=self.max_workers, executor=self.executor)
+            completed = iter(range(2, len(self.processors) + 1))
+            sheets = executor.run(processors=processors, repository_dataframe=repository_dataframe,
+                                  on_complete=lambda name: self._report_progress(step=name, completed=next(completed)))
+        else:
+            sheets = self._process_sequentially(repository_dataframe=repository_dataframe, processors=processors)
+        # A processor's sheet is missing when it, or a processor it depends on, failed
+        return PipelineSheets(sheets,
+                              failed_processors=[processor.dataframe_name for processor in processors
+                                                 if processor.dataframe_name not in sheets],
+                              missing_runids=missing_runids(json_request or {}, repository_dataframe))
+
+    def process_batch(self, json_requests: t.List[t.Dict]) -> t.List[t.Optional[t.Dict[str, pd.DataFrame]]]:
+        """
+        Process several requests, querying the repository once per group of requests that only differ in their
+        runid and test category filters.  Each merged response is split back into the rows of every request,
+        which are then normalised and processed on their own like in `process_data`; a request whose repository
+        query failed, or that has no rows in the merged response, gets None.
+        """
+        results = [None] * len(json_requests)
+        repository_processor = self._repository_processor()
+        if repository_processor is None:
+            return results
+
+        for merged_request, indices in merge_requests(json_requests):
+            group = [json_requests[index] for index in indices]
+            if len(group) == 1:
+                # A lone request may still be served by the incremental cache
+                results[indices[0]] = self.process_data(json_request=group[0])
+                continue
+
+            repository_response = repository_processor.execute(json_request=merged_request)
+            if not repository_response:
+                self.log().warning(f"Batched repository query for {len(group)} requests failed: "
+                                   f"{repository_response.message}")
+                continue
+            repository_dataframe = repository_response.dataframe
+            if not can_split(repository_dataframe, group):
+                # Only merged requests filter on runids or test categories, so this takes a response without
+                # any of the columns they filter on
+                self.log().warning("Batched repository response cannot be split by request, querying separately")
+                for index, json_request in zip(indices, group):
+                    results[index] = self.process_data(json_request=json_request)
+                continue
+
+            self.log().debug(f"One repository query for {len(group)} requests: {merged_request}")
+            for index, request_dataframe in zip(indices, split_response(repository_dataframe, group)):
+                if request_dataframe.empty:
+                    self.log().warning(f"No repository rows for batched request {index}")
+                    continue
+                # Normalised per request: the chosen dtypes depend on the rows, as in `process_data`
+                results[index] = self._process_repository_dataframe(request_dataframe,
+                                                                    json_request=json_requests[index])
+        return results
+
+    def _process_sequentially(self, repository_dataframe: pd.DataFrame,
+                              processors: t.Optional[t.List[DataProcessor]] = None) -> t.Dict[str, pd.DataFrame]:
+        # Same dependency order and failure handling as ParallelPipelineExecutor, one processor at a time
+        graph = ProcessorGraph(processors=self.processors[1:] if processors is None else processors)
+        dataframes = {REPOSITORY_INPUT: repository_dataframe}
+        for completed, index in enumerate(graph.topological_order(), start=2):
+            processor = graph.processors[index]
+            if processor.input_name not in dataframes:
+                self.log().warning(f"{type(processor).__name__} failed: Input '{processor.input_name}' was not "
+                                   f"produced")
+                continue
+            try:
+                processed_response = processor.execute(processor.isolated_input(dataframes[processor.input_name]))
+            except Exception as e:
+                processed_response = ProcessorResponseFailure(message=e)
+            self._report_progress(step=processor.dataframe_name, completed=completed)
+            if processed_response:
+                dataframes[processed_response.title] = processed_response.dataframe
             else:
-                if not repository_response:
-                    print("No data available for processing.")
-                    return None
-                else:
-                    processing_dataframe = repository_response.dataframe
-                    print(type(processing_dataframe))
-                    processed_response = processor.execute(processing_dataframe)
-                sheets[processed_response.title] = processed_response.dataframe
-        return sheets
+                self.log().warning(f"{type(processor).__name__} failed: {processed_response.message}")
+
+        # Sheets are ordered like the processor list, as in the parallel path
+        return {processor.dataframe_name: dataframes[processor.dataframe_name] for processor in graph.processors
+                if processor.dataframe_name in dataframes}
@@ -4,16 +4,20 @@ import typing as t
 import pandas as pd
 
 from Processing.processing_responses import ProcessorResponseFailure, ProcessorResponseSuccess
-from Processing.processing_usecase import TestpointQueryRequestObject
 from Processing.RepoProcessors import TestPointProcessor
+from Processing.testpoint_cache import TestpointDefinitionCache
 
 logging.basicConfig(format='[%(asctime)s] %(levelname)s [%(name)s.%(funcName)s:%(lineno)s] : %(message)s',
                     level=logging.DEBUG)
 
 LOG_LEVEL = logging.DEBUG
 
+REPOSITORY_INPUT = "repository"
+
 
 class DataProcessor:
+    _testpoint_processor: t.Optional[TestPointProcessor] = None
+    _testpoint_definition_cache: t.Optional[TestpointDefinitionCache] = None
 
     @classmethod
     def log(cls):
@@ -33,10 +37,29 @@ class DataProcessor:
         product = self._product_name(dataframe=dataframe)
         return self._query_testpoints(product=product, testpoint_list=test_points)
 
+    @classmethod
+    def _testpoint_repository(cls) -> TestPointProcessor:
+        # One TestPointProcessor (and its pooled client) is shared by every processor
+        if DataProcessor._testpoint_processor is None:
+            DataProcessor._testpoint_processor = TestPointProcessor()
+        return DataProcessor._testpoint_processor
+
+    @classmethod
+    def _testpoint_cache(cls) -> TestpointDefinitionCache:
+        if DataProcessor._testpoint_definition_cache is None:
+            DataProcessor._testpoint_definition_cache = TestpointDefinitionCache.from_config()
+        return DataProcessor._testpoint_definition_cache
+
     def _query_testpoints(self, product: str, testpoint_list: t.Optional[t.List[str]] = None) -> pd.DataFrame:
+        return self._testpoint_cache().get(product=product, testpoint_list=testpoint_list,
+                                           fetch=self._fetch_testpoints)
+
+    def _fetch_testpoints(self, product: str, testpoint_list: t.Optional[t.List[str]] = None) -> pd.DataFrame:
+        # processing_usecase pulls in pymongo, so it is only imported when testpoints are actually queried
+        from Processing.processing_usecase import TestpointQueryRequestObject
+
         test_point_request_object = TestpointQueryRequestObject(product=product, testpoint_list=testpoint_list)
-        repo = TestPointProcessor()
-        response = repo.execute(json_request=test_point_request_object.to_dict())
+        response = self._testpoint_repository().execute(json_request=test_point_request_object.to_dict())
         if response:
             return response.dataframe
         else:
@@ -55,6 +78,27 @@ class DataFrameProcessor(DataProcessor):
     def __init__(self):
         self.returns_modified: bool = False
         self.dataframe_name: str = None
+        # Name of the dataframe this processor consumes: the repository dataframe or another processor's output
+        self.input_name: str = REPOSITORY_INPUT
+        # Processors that modify their input in place get a private copy when copy-on-write is off
+        self.mutates_input: bool = False
+        # Processors that implement `partial`/`merge_partials` are refreshed incrementally, one runid at a time
+        self.supports_partials: bool = False
+        # Processors that query what they need from the request (see `for_request`) do not read the repository
+        # rows; when no processor does, the pipeline skips the repository query
+        self.needs_repository_rows: bool = True
+
+    def isolated_input(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        The dataframe to hand this processor.  Inputs are shared between processors, so under copy-on-write each
+        processor gets a shallow copy (writes then copy only what they touch); otherwise only processors that
+        mutate their input pay for a deep copy.
+        """
+        if not isinstance(dataframe, pd.DataFrame):
+            return dataframe
+        if pd.get_option("mode.copy_on_write") is True:
+            return dataframe.copy(deep=False)
+        return dataframe.copy() if self.mutates_input else dataframe
 
     def _process_dataframe(self, dataframe: pd.DataFrame) -> pd.DataFrame:
         """
@@ -63,6 +107,32 @@ class DataFrameProcessor(DataProcessor):
         """
         raise NotImplementedError("process_dataframe method must be implemented in a subclass.")
 
+    def for_request(self, json_request: t.Dict) -> "DataFrameProcessor":
+        """
+        The processor to run for one pipeline request; processors that query by the request return a copy that
+        knows it.
+        """
+        return self
+
+    def configuration(self) -> t.Dict[str, t.Any]:
+        """
+        Settings that change this processor's results, e.g. its grouping; partial results cached for one
+        configuration are not merged into another.
+        """
+        return {}
+
+    def partial(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        Intermediate result for a subset of the repository rows (e.g. one runid), see `merge_partials`.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support partial results")
+
+    def merge_partials(self, partials: t.List[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Combine the `partial` results of disjoint row subsets into the result for all of their rows.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support partial results")
+
     def execute(self, dataframe: pd.DataFrame) -> t.Union[ProcessorResponseSuccess, ProcessorResponseFailure]:
         self.log().debug("Starting execute")
         if not isinstance(dataframe, pd.DataFrame):
@@ -80,6 +150,7 @@ class DataFrameProcessor(DataProcessor):
 class ModifiedDataFrameProcessor(DataFrameProcessor):
     def __init__(self):
         super().__init__()
+        self.mutates_input = True
 
     def _process_dataframe(self, dataframe):
         # Modify the input DataFrame in-place
@@ -93,7 +164,6 @@ class NewDataFrameProcessor(DataFrameProcessor):
         self.returns_modified = False
 
     def _process_dataframe(self, dataframe):
-        # Create a completely new DataFrame with some processing logic
-        processed_dataframe = dataframe.copy()
-        processed_dataframe["NewColumn"] = processed_dataframe["Column1"] + processed_dataframe["Column2"]
+        # Create a new DataFrame with some processing logic; the input columns are shared, not copied
+        processed_dataframe = dataframe.assign(NewColumn=dataframe["Column1"] + dataframe["Column2"])
         return processed_dataframe
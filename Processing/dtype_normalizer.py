@@ -0,0 +1,161 @@
+import fnmatch
+import logging
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+
+CATEGORY = "category"
+FLOAT32 = "float32"
+INTEGER = "integer"
+STRING = "string"
+
+# Column patterns (fnmatch) of a normalised repository response
+REPOSITORY_SCHEMA: t.Dict[str, str] = {
+    "project": CATEGORY,
+    "test_category": CATEGORY,
+    "status.*": CATEGORY,
+    "waveforms.testpoint": CATEGORY,
+    "waveforms.test_category": CATEGORY,
+    "waveforms.scope_channel": CATEGORY,
+    "waveforms.units": CATEGORY,
+    "waveforms.max": FLOAT32,
+    "waveforms.min": FLOAT32,
+    "waveforms.steady_state_*": FLOAT32,
+    "runid": INTEGER,
+    "waveforms.capture": INTEGER,
+    "waveforms.runid": INTEGER,
+    "waveforms.location": STRING,
+}
+
+
+class NormalizationReport(t.NamedTuple):
+    before_bytes: int
+    after_bytes: int
+    conversions: t.Dict[str, t.Tuple[str, str]]
+
+    @property
+    def ratio(self) -> float:
+        return self.before_bytes / self.after_bytes if self.after_bytes else 1.0
+
+
+class DtypeNormalizer:
+    """
+    Converts an ingested repository dataframe to compact dtypes: low-cardinality strings to `category`,
+    measurements to float32 when that loses no more than `float_tolerance` (relative; by default only when every
+    value round-trips exactly, so reports show the same numbers), integers to the smallest type that holds them,
+    and optionally the remaining strings to Arrow-backed strings.  Columns that are not in
+    the schema are only converted to `category` when their cardinality ratio is at most `category_ratio`.
+    """
+
+    def __init__(self, schema: t.Optional[t.Dict[str, str]] = None, category_ratio: float = 0.5,
+                 float_tolerance: float = 0.0, arrow_strings: bool = Config.REPOSITORY_ARROW_STRINGS):
+        self.schema = REPOSITORY_SCHEMA if schema is None else schema
+        self.category_ratio = category_ratio
+        self.float_tolerance = float_tolerance
+        self.arrow_strings = arrow_strings and self._arrow_available()
+        self.last_report: t.Optional[NormalizationReport] = None
+
+    @classmethod
+    def log(cls):
+        logging_handler = logging.getLogger(cls.__name__)
+        return logging_handler
+
+    @staticmethod
+    def _arrow_available() -> bool:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def column_kind(self, column: str) -> t.Optional[str]:
+        for pattern, kind in self.schema.items():
+            if fnmatch.fnmatchcase(str(column), pattern):
+                return kind
+        return None
+
+    def configuration(self) -> t.Dict[str, t.Any]:
+        return {"schema": self.schema, "category_ratio": self.category_ratio,
+                "float_tolerance": self.float_tolerance, "arrow_strings": self.arrow_strings}
+
+    def normalize(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        before = int(dataframe.memory_usage(deep=True).sum())
+        converted = {}
+        conversions = {}
+        for column in dataframe.columns:
+            values = dataframe[column]
+            kind = self.column_kind(column)
+            result = self._convert(values, kind=kind)
+            if result is not None and result.dtype != values.dtype:
+                converted[column] = result
+                conversions[column] = (str(values.dtype), str(result.dtype))
+
+        if converted:
+            dataframe = dataframe.assign(**converted)
+        after = int(dataframe.memory_usage(deep=True).sum())
+        self.last_report = NormalizationReport(before_bytes=before, after_bytes=after, conversions=conversions)
+        self.log().debug(f"Normalized {len(conversions)} columns: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB "
+                         f"({self.last_report.ratio:.1f}x)")
+        return dataframe
+
+    def _convert(self, values: pd.Series, kind: t.Optional[str]) -> t.Optional[pd.Series]:
+        if kind == CATEGORY or (kind is None and self._is_low_cardinality(values)):
+            return self._to_category(values)
+        if kind == FLOAT32:
+            return self._to_float32(values)
+        if kind == INTEGER:
+            return self._to_smallest_integer(values)
+        if kind == STRING or (kind is None and pd.api.types.is_object_dtype(values)):
+            return self._to_string(values)
+        return None
+
+    def _is_low_cardinality(self, values: pd.Series) -> bool:
+        if not pd.api.types.is_object_dtype(values) or len(values) == 0:
+            return False
+        try:
+            unique = values.nunique(dropna=True)
+        except TypeError:  # unhashable values such as lists
+            return False
+        return unique / len(values) <= self.category_ratio and self._all_strings(values)
+
+    @staticmethod
+    def _all_strings(values: pd.Series) -> bool:
+        return pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty")
+
+    @staticmethod
+    def _to_category(values: pd.Series) -> t.Optional[pd.Series]:
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return None
+        try:
+            return values.astype("category")
+        except TypeError:
+            return None
+
+    def _to_float32(self, values: pd.Series) -> t.Optional[pd.Series]:
+        if not pd.api.types.is_float_dtype(values) and not pd.api.types.is_integer_dtype(values):
+            return None
+        if values.dtype == np.float32:
+            return None
+        original = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(over="ignore", invalid="ignore"):
+            downcast = original.astype(np.float32)
+            error = np.abs(downcast.astype(np.float64) - original)
+            allowed = self.float_tolerance * np.maximum(np.abs(original), 1.0)
+        finite = np.isfinite(original)
+        if not np.array_equal(np.isfinite(downcast), finite) or np.any(error[finite] > allowed[finite]):
+            return None
+        return pd.Series(downcast, index=values.index, name=values.name)
+
+    @staticmethod
+    def _to_smallest_integer(values: pd.Series) -> t.Optional[pd.Series]:
+        if not pd.api.types.is_integer_dtype(values):
+            return None
+        return pd.to_numeric(values, downcast="integer")
+
+    def _to_string(self, values: pd.Series) -> t.Optional[pd.Series]:
+        if not self.arrow_strings or not pd.api.types.is_object_dtype(values) or not self._all_strings(values):
+            return None
+        return values.astype("string[pyarrow]")
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import typing as t
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from config import Config
+from Processing.dataprocessor_usecase import DataFrameProcessor, REPOSITORY_INPUT
+from Processing.processing_responses import ProcessorResponseFailure
+from Processing.result_cache import PipelineResultCache, is_cacheable, request_hash
+
+RUNID_COLUMN = "runid"
+
+
+def configuration_of(component) -> t.Optional[t.List]:
+    """
+    Class and settings of a processor or normalizer, e.g. a combination's group_by.
+    """
+    if component is None:
+        return None
+    configuration = getattr(component, "configuration", None)
+    return [f"{type(component).__module__}.{type(component).__qualname__}",
+            configuration() if configuration is not None else {}]
+
+
+def concat_normalized(frames: t.List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate separately normalised frames.  Categorical columns get the union of the frames' categories
+    first, as pd.concat turns categoricals with different categories back into object columns.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    columns = [column for column in frames[0].columns
+               if all(column in frame.columns and isinstance(frame[column].dtype, pd.CategoricalDtype)
+                      for frame in frames)]
+    if columns:
+        categories = {column: union_categoricals([frame[column] for frame in frames], ignore_order=True).categories
+                      for column in columns}
+        frames = [frame.assign(**{column: frame[column].cat.set_categories(categories[column])
+                                  for column in columns})
+                  for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+class MergedPartialsProcessor(DataFrameProcessor):
+    """
+    Stands in for `processor` in an incremental run: its output is merged from per-runid partial results, so
+    the repository dataframe it is handed is ignored.
+    """
+
+    def __init__(self, processor: DataFrameProcessor, partials: t.List[pd.DataFrame]):
+        super(MergedPartialsProcessor, self).__init__()
+        self.processor = processor
+        self.partials = partials
+        self.dataframe_name = processor.dataframe_name
+        self.input_name = processor.input_name
+
+    def _process_dataframe(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        return self.processor.merge_partials(self.partials)
+
+
+class IncrementalFetch(t.NamedTuple):
+    repository_dataframe: pd.DataFrame
+    processors: t.List[DataFrameProcessor]
+    cached_runids: t.List
+    fetched_runids: t.List
+
+
+class IncrementalRunidCache:
+    """
+    Per-runid repository rows and processor partials of a pipeline, so re-running a report over more runids
+    only queries and processes the runids that are not cached yet.  Only runids of requests restricted to
+    completed runids are stored, as those no longer change; a runid that returned no rows is fetched again
+    next time.  Entries are keyed by the request (without its runid list), the runid, the pipeline version and
+    the configuration of its normalizer and processors.  Only fetched rows are normalised, before partials are
+    computed; the pipeline does not normalise the combined rows again.
+    """
+
+    def __init__(self, cache: PipelineResultCache, runid_column: str = RUNID_COLUMN):
+        self.cache = cache
+        self.runid_column = runid_column
+
+    @classmethod
+    def log(cls):
+        logging_handler = logging.getLogger(cls.__name__)
+        return logging_handler
+
+    @classmethod
+    def from_config(cls, config=Config) -> "IncrementalRunidCache":
+        directory = config.INCREMENTAL_CACHE_DIR or os.path.join(PipelineResultCache.default_directory(), "runids")
+        return cls(cache=PipelineResultCache(directory=directory, max_bytes=config.INCREMENTAL_CACHE_MAX_BYTES))
+
+    @staticmethod
+    def applies(json_request: t.Dict) -> bool:
+        return bool(json_request.get("runid_list")) and is_cacheable(json_request)
+
+    @staticmethod
+    def runid_key(pipeline, json_request: t.Dict, runid) -> str:
+        # Partials depend on how the processors are configured (e.g. group_by) and on the normalised dtypes
+        configuration = json.dumps([configuration_of(component)
+                                    for component in [pipeline.normalizer] + pipeline.processors[1:]],
+                                   sort_keys=True, default=str)
+        return "runid-" + request_hash(dict(json_request, runid_list=[runid], configuration=configuration),
+                                       pipeline=pipeline)
+
+    def fetch(self, pipeline, json_request: t.Dict, repository_processor,
+              processors: t.List[DataFrameProcessor]) -> t.Union[IncrementalFetch, ProcessorResponseFailure]:
+        """
+        Repository rows of every runid in the request, querying the repository for the uncached runids only, and
+        `processors` with the ones that support partial results replaced by their merged partials.
+        """
+        runids = list(dict.fromkeys(json_request["runid_list"]))
+        mergeable = [processor for processor in processors
+                     if processor.supports_partials and processor.input_name == REPOSITORY_INPUT]
+        names = [REPOSITORY_INPUT] + [processor.dataframe_name for processor in mergeable]
+
+        entries = {}
+        for runid in runids:
+            entry = self.cache.get_sheets(self.runid_key(pipeline, json_request, runid))
+            if entry is not None and all(name in entry for name in names):
+                entries[runid] = entry
+        missing = [runid for runid in runids if runid not in entries]
+
+        chunks = []
+        if missing:
+            response = repository_processor.execute(json_request=dict(json_request, runid_list=missing))
+            if not response:
+                return response
+            dataframe = response.dataframe
+            if pipeline.normalizer is not None:
+                # Only the fetched rows are normalised; partials are computed on the dtypes a cold run processes
+                dataframe = pipeline.normalizer.normalize(dataframe)
+            chunks = self._store_runids(pipeline, json_request, dataframe=dataframe, missing=missing,
+                                        mergeable=mergeable, entries=entries)
+        # Cached and fetched runids are combined in the order of the request
+        chunks = [entries[runid] for runid in runids if runid in entries] + chunks
+        self.log().debug(f"{len(runids) - len(missing)} of {len(runids)} runids cached, fetched {missing}")
+
+        if not chunks:
+            return IncrementalFetch(repository_dataframe=dataframe, processors=list(processors),
+                                    cached_runids=[], fetched_runids=missing)
+        repository_dataframe = concat_normalized([chunk[REPOSITORY_INPUT] for chunk in chunks])
+        merged = {id(processor): MergedPartialsProcessor(processor, [chunk[processor.dataframe_name]
+                                                                     for chunk in chunks])
+                  for processor in mergeable}
+        return IncrementalFetch(repository_dataframe=repository_dataframe,
+                                processors=[merged.get(id(processor), processor) for processor in processors],
+                                cached_runids=[runid for runid in runids if runid not in missing],
+                                fetched_runids=missing)
+
+    def _store_runids(self, pipeline, json_request: t.Dict, dataframe: pd.DataFrame, missing: t.List,
+                      mergeable: t.List[DataFrameProcessor], entries: t.Dict) -> t.List[t.Dict[str, pd.DataFrame]]:
+        """
+        Split a repository response by runid and cache each runid's rows and partials in `entries`.  Rows that
+        cannot be assigned to a requested runid are returned as a single uncached chunk.
+        """
+        if self.runid_column not in dataframe.columns:
+            self.log().warning(f"Repository response has no '{self.runid_column}' column, not caching runids")
+            if dataframe.empty:
+                return []
+            return [self._entry(dataframe, mergeable=mergeable)]
+
+        requested = set(missing)
+        unrequested = []
+        stored = {}
+        for runid, rows in dataframe.groupby(self.runid_column, sort=False, observed=True):
+            if runid not in requested:
+                unrequested.append(rows)
+                continue
+            entries[runid] = self._entry(rows.reset_index(drop=True), mergeable=mergeable)
+            stored[self.runid_key(pipeline, json_request, runid)] = entries[runid]
+        self.cache.put_many_sheets(stored)
+        if unrequested:
+            # Rows whose runid does not match the request (e.g. a different type) are used but not cached
+            return [self._entry(pd.concat(unrequested, ignore_index=True), mergeable=mergeable)]
+        return []
+
+    @staticmethod
+    def _entry(dataframe: pd.DataFrame, mergeable: t.List[DataFrameProcessor]) -> t.Dict[str, pd.DataFrame]:
+        entry = {REPOSITORY_INPUT: dataframe}
+        for processor in mergeable:
+            entry[processor.dataframe_name] = processor.partial(dataframe)
+        return entry
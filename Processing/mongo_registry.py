@@ -0,0 +1,73 @@
+import os
+import threading
+import typing as t
+
+from config import Config
+
+
+class MongoClientRegistry:
+    """
+    Process-wide registry of lazily created MongoClients, keyed by connection URI.
+
+    MongoClient is not fork-safe, so clients are tracked per process id: a forked gunicorn/celery worker discards
+    the parent's clients and creates its own on first use.  `set_client_factory` swaps the client class, e.g. for
+    `mongomock.MongoClient` in tests.
+    """
+    _clients: t.Dict[str, t.Any] = {}
+    _pid: t.Optional[int] = None
+    _lock = threading.Lock()
+    _client_factory: t.Optional[t.Callable] = None
+
+    @classmethod
+    def set_client_factory(cls, factory: t.Optional[t.Callable]):
+        with cls._lock:
+            cls._client_factory = factory
+            cls._clients = {}
+
+    @classmethod
+    def _create_client(cls, uri: str):
+        factory = cls._client_factory
+        if factory is None:
+            import pymongo
+            factory = pymongo.MongoClient
+        return factory(uri, maxPoolSize=Config.MONGO_MAX_POOL_SIZE, connect=False)
+
+    @classmethod
+    def get_client(cls, uri: t.Optional[str] = None):
+        uri = uri or Config.MONGO_URI
+        with cls._lock:
+            if cls._pid != os.getpid():
+                # Never reuse sockets inherited from the parent process
+                cls._clients = {}
+                cls._pid = os.getpid()
+            client = cls._clients.get(uri)
+            if client is None:
+                client = cls._create_client(uri)
+                cls._clients[uri] = client
+        return client
+
+    @classmethod
+    def get_database(cls, name: t.Optional[str] = None, uri: t.Optional[str] = None):
+        return cls.get_client(uri=uri)[name or Config.MONGO_DATABASE]
+
+    @classmethod
+    def close_all(cls):
+        with cls._lock:
+            if cls._pid == os.getpid():
+                for client in cls._clients.values():
+                    client.close()
+            cls._clients = {}
+
+
+def cursor_batches(cursor: t.Iterable[t.Dict], batch_size: int) -> t.Iterator[t.List[t.Dict]]:
+    """
+    Iterate a find/aggregate cursor as lists of at most `batch_size` documents.
+    """
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
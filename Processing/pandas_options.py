@@ -0,0 +1,17 @@
+import os
+import sys
+
+from config import Config
+
+
+def configure_copy_on_write(enabled: bool = Config.PIPELINE_COPY_ON_WRITE):
+    """
+    Set pandas copy-on-write for the whole process, once when a web or worker process starts: the option is
+    process-global, so it is never toggled around pipeline runs.  Before pandas is imported only the default it
+    reads from PANDAS_COPY_ON_WRITE is set, so starting the web app does not import pandas.
+    """
+    pandas = sys.modules.get("pandas")
+    if pandas is None:
+        os.environ["PANDAS_COPY_ON_WRITE"] = "1" if enabled else "0"
+    else:
+        pandas.set_option("mode.copy_on_write", enabled)
@@ -0,0 +1,136 @@
+import logging
+import typing as t
+from concurrent.futures import Executor, FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from Processing.dataprocessor_usecase import DataFrameProcessor, REPOSITORY_INPUT
+from Processing.processing_responses import ProcessorResponseFailure, ProcessorResponseSuccess
+
+logging.basicConfig(format='[%(asctime)s] %(levelname)s [%(name)s.%(funcName)s:%(lineno)s] : %(message)s',
+                    level=logging.DEBUG)
+
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+class ProcessorGraph:
+    """
+    Dependency graph of DataFrameProcessors.  Each processor consumes the dataframe named by its `input_name`,
+    either the repository dataframe or the `dataframe_name` of another processor in the graph.
+    """
+
+    def __init__(self, processors: t.List[DataFrameProcessor]):
+        self.processors = list(processors)
+        self.producers = self._build_producers()
+        self._validate()
+
+    def _build_producers(self) -> t.Dict[str, int]:
+        producers = {}
+        for index, processor in enumerate(self.processors):
+            name = processor.dataframe_name
+            if name == REPOSITORY_INPUT:
+                raise ValueError(f"'{REPOSITORY_INPUT}' is reserved for the repository dataframe")
+            if name in producers:
+                raise ValueError(f"Processor output '{name}' is produced more than once")
+            producers[name] = index
+        return producers
+
+    def _validate(self):
+        for processor in self.processors:
+            if processor.input_name != REPOSITORY_INPUT and processor.input_name not in self.producers:
+                raise ValueError(f"{type(processor).__name__} depends on unknown input '{processor.input_name}'")
+        # topological_order raises on cycles
+        self.topological_order()
+
+    def dependents(self, name: str) -> t.List[int]:
+        return [index for index, processor in enumerate(self.processors) if processor.input_name == name]
+
+    def topological_order(self) -> t.List[int]:
+        order = []
+        available = [REPOSITORY_INPUT]
+        while available:
+            name = available.pop(0)
+            for index in self.dependents(name):
+                order.append(index)
+                available.append(self.processors[index].dataframe_name)
+        if len(order) != len(self.processors):
+            raise ValueError("Processor dependencies contain a cycle")
+        return order
+
+
+class ParallelPipelineExecutor:
+    """
+    Runs the DataFrameProcessors of a pipeline as a dependency graph.  Processors whose input is available are
+    submitted to the pool immediately, so independent processors run concurrently.
+    """
+
+    def __init__(self, max_workers: t.Optional[int] = None, executor: str = "thread"):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor '{executor}', expected one of {list(EXECUTORS)}")
+        self.max_workers = max_workers
+        self.executor = executor
+
+    @classmethod
+    def log(cls):
+        logging_handler = logging.getLogger(cls.__name__)
+        return logging_handler
+
+    def _create_executor(self) -> Executor:
+        return EXECUTORS[self.executor](max_workers=self.max_workers)
+
+    def run(self, processors: t.List[DataFrameProcessor], repository_dataframe: pd.DataFrame,
+            on_complete: t.Optional[t.Callable[[str], None]] = None) -> t.Dict[str, pd.DataFrame]:
+        graph = ProcessorGraph(processors=processors)
+        responses = self.execute_graph(graph=graph, repository_dataframe=repository_dataframe,
+                                       on_complete=on_complete)
+
+        # Sheets are ordered like the processor list regardless of completion order
+        sheets = {}
+        for index, processor in enumerate(graph.processors):
+            response = responses[index]
+            if response:
+                sheets[response.title] = response.dataframe
+            else:
+                self.log().warning(f"{type(processor).__name__} failed: {response.message}")
+        return sheets
+
+    def execute_graph(self, graph: ProcessorGraph, repository_dataframe: pd.DataFrame,
+                      on_complete: t.Optional[t.Callable[[str], None]] = None) \
+            -> t.Dict[int, t.Union[ProcessorResponseSuccess, ProcessorResponseFailure]]:
+        responses = {}
+        with self._create_executor() as pool:
+            futures = {}
+
+            def submit_dependents(name: str, dataframe: pd.DataFrame):
+                for index in graph.dependents(name):
+                    processor = graph.processors[index]
+                    future = pool.submit(processor.execute, processor.isolated_input(dataframe))
+                    futures[future] = index
+
+            def fail_dependents(name: str):
+                for index in graph.dependents(name):
+                    responses[index] = ProcessorResponseFailure(message=f"Input '{name}' was not produced")
+                    fail_dependents(graph.processors[index].dataframe_name)
+
+            submit_dependents(REPOSITORY_INPUT, repository_dataframe)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures.pop(future)
+                    name = graph.processors[index].dataframe_name
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        response = ProcessorResponseFailure(message=e)
+                    responses[index] = response
+                    self.log().debug(f"Finished processor '{name}'")
+                    if on_complete is not None:
+                        on_complete(name)
+                    if response:
+                        submit_dependents(name, response.dataframe)
+                    else:
+                        fail_dependents(name)
+        return responses
@@ -0,0 +1,63 @@
+import typing as t
+from dataclasses import dataclass, field
+
+
+class InvalidPipelineRequest(ValueError):
+    pass
+
+
+def _string_list(name: str, value) -> t.List[str]:
+    if not isinstance(value, list) or not value or not all(isinstance(item, str) and item for item in value):
+        raise InvalidPipelineRequest(f"'{name}' must be a non-empty list of non-empty strings")
+    return value
+
+
+def _runid_list(value) -> t.List[int]:
+    # JSON booleans are ints in Python, but never runids
+    if not isinstance(value, list) or not value or \
+            not all(isinstance(item, int) and not isinstance(item, bool) for item in value):
+        raise InvalidPipelineRequest("'runid_list' must be a non-empty list of integer runids")
+    return value
+
+
+@dataclass
+class PipelineRequestObject:
+    """
+    Report request accepted by the pipeline routes and forwarded to the repository.  Omitting `runid_list` or
+    `test_category_list` selects every runid or test category of the product.
+    """
+    product: str
+    runid_status: t.List[str] = field(default_factory=lambda: ["Complete"])
+    runid_list: t.Optional[t.List[int]] = None
+    test_category_list: t.Optional[t.List[str]] = None
+
+    @classmethod
+    def from_dict(cls, adict) -> "PipelineRequestObject":
+        if not isinstance(adict, dict):
+            raise InvalidPipelineRequest("Request body must be a JSON object")
+        unknown = sorted(set(adict) - {"product", "runid_status", "runid_list", "test_category_list"})
+        if unknown:
+            raise InvalidPipelineRequest(f"Unknown request fields {unknown}")
+        product = adict.get("product")
+        if not isinstance(product, str) or not product:
+            raise InvalidPipelineRequest("'product' is required and must be a non-empty string")
+
+        request_object = cls(product=product)
+        if adict.get("runid_status") is not None:
+            request_object.runid_status = _string_list("runid_status", adict["runid_status"])
+        if adict.get("runid_list") is not None:
+            request_object.runid_list = _runid_list(adict["runid_list"])
+        if adict.get("test_category_list") is not None:
+            request_object.test_category_list = _string_list("test_category_list", adict["test_category_list"])
+        return request_object
+
+    def to_dict(self) -> t.Dict:
+        adict = {
+            "product": self.product,
+            "runid_status": self.runid_status,
+        }
+        if self.test_category_list:
+            adict["test_category_list"] = self.test_category_list
+        if self.runid_list:
+            adict["runid_list"] = self.runid_list
+        return adict
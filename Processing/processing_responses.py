@@ -13,6 +13,18 @@ class ProcessorResponseFailure(ResponseFailure):
         return msg
 
 
+class RepositoryResponseFailure(ProcessorResponseFailure):
+    """
+    Failed repository query, with the HTTP status the repository returned or the error that kept it from
+    answering.
+    """
+
+    def __init__(self, message, status_code: int = None, error: BaseException = None):
+        super(RepositoryResponseFailure, self).__init__(message=message)
+        self.status_code = status_code
+        self.error = error
+
+
 class ProcessorResponseSuccess(ResponseSuccess):
 
     def __init__(self, dataframe: pd.DataFrame, title: str):
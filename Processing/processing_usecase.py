@@ -1,3 +1,4 @@
+import asyncio
 import typing as t
 from config import Config
 from flask import jsonify
@@ -14,6 +15,22 @@ from Entities.UseCase import UseCase
 from Entities.RequestResponse import RequestObject, Responses, ResponseSuccess
 from Entities.Entities.entities import TestpointEntity, RunidEntity, WaveformEntity
 
+from Processing.mongo_registry import MongoClientRegistry, cursor_batches
+from Processing.RepoProcessors.async_repository_client import AsyncRepositoryClient
+from Processing.RepoProcessors.repository_client import RepositoryClient
+from Processing.RepoProcessors.streaming_decoder import StreamingResultDecoder
+
+
+RUNID_FIELDS = ["runid", "pba", "project", "rework", "status.status", "serial"]
+RUNID_WAVEFORM_FIELDS = ["capture", "test_category", "testpoint", "steady_state_min", "steady_state_mean",
+                         "steady_state_max", "steady_state_pk2pk", "_steady_state_index", "max", "min", "location"]
+
+# Indexes that keep the runid aggregation off collection scans
+RUNID_QUERY_INDEXES = [
+    (RunidEntity, [("runid", 1)]),
+    (WaveformEntity, [("runid", 1), ("test_category", 1)]),
+]
+
 
 @dataclass
 class TestpointInfoRequestObject(RequestObject):
@@ -58,6 +75,34 @@ class RunidInfoRequestObject(RequestObject):
         }
 
 
+@dataclass
+class RunidStatisticsRequestObject(RequestObject):
+    product: str
+    runid_list: t.Optional[t.List[int]] = None
+    test_category_list: t.Optional[t.List[str]] = None
+    runid_status: t.List[str] = field(default_factory=lambda: ["Complete"])
+
+    def to_dict(self) -> t.Dict:
+        adict = {
+            "product": self.product,
+            "runid_status": self.runid_status
+        }
+        if self.runid_list:
+            adict["runid_list"] = self.runid_list
+        if self.test_category_list:
+            adict["test_category_list"] = self.test_category_list
+        return adict
+
+    def match_query(self) -> t.Dict:
+        adict = {
+            "project": self.product,
+            "status.status": {"$in": self.runid_status}
+        }
+        if self.runid_list:
+            adict["runid"] = {"$in": self.runid_list}
+        return adict
+
+
 @dataclass
 class TestpointQueryRequestObject(RequestObject):
     product: str
@@ -81,6 +126,17 @@ class TestpointQueryRequestObject(RequestObject):
 
 
 class ProcessingUseCase(UseCase):
+    batch_size: int = Config.MONGO_BATCH_SIZE
+
+    def _collection(self, name: str):
+        return MongoClientRegistry.get_database()[name]
+
+    def _cursor_to_dataframe(self, cursor) -> pd.DataFrame:
+        # Normalize one cursor batch at a time instead of materialising every document
+        frames = [pd.json_normalize(batch) for batch in cursor_batches(cursor, batch_size=self.batch_size)]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
 
     def process_request(self, request_object: TestpointInfoRequestObject) -> Responses:
         # Query the Repository
@@ -93,8 +149,7 @@ class ProcessingUseCase(UseCase):
         return ResponseSuccess(value=excel_bytes)
 
     def _query_to_dataframe(self, repo_response: str):
-        data = json.loads(repo_response)['result']
-        df = pd.json_normalize(data)
+        df = StreamingResultDecoder.decode_text(repo_response)
         return df
 
     def create_excel_sheets(self, input_dataframe: pd.DataFrame) -> bytes:
@@ -118,20 +173,37 @@ class ProcessingUseCase(UseCase):
         return excel_bytes
 
     def query_repository(self, request_object: TestpointInfoRequestObject, route="testpoint_review"):
-        json_data = json.dumps(asdict(request_object))
         repo_url = Config.REPOSITORY_URL  # "http://127.0.0.1:5001"
         if route:
             repo_url = f"{repo_url}/api/{route}"
         print(repo_url)
 
-        # Set the headers for the request (specify the content type as JSON)
-        headers = {"Content-Type": "application/json"}
-
-        # Send the request with the JSON data
-        response = requests.post(repo_url, headers=headers, data=json_data)
+        # Send the request with the JSON data over the shared connection pool
+        response = RepositoryClient.shared().post(repo_url, json_request=asdict(request_object))
         print(response.status_code)
         return response.text
 
+    async def query_repository_async(self, request_object: TestpointInfoRequestObject,
+                                     route="testpoint_review") -> str:
+        repo_url = Config.REPOSITORY_URL
+        if route:
+            repo_url = f"{repo_url}/api/{route}"
+        response = await AsyncRepositoryClient.shared().post(repo_url, json_request=asdict(request_object))
+        return response.content.decode()
+
+    # pymongo is blocking, so the asyncio variants run the queries on worker threads (sharing the process-wide
+    # connection pool) and the event loop keeps serving other requests meanwhile
+    async def query_testpoints_async(self, testpoint_request: TestpointQueryRequestObject) -> t.List[TestpointEntity]:
+        return await asyncio.to_thread(self.query_testpoints, testpoint_request)
+
+    async def query_runid_async(self, runid_request: RunidInfoRequestObject) -> pd.DataFrame:
+        return await asyncio.to_thread(self.query_runid, runid_request)
+
+    async def query_runid_statistics_async(self, statistics_request: RunidStatisticsRequestObject,
+                                           include_locations: bool = False) -> pd.DataFrame:
+        return await asyncio.to_thread(self.query_runid_statistics, statistics_request,
+                                       include_locations=include_locations)
+
     def query_testpoints(self, testpoint_request: TestpointQueryRequestObject) -> t.List[TestpointEntity]:
         json_data = json.dumps(testpoint_request.to_dict())
         '''
@@ -147,16 +219,10 @@ class ProcessingUseCase(UseCase):
         print(response.status_code)
         return response.text
         '''
-        import pymongo
-        from config import Config
-        client = pymongo.MongoClient('mongodb://192.168.1.226:27017/')
-        # client = pymongo.MongoClient('mongodb://npoflask.jf.intel.com:27017/')
-        db = client['ATS2']
-        collection = db[TestpointEntity.get_type()]
+        collection = self._collection(TestpointEntity.get_type())
         testpoint_entities = []
-        # for testpoint_dict in collection.find(testpoint_request.match_query()):
         tp_query = testpoint_request.match_query()
-        for testpoint_dict in collection.find(tp_query):
+        for testpoint_dict in collection.find(tp_query, batch_size=self.batch_size):
             testpointEntity = TestpointEntity.from_dict(adict=testpoint_dict)
             testpoint_entities.append(testpointEntity)
 
@@ -177,38 +243,146 @@ class ProcessingUseCase(UseCase):
         print(response.status_code)
         return response.text
         '''
-        import pymongo
-        from config import Config
-        client = pymongo.MongoClient('mongodb://192.168.1.226:27017/')
-        # client = pymongo.MongoClient('mongodb://npoflask.jf.intel.com:27017/')
-        db = client['ATS2']
-        collection = db[RunidEntity.get_type()]
-        runid_match_query = runid_request.match_query()
-        pipeline = [
+        collection = self._collection(RunidEntity.get_type())
+        pipeline = self._runid_pipeline(runid_request=runid_request)
+        mongo_response = collection.aggregate(pipeline=pipeline, batchSize=self.batch_size)
+        df = self._cursor_to_dataframe(cursor=mongo_response)
+
+        return df
+
+    def _runid_pipeline(self, runid_request: RunidInfoRequestObject, runid_fields: t.Optional[t.List[str]] = None,
+                        waveform_fields: t.Optional[t.List[str]] = None) -> t.List[t.Dict]:
+        if runid_fields is None:
+            runid_fields = RUNID_FIELDS
+        if waveform_fields is None:
+            waveform_fields = RUNID_WAVEFORM_FIELDS
+        return self._waveform_pipeline(runid_match_query=runid_request.match_query(), runid_fields=runid_fields,
+                                       waveform_fields=waveform_fields,
+                                       waveform_match={"$eq": ["$test_category", runid_request.test_category]})
+
+    @staticmethod
+    def _waveform_pipeline(runid_match_query: t.Dict, runid_fields: t.List[str], waveform_fields: t.List[str],
+                           waveform_match: t.Optional[t.Dict] = None) -> t.List[t.Dict]:
+        waveform_conditions = [{"$eq": ["$runid", "$$runid"]}]
+        if waveform_match is not None:
+            waveform_conditions.append(waveform_match)
+        return [
             {"$match": runid_match_query},
-            {"$project": {"runid": 1, "pba": 1, "project": 1, "rework": 1, "status.status": 1, "serial": 1}},
+            {"$project": {field: 1 for field in runid_fields}},
 
             # Lookup tests that match each runid
             {"$lookup": {
                 "from": WaveformEntity.get_type(),
                 "let": {"runid": "$runid"},
                 "pipeline": [
-                    {"$match": {"$expr": {"$and": [
-                        {"$eq": ["$runid", "$$runid"]},
-                        {"$eq": ["$test_category", runid_request.test_category]}
-                    ],
-                    }}},
-                    {"$project": {"capture": 1, "test_category": 1, "testpoint": 1,
-                                  "steady_state_min": 1, "steady_state_mean": 1, "steady_state_max": 1,
-                                  "steady_state_pk2pk": 1, "_steady_state_index": 1, "max": 1, "min": 1,
-                                  "location": 1}},
+                    {"$match": {"$expr": {"$and": waveform_conditions}}},
+                    {"$project": {field: 1 for field in waveform_fields}},
                     {"$sort": {"capture": 1}},
                 ],
                 "as": "waveforms"
             }},
             {"$unwind": "$waveforms"},
         ]
-        mongo_response = collection.aggregate(pipeline=pipeline)
-        df = pd.json_normalize(list(mongo_response))
 
-        return df
+    def _runid_statistics_pipeline(self, statistics_request: RunidStatisticsRequestObject,
+                                   include_locations: bool = False) -> t.List[t.Dict]:
+        waveform_fields = ["capture", "test_category", "testpoint", "max", "min"]
+        group = {
+            "_id": {"runid": "$runid", "test_category": "$waveforms.test_category",
+                    "testpoint": "$waveforms.testpoint"},
+            "project": {"$first": "$project"},
+            "count": {"$sum": 1},
+        }
+        for measurement in ("max", "min"):
+            for statistic, operator in (("min", "$min"), ("mean", "$avg"), ("max", "$max"), ("sum", "$sum")):
+                group[f"{measurement}_{statistic}"] = {operator: f"$waveforms.{measurement}"}
+            # Values the mean is taken over, so statistics of several runids can be merged
+            group[f"{measurement}_count"] = {"$sum": {"$cond": [{"$isNumber": f"$waveforms.{measurement}"}, 1, 0]}}
+        if include_locations:
+            waveform_fields.append("location")
+            group["location"] = {"$push": "$waveforms.location"}
+
+        waveform_match = None
+        if statistics_request.test_category_list:
+            waveform_match = {"$in": ["$test_category", statistics_request.test_category_list]}
+        # Only the fields the statistics need are projected, and only the grouped result leaves the server
+        pipeline = self._waveform_pipeline(runid_match_query=statistics_request.match_query(),
+                                           runid_fields=["runid", "project"], waveform_fields=waveform_fields,
+                                           waveform_match=waveform_match)
+        pipeline.extend([
+            {"$group": group},
+            {"$sort": {"_id.runid": 1, "_id.test_category": 1, "_id.testpoint": 1}},
+        ])
+        return pipeline
+
+    def query_runid_statistics(self, statistics_request: RunidStatisticsRequestObject,
+                               include_locations: bool = False) -> pd.DataFrame:
+        """
+        Min/mean/max of the waveform max and min values per runid, test category and testpoint, reduced by one
+        $group stage on the server for every runid of the request.  Columns match the WaveformCombinationProcessor
+        partials (with `_sum` and `_count` per measurement), plus the waveform `count`; the waveform locations are
+        only pushed into the result with `include_locations`.
+        """
+        collection = self._collection(RunidEntity.get_type())
+        pipeline = self._runid_statistics_pipeline(statistics_request=statistics_request,
+                                                   include_locations=include_locations)
+        df = pd.DataFrame(list(collection.aggregate(pipeline=pipeline, batchSize=self.batch_size)))
+        if df.empty:
+            return df
+        keys = pd.DataFrame(df.pop("_id").tolist(), index=df.index).rename(
+            columns={"test_category": "waveforms.test_category", "testpoint": "waveforms.testpoint"})
+        columns = {"location": "waveforms.location"}
+        columns.update({f"{m}_{s}": f"waveforms.{m}_{s}" for m in ("max", "min")
+                        for s in ("min", "mean", "max", "sum", "count")})
+        return pd.concat([keys, df.rename(columns=columns)], axis=1)
+
+    def explain_runid_query(self, runid_request: RunidInfoRequestObject, statistics: bool = False) -> t.Dict:
+        """
+        Query planner output for the runid aggregation.
+        """
+        collection = self._collection(RunidEntity.get_type())
+        if statistics:
+            statistics_request = RunidStatisticsRequestObject(product=runid_request.product,
+                                                              runid_list=[runid_request.runid],
+                                                              test_category_list=[runid_request.test_category],
+                                                              runid_status=runid_request.runid_status)
+            pipeline = self._runid_statistics_pipeline(statistics_request=statistics_request)
+        else:
+            pipeline = self._runid_pipeline(runid_request=runid_request)
+        return collection.database.command("explain", {"aggregate": collection.name, "pipeline": pipeline,
+                                                       "cursor": {}}, verbosity="queryPlanner")
+
+    def runid_index_advice(self, runid_request: t.Optional[RunidInfoRequestObject] = None) -> t.Dict:
+        """
+        Check that the runid $match and the waveform runid/test_category $lookup are covered by indexes.
+        When a request is given, the winning plan stages from `explain` are included as well.
+        """
+        advice = {"missing_indexes": [], "winning_stages": []}
+        for entity, keys in RUNID_QUERY_INDEXES:
+            collection = self._collection(entity.get_type())
+            index_keys = [list(index["key"]) for index in collection.index_information().values()]
+            covered = any([key for key, _ in index[:len(keys)]] == [key for key, _ in keys] for index in index_keys)
+            if not covered:
+                advice["missing_indexes"].append({"collection": collection.name, "keys": keys})
+        if runid_request is not None:
+            explain = self.explain_runid_query(runid_request=runid_request)
+            advice["winning_stages"] = _plan_stages(explain)
+        advice["covered"] = not advice["missing_indexes"] and "COLLSCAN" not in advice["winning_stages"]
+        return advice
+
+
+def _plan_stages(explain: t.Dict) -> t.List[str]:
+    stages = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if "stage" in node:
+                stages.append(node["stage"])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(explain)
+    return stages
@@ -0,0 +1,23 @@
+import typing as t
+
+from lazy_imports import LazyRegistry
+
+# Processors by name.  A processor's module (and whatever it depends on) is imported when a pipeline creates it.
+PROCESSORS = LazyRegistry({
+    "SequencingRepositoryProcessor": "Processing.RepoProcessors.repository_processor:SequencingRepositoryProcessor",
+    "WaveformRepositoryProcessor": "Processing.RepoProcessors.repository_processor:WaveformRepositoryProcessor",
+    "TestPointProcessor": "Processing.RepoProcessors.repository_processor:TestPointProcessor",
+    "WaveformCombinationProcessor": "Processing.TestDataProcessors.waveform_combination:WaveformCombinationProcessor",
+    "RunidStatisticsProcessor": "Processing.TestDataProcessors.runid_statistics:RunidStatisticsProcessor",
+    "TitleSheetProcessor": "Processing.TestDataProcessors.TitleSheetProcessor:TitleSheetProcessor",
+    "NoProcessor": "Processing.TestDataProcessors.NoProcessor:NoProcessor",
+    "SequencingProcessor": "Processing.TestDataProcessors.WaveformSequencingProcessor:SequencingProcessor",
+    "PowerOnTimeProcessor": "Processing.TestDataProcessors.PowerOnTimeProcessor:PowerOnTimeProcessor",
+})
+
+
+def create_processors(names: t.Iterable[str]) -> t.List:
+    """
+    Instantiate the named processors, importing only their modules.
+    """
+    return [PROCESSORS[name]() for name in names]
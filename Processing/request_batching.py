@@ -0,0 +1,82 @@
+import json
+import typing as t
+
+import pandas as pd
+
+# Columns a repository response carries the test category in, depending on the route
+TEST_CATEGORY_COLUMNS = ("test_category", "waveforms.test_category")
+
+# Request fields that select repository rows, and the columns each one can filter on, in order of preference
+ROW_FILTERS = {
+    "runid_list": ("runid",),
+    "test_category_list": TEST_CATEGORY_COLUMNS,
+}
+
+
+def filter_column(dataframe: pd.DataFrame, request_field: str) -> t.Optional[str]:
+    """
+    The column of `dataframe` a request field filters on, or None when it has none of them.
+    """
+    return next((column for column in ROW_FILTERS[request_field] if column in dataframe.columns), None)
+
+
+def filter_repository_dataframe(dataframe: pd.DataFrame, json_request: t.Dict) -> pd.DataFrame:
+    """
+    Apply the runid and test category filters of a repository request to a dataframe.
+    """
+    mask = pd.Series(True, index=dataframe.index)
+    for request_field in ROW_FILTERS:
+        column = filter_column(dataframe, request_field)
+        if json_request.get(request_field) and column is not None:
+            mask &= dataframe[column].isin(json_request[request_field])
+    return dataframe[mask].reset_index(drop=True)
+
+
+def filters_rows(json_request: t.Dict) -> bool:
+    return any(json_request.get(request_field) for request_field in ROW_FILTERS)
+
+
+def batch_key(json_request: t.Dict) -> str:
+    # Requests that only differ in their row filters are answered by one repository query
+    return json.dumps({name: value for name, value in json_request.items() if name not in ROW_FILTERS},
+                      sort_keys=True, default=str)
+
+
+def merge_requests(json_requests: t.List[t.Dict]) -> t.List[t.Tuple[t.Dict, t.List[int]]]:
+    """
+    Group requests that can share a repository query, e.g. per product and runid status.  Returns each merged
+    request with the indices of the requests it answers; a filter is the union of the group's filters, and is
+    dropped when any request of the group does not filter on it.  Only requests that filter on runids or test
+    categories are merged, as only their rows can be picked out of a merged response; the others are queried
+    on their own.
+    """
+    groups: t.Dict[str, t.List[int]] = {}
+    for index, json_request in enumerate(json_requests):
+        key = batch_key(json_request) if filters_rows(json_request) else f"unfiltered-{index}"
+        groups.setdefault(key, []).append(index)
+
+    merged = []
+    for indices in groups.values():
+        merged_request = {name: value for name, value in json_requests[indices[0]].items() if name not in ROW_FILTERS}
+        for request_field in ROW_FILTERS:
+            values = [json_requests[index].get(request_field) for index in indices]
+            if all(values):
+                merged_request[request_field] = list(dict.fromkeys(value for value_list in values
+                                                                   for value in value_list))
+        merged.append((merged_request, indices))
+    return merged
+
+
+def can_split(dataframe: pd.DataFrame, json_requests: t.List[t.Dict]) -> bool:
+    """
+    Whether every request's rows can be picked out of a merged response, i.e. it has the filtered columns.
+    """
+    return all(filter_column(dataframe, request_field) is not None for json_request in json_requests
+               for request_field in ROW_FILTERS if json_request.get(request_field))
+
+
+def split_response(dataframe: pd.DataFrame, json_requests: t.List[t.Dict]) -> t.List[pd.DataFrame]:
+    """
+    The rows of a merged repository response that each request would have received on its own.
+    """
+    return [filter_repository_dataframe(dataframe, json_request=json_request) for json_request in json_requests]
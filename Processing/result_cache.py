@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import typing as t
+from pathlib import Path
+
+from config import Config
+
+if t.TYPE_CHECKING:
+    import pandas as pd
+
+CACHEABLE_STATUSES = {"Complete"}
+
+
+def canonical_request(json_request: t.Dict) -> t.Dict:
+    """
+    Order-insensitive form of a pipeline request: list values are de-duplicated and sorted.
+    """
+    canonical = {}
+    for key, value in json_request.items():
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(set(value), key=lambda item: (type(item).__name__, item))
+        canonical[key] = value
+    return canonical
+
+
+def request_hash(json_request: t.Dict, pipeline, formatter=None) -> str:
+    """
+    Content address of a pipeline run: the canonical request plus the pipeline class, its version, and the
+    output formatter.
+    """
+    pipeline_class = pipeline if isinstance(pipeline, type) else type(pipeline)
+    identity = {
+        "pipeline": f"{pipeline_class.__module__}.{pipeline_class.__qualname__}",
+        "version": getattr(pipeline_class, "version", None),
+        "formatter": type(formatter).__name__ if formatter is not None else None,
+        "request": canonical_request(json_request),
+    }
+    payload = json.dumps(identity, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(json_request: t.Dict, sheets: t.Optional[t.Dict[str, "pd.DataFrame"]] = None) -> bool:
+    """
+    Only requests for an explicit list of completed runids are immutable and safe to cache.  Given the `sheets`
+    of a run, the run must also be complete: every processor succeeded and every requested runid had rows.
+    """
+    statuses = json_request.get("runid_status")
+    if not statuses or not json_request.get("runid_list"):
+        return False
+    if not set(statuses) <= CACHEABLE_STATUSES:
+        return False
+    return sheets is None or getattr(sheets, "complete", True)
+
+
+class PipelineResultCache:
+    """
+    Size-bounded on-disk cache of finished pipeline outputs (formatted bytes and/or the sheets dict), keyed by
+    `request_hash`.  The least recently used entries are evicted once the directory exceeds `max_bytes`.
+    """
+    BYTES_SUFFIX = ".bin"
+    SHEETS_SUFFIX = ".sheets.pkl"
+
+    def __init__(self, directory: t.Union[str, Path], max_bytes: int = 1 << 30):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def log(cls):
+        logging_handler = logging.getLogger(cls.__name__)
+        return logging_handler
+
+    @staticmethod
+    def default_directory() -> str:
+        return os.path.join(tempfile.gettempdir(), "data_pipeline_results")
+
+    @classmethod
+    def from_config(cls, config=Config) -> "PipelineResultCache":
+        return cls(directory=config.RESULT_CACHE_DIR or cls.default_directory(),
+                   max_bytes=config.RESULT_CACHE_MAX_BYTES)
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.directory / f"{key}{suffix}"
+
+    def _read(self, path: Path) -> t.Optional[bytes]:
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        # Reads refresh the entry for LRU eviction
+        os.utime(path)
+        self.hits += 1
+        return data
+
+    def _write(self, path: Path, data: bytes):
+        for _ in self._write_chunks(path, [data]):
+            pass
+
+    def _write_chunks(self, path: Path, chunks: t.Iterable[bytes], evict: bool = True) -> t.Iterator[bytes]:
+        # Write-then-rename so concurrent readers never see a partial entry
+        fd, temporary = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                for chunk in chunks:
+                    handle.write(chunk)
+                    yield chunk
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        if evict:
+            self._evict()
+
+    def get_bytes(self, key: str) -> t.Optional[bytes]:
+        return self._read(self._path(key, self.BYTES_SUFFIX))
+
+    def put_bytes(self, key: str, data: bytes):
+        self._write(self._path(key, self.BYTES_SUFFIX), data)
+
+    def open_bytes(self, key: str) -> t.Optional[t.BinaryIO]:
+        """
+        Open a cached entry for chunked reading.  The open handle stays readable even if the entry is evicted.
+        """
+        path = self._path(key, self.BYTES_SUFFIX)
+        try:
+            handle = path.open("rb")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return handle
+
+    def tee_bytes(self, key: str, chunks: t.Iterable[bytes]) -> t.Iterator[bytes]:
+        """
+        Pass `chunks` through while caching them; the entry is only stored once the stream has been fully read.
+        """
+        return self._write_chunks(self._path(key, self.BYTES_SUFFIX), chunks)
+
+    def get_sheets(self, key: str) -> t.Optional[t.Dict[str, "pd.DataFrame"]]:
+        data = self._read(self._path(key, self.SHEETS_SUFFIX))
+        return pickle.loads(data) if data is not None else None
+
+    def put_sheets(self, key: str, sheets: t.Dict[str, "pd.DataFrame"]):
+        self._write(self._path(key, self.SHEETS_SUFFIX), pickle.dumps(sheets, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def put_many_sheets(self, entries: t.Dict[str, t.Dict[str, "pd.DataFrame"]]):
+        """
+        Store several sheets entries, checking the size bound once afterwards rather than after every entry.
+        """
+        for key, sheets in entries.items():
+            data = pickle.dumps(sheets, protocol=pickle.HIGHEST_PROTOCOL)
+            for _ in self._write_chunks(self._path(key, self.SHEETS_SUFFIX), [data], evict=False):
+                pass
+        if entries:
+            self._evict()
+
+    def size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def clear(self):
+        for entry in self._entries():
+            entry.unlink(missing_ok=True)
+
+    def _entries(self) -> t.List[Path]:
+        return [entry for entry in self.directory.iterdir() if entry.is_file() and not entry.name.startswith(".tmp-")]
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for entry in self._entries():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry))
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries, key=lambda item: item[0]):
+                if total <= self.max_bytes:
+                    break
+                entry.unlink(missing_ok=True)
+                total -= size
+                self.log().debug(f"Evicted {entry.name}")
@@ -0,0 +1,191 @@
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+
+from config import Config
+
+ALL_TESTPOINTS = "*"
+
+FetchTestpoints = t.Callable[[str, t.Optional[t.List[str]]], t.Any]
+
+
+class TestpointDefinitionCache:
+    """
+    TTL/LRU cache of testpoint definitions, stored per (product, testpoint) so a request for a set of testpoints
+    only fetches the ones that are not cached yet.  An optional sqlite file shares entries between processes
+    (e.g. gunicorn workers); memory stays the first level.
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 4096, disk_path: t.Optional[str] = None,
+                 key_column: str = "testpoint"):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.key_column = key_column
+        self._entries: "OrderedDict[t.Tuple[str, str], t.Tuple[float, pd.DataFrame]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        if disk_path:
+            self._initialise_disk()
+
+    @classmethod
+    def log(cls):
+        logging_handler = logging.getLogger(cls.__name__)
+        return logging_handler
+
+    @classmethod
+    def from_config(cls, config=Config) -> "TestpointDefinitionCache":
+        return cls(ttl=config.TESTPOINT_CACHE_TTL, max_entries=config.TESTPOINT_CACHE_MAX_ENTRIES,
+                   disk_path=config.TESTPOINT_CACHE_PATH or None)
+
+    def stats(self) -> t.Dict[str, int]:
+        return {"hits": self.hits, "partial_hits": self.partial_hits, "misses": self.misses,
+                "entries": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.disk_path:
+            with self._connect() as connection:
+                connection.execute("DELETE FROM testpoints")
+
+    def get(self, product: str, testpoint_list: t.Optional[t.List[str]], fetch: FetchTestpoints):
+        """
+        Return the definitions of `testpoint_list` (all testpoints when None), calling
+        `fetch(product, missing_testpoints)` only for entries that are not cached.  Failed fetches, and responses
+        without the key column, are returned as-is and never cached per testpoint.  Callers get their own (shallow)
+        copy of cached frames, which copy-on-write keeps from writing through to the cache.
+        """
+        if not testpoint_list:
+            cached = self._lookup(product, ALL_TESTPOINTS)
+            if cached is not None:
+                self.hits += 1
+                return cached.copy(deep=False)
+            self.misses += 1
+            response = fetch(product, None)
+            if isinstance(response, pd.DataFrame):
+                self._store(product, ALL_TESTPOINTS, response)
+                self._store_rows(product, response)
+                return response.copy(deep=False)
+            return response
+
+        testpoints = list(dict.fromkeys(testpoint_list))
+        found = {}
+        for testpoint in testpoints:
+            cached = self._lookup(product, testpoint)
+            if cached is not None:
+                found[testpoint] = cached
+        missing = [testpoint for testpoint in testpoints if testpoint not in found]
+
+        if not missing:
+            self.hits += 1
+        else:
+            if found:
+                self.partial_hits += 1
+            else:
+                self.misses += 1
+            response = fetch(product, missing)
+            if not isinstance(response, pd.DataFrame):
+                return response
+            if self.key_column not in response.columns:
+                # Rows cannot be attributed to testpoints, so the response is neither split nor cached
+                self.log().warning(f"Testpoint response has no '{self.key_column}' column, not caching it")
+                return response
+            fetched = self._store_rows(product, response)
+            for testpoint in missing:
+                # Unknown testpoints are cached as empty frames so they are not re-requested
+                rows = fetched.get(testpoint, response.iloc[0:0])
+                if testpoint not in fetched:
+                    self._store(product, testpoint, rows)
+                found[testpoint] = rows
+
+        # concat always builds a new frame, so the cached rows are not handed out
+        frames = [found[testpoint] for testpoint in testpoints]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _store_rows(self, product: str, dataframe: pd.DataFrame) -> t.Dict[str, pd.DataFrame]:
+        if self.key_column not in dataframe.columns:
+            return {}
+        rows = {testpoint: group.reset_index(drop=True)
+                for testpoint, group in dataframe.groupby(self.key_column, sort=False, observed=True)}
+        for testpoint, group in rows.items():
+            self._store(product, testpoint, group)
+        return rows
+
+    def _lookup(self, product: str, testpoint: str) -> t.Optional[pd.DataFrame]:
+        key = (product, testpoint)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, dataframe = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return dataframe
+                del self._entries[key]
+        if self.disk_path:
+            entry = self._disk_lookup(key=key, now=now)
+            if entry is not None:
+                expires_at, dataframe = entry
+                self._remember(key=key, expires_at=expires_at, dataframe=dataframe)
+                return dataframe
+        return None
+
+    def _store(self, product: str, testpoint: str, dataframe: pd.DataFrame):
+        key = (product, testpoint)
+        expires_at = time.time() + self.ttl
+        self._remember(key=key, expires_at=expires_at, dataframe=dataframe)
+        if self.disk_path:
+            self._disk_store(key=key, expires_at=expires_at, dataframe=dataframe)
+
+    def _remember(self, key: t.Tuple[str, str], expires_at: float, dataframe: pd.DataFrame):
+        with self._lock:
+            self._entries[key] = (expires_at, dataframe)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @contextmanager
+    def _connect(self) -> t.Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.disk_path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _initialise_disk(self):
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS testpoints (product TEXT, testpoint TEXT, "
+                               "expires_at REAL, payload BLOB, PRIMARY KEY (product, testpoint))")
+
+    def _disk_lookup(self, key: t.Tuple[str, str], now: float) -> t.Optional[t.Tuple[float, pd.DataFrame]]:
+        try:
+            with self._connect() as connection:
+                row = connection.execute("SELECT expires_at, payload FROM testpoints "
+                                         "WHERE product = ? AND testpoint = ? AND expires_at > ?",
+                                         (key[0], key[1], now)).fetchone()
+        except sqlite3.Error as e:
+            self.log().warning(f"Testpoint cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return row[0], pickle.loads(row[1])
+
+    def _disk_store(self, key: t.Tuple[str, str], expires_at: float, dataframe: pd.DataFrame):
+        try:
+            with self._connect() as connection:
+                connection.execute("INSERT OR REPLACE INTO testpoints VALUES (?, ?, ?, ?)",
+                                   (key[0], key[1], expires_at, pickle.dumps(dataframe)))
+        except sqlite3.Error as e:
+            self.log().warning(f"Testpoint cache write failed: {e}")
@@ -1,2 +1,19 @@
-from .excel_formatter import OpenpyxlFormatter, XLSXFormatter
-from .formatter import Formatter
+from lazy_imports import lazy_exports
+
+# The Excel and Arrow writers are imported when a formatter is first used
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "CSVBundleFormatter": ".columnar_formatter",
+    "FeatherBundleFormatter": ".columnar_formatter",
+    "ParquetBundleFormatter": ".columnar_formatter",
+    "OpenpyxlFormatter": ".excel_formatter",
+    "ParallelXLSXFormatter": ".excel_formatter",
+    "StreamingXLSXFormatter": ".excel_formatter",
+    "XLSXFormatter": ".excel_formatter",
+    "Formatter": ".formatter",
+    "DEFAULT_FORMAT": ".formatter_registry",
+    "FORMATTERS": ".formatter_registry",
+    "UnknownFormatError": ".formatter_registry",
+    "available_formats": ".formatter_registry",
+    "format_mimetypes": ".formatter_registry",
+    "formatter_for": ".formatter_registry",
+})
@@ -0,0 +1,53 @@
+import unittest
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+
+from ResultFormatting import CSVBundleFormatter, FeatherBundleFormatter, ParquetBundleFormatter, \
+    StreamingXLSXFormatter, UnknownFormatError, formatter_for
+from test_streaming_formatter import report_sheets
+
+
+def read_bundle(data: bytes, reader) -> dict:
+    with zipfile.ZipFile(BytesIO(data)) as bundle:
+        return {name: reader(BytesIO(bundle.read(name))) for name in bundle.namelist()}
+
+
+class SheetBundleFormatterTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.sheets = report_sheets()
+
+    def test_csv_bundle(self):
+        bundle = read_bundle(CSVBundleFormatter().format_bytesIO(self.sheets),
+                             reader=lambda handle: pd.read_csv(handle, compression="gzip"))
+        self.assertListEqual(list(bundle), ["Repository Data.csv.gz", "Combination Waveforms.csv.gz"])
+        pd.testing.assert_frame_equal(bundle["Repository Data.csv.gz"], self.sheets["Repository Data"])
+
+    @unittest.skipUnless(ParquetBundleFormatter.available(), "pyarrow is not installed")
+    def test_parquet_bundle(self):
+        bundle = read_bundle(ParquetBundleFormatter().format_bytesIO(self.sheets), reader=pd.read_parquet)
+        pd.testing.assert_frame_equal(bundle["Repository Data.parquet"], self.sheets["Repository Data"])
+        locations = bundle["Combination Waveforms.parquet"]["waveforms.location"]
+        self.assertListEqual(list(locations[0]), ["/a.bin", "/b.bin"])
+
+    @unittest.skipUnless(FeatherBundleFormatter.available(), "pyarrow is not installed")
+    def test_feather_bundle_streams(self):
+        data = b"".join(FeatherBundleFormatter().format_generator(self.sheets, chunk_size=4096))
+        bundle = read_bundle(data, reader=pd.read_feather)
+        pd.testing.assert_frame_equal(bundle["Repository Data.feather"], self.sheets["Repository Data"])
+
+    def test_registry(self):
+        self.assertIsInstance(formatter_for(None), StreamingXLSXFormatter)
+        self.assertIsInstance(formatter_for("CSV"), CSVBundleFormatter)
+        with self.assertRaises(UnknownFormatError):
+            formatter_for("pdf")
+
+    def test_sheet_filenames_are_sanitised(self):
+        self.assertEqual(CSVBundleFormatter.sheet_filename("Power-on Time/Rails", "csv.gz"),
+                         "Power-on Time_Rails.csv.gz")
+
+
+if __name__ == '__main__':
+    unittest.main()
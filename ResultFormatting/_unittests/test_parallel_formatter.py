@@ -0,0 +1,82 @@
+import unittest
+import zipfile
+from io import BytesIO
+from unittest import mock
+
+import openpyxl
+import pandas as pd
+
+from ResultFormatting import ParallelXLSXFormatter, StreamingXLSXFormatter, excel_formatter
+from ResultFormatting.formatter_registry import formatter_for
+from test_streaming_formatter import report_sheets
+
+
+def sheets_with_dates() -> dict:
+    sheets = report_sheets()
+    sheets["Power-on Time"] = pd.DataFrame({"waveforms.testpoint": ["V3P3", "V5P0"],
+                                            "measured": pd.to_datetime(["2024-01-01 10:00", None])})
+    return sheets
+
+
+class ParallelXLSXFormatterTestCase(unittest.TestCase):
+
+    def assertSameWorkbook(self, data: bytes, sheets: dict):
+        expected = pd.read_excel(BytesIO(StreamingXLSXFormatter().format_bytesIO(sheets)), sheet_name=None)
+        result = pd.read_excel(BytesIO(data), sheet_name=None)
+        self.assertListEqual(list(result), list(expected))
+        for sheet_name in expected:
+            pd.testing.assert_frame_equal(result[sheet_name], expected[sheet_name])
+
+    def test_assembled_workbook_matches_serial(self):
+        sheets = sheets_with_dates()
+        data = ParallelXLSXFormatter(max_workers=2, min_rows=0).format_bytesIO(sheets)
+        self.assertSameWorkbook(data, sheets)
+
+        with zipfile.ZipFile(BytesIO(data)) as workbook:
+            self.assertIsNone(workbook.testzip())
+            selected = [b'tabSelected="1"' in workbook.read(f"xl/worksheets/sheet{index}.xml")
+                        for index in range(1, 4)]
+        self.assertListEqual(selected, [True, False, False])
+
+    def test_assembled_workbook_streams(self):
+        sheets = sheets_with_dates()
+        data = b"".join(ParallelXLSXFormatter(max_workers=2, min_rows=0).format_generator(sheets, chunk_size=4096))
+        self.assertSameWorkbook(data, sheets)
+
+    def test_urls_are_written_as_text(self):
+        sheets = sheets_with_dates()
+        sheets["Power-on Time"]["link"] = ["http://example.com/run/6799", None]
+        data = ParallelXLSXFormatter(max_workers=2, min_rows=1).format_bytesIO(sheets)
+        workbook = openpyxl.load_workbook(BytesIO(data))
+        self.assertEqual(workbook["Power-on Time"]["C2"].value, "http://example.com/run/6799")
+        self.assertIsNone(workbook["Power-on Time"]["C2"].hyperlink)
+        self.assertSameWorkbook(data, sheets)
+
+    def test_falls_back_to_serial(self):
+        sheets = sheets_with_dates()
+        with mock.patch("ResultFormatting.excel_formatter._sheet_pool", side_effect=OSError("no workers")):
+            data = ParallelXLSXFormatter(max_workers=2, min_rows=0).format_bytesIO(sheets)
+        self.assertSameWorkbook(data, sheets)
+
+    def test_small_reports_are_written_serially(self):
+        sheets = sheets_with_dates()
+        with mock.patch("ResultFormatting.excel_formatter._sheet_pool") as sheet_pool:
+            data = ParallelXLSXFormatter(max_workers=2, min_rows=10000).format_bytesIO(sheets)
+        sheet_pool.assert_not_called()
+        self.assertSameWorkbook(data, sheets)
+
+    def test_reports_share_one_pool(self):
+        sheets = sheets_with_dates()
+        formatter = ParallelXLSXFormatter(max_workers=2, min_rows=0)
+        formatter.format_bytesIO(sheets)
+        pool = excel_formatter._sheet_pool(2)
+        self.assertSameWorkbook(formatter.format_bytesIO(sheets), sheets)
+        self.assertIs(excel_formatter._sheet_pool(2), pool)
+        self.assertEqual(pool._mp_context.get_start_method(), "spawn")
+
+    def test_streaming_formatter_is_the_default(self):
+        self.assertIs(type(formatter_for("xlsx")), StreamingXLSXFormatter)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from io import BytesIO
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from ResultFormatting import StreamingXLSXFormatter, XLSXFormatter
+
+
+def report_sheets() -> dict:
+    repository = pd.DataFrame({
+        "runid": np.arange(2500),
+        "waveforms.max": np.linspace(0, 3.3, 2500),
+        "waveforms.min": np.where(np.arange(2500) % 7 == 0, np.nan, -0.01),
+        "waveforms.testpoint": ["V3P3", "V5P0"] * 1250,
+    })
+    combination = pd.DataFrame({"waveforms.testpoint": ["V3P3", "V5P0"],
+                                "waveforms.location": [["/a.bin", "/b.bin"], ["/c.bin"]]})
+    return {"Repository Data": repository, "Combination Waveforms": combination}
+
+
+class StreamingXLSXFormatterTestCase(unittest.TestCase):
+
+    def test_matches_dataframe_formatter(self):
+        sheets = report_sheets()
+        streamed = b"".join(StreamingXLSXFormatter(chunk_rows=300).format_stream(sheets, chunk_size=4096))
+        expected = pd.read_excel(BytesIO(XLSXFormatter().format_bytesIO(sheets)), sheet_name=None)
+        result = pd.read_excel(BytesIO(streamed), sheet_name=None)
+
+        self.assertListEqual(list(result), list(expected))
+        for sheet_name in expected:
+            pd.testing.assert_frame_equal(result[sheet_name], expected[sheet_name])
+
+    def test_stream_is_chunked(self):
+        chunks = list(StreamingXLSXFormatter().format_stream(report_sheets(), chunk_size=1024))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= 1024 for chunk in chunks))
+        workbook = pd.read_excel(BytesIO(b"".join(chunks)), sheet_name=None)
+        self.assertEqual(len(workbook["Repository Data"]), 2500)
+
+    def test_default_format_stream(self):
+        # The workbook embeds its creation time, so the same bytes are chunked rather than formatting twice
+        formatter = XLSXFormatter()
+        expected = formatter.format_bytesIO(report_sheets())
+        with mock.patch.object(formatter, "format_bytesIO", return_value=expected):
+            chunks = list(formatter.format_stream(report_sheets(), chunk_size=1000))
+        self.assertEqual(b"".join(chunks), expected)
+        self.assertTrue(all(len(chunk) <= 1000 for chunk in chunks))
+
+
+if __name__ == '__main__':
+    unittest.main()
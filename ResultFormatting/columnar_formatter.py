@@ -0,0 +1,111 @@
+import re
+import typing as t
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, only the CSV bundle is available without it
+    pa = None
+    feather = None
+    pq = None
+
+from .formatter import Formatter
+
+ZIP_MIMETYPE = "application/zip"
+
+
+def _arrow_table(dataframe: pd.DataFrame) -> "pa.Table":
+    """
+    Convert a sheet to Arrow.  Object columns Arrow cannot type (e.g. mixed values) are written as strings.
+    """
+    try:
+        return pa.Table.from_pandas(dataframe, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        converted = dataframe.copy()
+        for column in converted.columns:
+            if pd.api.types.is_object_dtype(converted[column]):
+                try:
+                    pa.array(converted[column], from_pandas=True)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                    converted[column] = converted[column].map(lambda value: None if value is None else str(value))
+        return pa.Table.from_pandas(converted, preserve_index=False)
+
+
+class SheetBundleFormatter(Formatter):
+    """
+    Writes a zip with one file per sheet, named after the sheet.  Each sheet is serialised on its own, so only
+    one serialised sheet is held in memory at a time.
+    """
+    mimetype = ZIP_MIMETYPE
+    accept_mimetypes: t.Tuple[str, ...] = ()
+    sheet_extension = "bin"
+    compression = zipfile.ZIP_STORED
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    @staticmethod
+    def sheet_filename(sheet_name: str, extension: str) -> str:
+        return f"{re.sub(r'[^A-Za-z0-9._ -]+', '_', sheet_name).strip() or 'sheet'}.{extension}"
+
+    def _format(self, output, sheets: t.Dict[str, pd.DataFrame]):
+        with zipfile.ZipFile(output, mode="w", compression=self.compression) as bundle:
+            for sheet_name, dataframe in sheets.items():
+                buffer = BytesIO()
+                self._write_sheet(dataframe, buffer)
+                bundle.writestr(self.sheet_filename(sheet_name, self.sheet_extension), buffer.getvalue())
+        return output
+
+    def _write_sheet(self, dataframe: pd.DataFrame, buffer: BytesIO):
+        raise NotImplementedError
+
+
+class ParquetBundleFormatter(SheetBundleFormatter):
+    accept_mimetypes = ("application/vnd.apache.parquet",)
+    extension = "parquet.zip"
+    sheet_extension = "parquet"
+
+    def __init__(self, compression: str = "zstd"):
+        self.parquet_compression = compression
+
+    @classmethod
+    def available(cls) -> bool:
+        return pa is not None
+
+    def _write_sheet(self, dataframe: pd.DataFrame, buffer: BytesIO):
+        pq.write_table(_arrow_table(dataframe), buffer, compression=self.parquet_compression)
+
+
+class FeatherBundleFormatter(SheetBundleFormatter):
+    accept_mimetypes = ("application/vnd.apache.arrow.file", "application/vnd.apache.feather")
+    extension = "feather.zip"
+    sheet_extension = "feather"
+
+    def __init__(self, compression: str = "lz4"):
+        self.feather_compression = compression
+
+    @classmethod
+    def available(cls) -> bool:
+        return pa is not None
+
+    def _write_sheet(self, dataframe: pd.DataFrame, buffer: BytesIO):
+        feather.write_feather(_arrow_table(dataframe), buffer, compression=self.feather_compression)
+
+
+class CSVBundleFormatter(SheetBundleFormatter):
+    accept_mimetypes = ("text/csv",)
+    extension = "csv.zip"
+    sheet_extension = "csv.gz"
+
+    def __init__(self, compresslevel: int = 6):
+        self.compresslevel = compresslevel
+
+    def _write_sheet(self, dataframe: pd.DataFrame, buffer: BytesIO):
+        dataframe.to_csv(buffer, index=False,
+                         compression={"method": "gzip", "compresslevel": self.compresslevel, "mtime": 0})
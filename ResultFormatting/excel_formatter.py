@@ -1,5 +1,16 @@
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
 import typing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
+import numpy as np
 import pandas as pd
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment
@@ -7,10 +18,14 @@ import xlsxwriter
 
 from io import BytesIO
 
+from config import Config
+
 from .formatter import Formatter
 
 
 class XLSXFormatter(Formatter):
+    mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    extension = "xlsx"
 
     def _format(self, output, sheets: typing.Dict[str, pd.DataFrame]):
         writer = pd.ExcelWriter(output, engine="xlsxwriter")
@@ -56,6 +71,196 @@ class XLSXFormatter(Formatter):
         worksheet.set_default_row(cell_format=cell_format)
 
 
+class StreamingXLSXFormatter(Formatter):
+    """
+    Writes sheets with xlsxwriter's `constant_memory` mode: rows are flushed to disk as they are written, and
+    DataFrames are fed in chunks of `chunk_rows`, so memory stays flat however large a sheet is.  `format_stream`
+    yields the finished workbook from a temporary file in chunks, while `format_generator` writes the zip straight
+    into the consuming generator.
+    """
+    mimetype = XLSXFormatter.mimetype
+    extension = XLSXFormatter.extension
+    HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+    def __init__(self, chunk_rows: int = 10000):
+        self.chunk_rows = chunk_rows
+
+    def format_stream(self, sheets: typing.Dict[str, pd.DataFrame], chunk_size: int = 1 << 20) \
+            -> typing.Iterator[bytes]:
+        with tempfile.TemporaryFile() as output:
+            self._format(output=output, sheets=sheets)
+            output.seek(0)
+            while True:
+                chunk = output.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _format(self, output, sheets: typing.Dict[str, pd.DataFrame]):
+        workbook, header_format = self._new_workbook(output)
+        for sheet_name, dataframe in sheets.items():
+            self._write_sheet(workbook.add_worksheet(sheet_name), dataframe, header_format=header_format)
+        workbook.close()
+        return output
+
+    def _new_workbook(self, output) -> typing.Tuple[xlsxwriter.Workbook, typing.Any]:
+        # URLs stay plain text: hyperlinks would need worksheet relationship parts, which assembled workbooks lack
+        workbook = xlsxwriter.Workbook(output, {"constant_memory": True, "strings_to_urls": False,
+                                                "default_date_format": "yyyy-mm-dd hh:mm:ss"})
+        header_format = workbook.add_format(self.HEADER_FORMAT)
+        # Assign style indexes up front so every workbook built here has the same styles.xml, whatever its cells
+        header_format._get_xf_index()
+        workbook.default_date_format._get_xf_index()
+        return workbook, header_format
+
+    def _write_sheet(self, worksheet, dataframe: pd.DataFrame, header_format):
+        # constant_memory requires rows to be written strictly in order
+        worksheet.write_row(0, 0, [str(column) for column in dataframe.columns], header_format)
+        for row_number, row in enumerate(self._iter_rows(dataframe), start=1):
+            worksheet.write_row(row_number, 0, row)
+
+    def _iter_rows(self, dataframe: pd.DataFrame) -> typing.Iterator[tuple]:
+        for start in range(0, len(dataframe), self.chunk_rows):
+            chunk = self._cell_values(dataframe.iloc[start:start + self.chunk_rows])
+            yield from chunk.itertuples(index=False, name=None)
+
+    @staticmethod
+    def _cell_values(chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert one chunk to values xlsxwriter can write: missing values become blank cells and containers
+        (e.g. lists of waveform locations) are written as text.
+        """
+        containers = [column for column in chunk.columns if pd.api.types.is_object_dtype(chunk[column]) and
+                      chunk[column].map(lambda value: isinstance(value, (list, tuple, dict, set, np.ndarray))).any()]
+        # float32 measurements are written by their shortest repr (3.3, not 3.299999952316284)
+        narrow_floats = {column: chunk[column].to_numpy().astype(str).astype(np.float64)
+                         for column in chunk.columns if chunk[column].dtype == np.float32}
+        chunk = chunk.assign(**narrow_floats).astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        for column in containers:
+            chunk[column] = chunk[column].map(lambda value: str(value) if value is not None else None)
+        return chunk
+
+
+def _render_sheet(formatter: "StreamingXLSXFormatter", sheet_name: str, dataframe: pd.DataFrame, path: str) -> str:
+    """
+    Worker: write one sheet as a workbook of its own.
+    """
+    workbook, header_format = formatter._new_workbook(path)
+    formatter._write_sheet(workbook.add_worksheet(sheet_name), dataframe, header_format=header_format)
+    workbook.close()
+    return path
+
+
+_sheet_pools: typing.Dict[int, ProcessPoolExecutor] = {}
+_sheet_pools_lock = threading.Lock()
+
+
+def _sheet_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    The process pool sheets are rendered on, shared by every report.  Workers are spawned rather than forked:
+    reports are formatted on request threads (and gevent workers), which are not safe to fork from.
+    """
+    with _sheet_pools_lock:
+        pool = _sheet_pools.get(workers)
+        if pool is None:
+            pool = _sheet_pools[workers] = ProcessPoolExecutor(max_workers=workers,
+                                                               mp_context=multiprocessing.get_context("spawn"))
+        return pool
+
+
+def _discard_sheet_pool(workers: int, pool: ProcessPoolExecutor):
+    with _sheet_pools_lock:
+        if _sheet_pools.get(workers) is pool:
+            del _sheet_pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ParallelXLSXFormatter(StreamingXLSXFormatter):
+    """
+    Renders the sheets of large reports on a shared pool of worker processes, then assembles the workbook: an
+    empty skeleton workbook with the same sheets provides the shared parts, and each worksheet part is copied in
+    from the worker's workbook.  This works because constant_memory writes strings inline (no shared strings
+    table) and every workbook gets the same styles.  Reports under `min_rows` rows are written serially, since
+    shipping their sheets to the workers costs more than it saves; if the workers fail, the sheets are written
+    serially as well.
+    """
+    WORKSHEET_PART = re.compile(r"xl/worksheets/sheet(\d+)\.xml")
+
+    def __init__(self, chunk_rows: int = 10000, max_workers: typing.Optional[int] = Config.XLSX_SHEET_WORKERS,
+                 min_rows: int = Config.XLSX_PARALLEL_MIN_ROWS):
+        super(ParallelXLSXFormatter, self).__init__(chunk_rows=chunk_rows)
+        self.max_workers = max_workers
+        self.min_rows = min_rows
+
+    @classmethod
+    def log(cls):
+        logging_handler = logging.getLogger(cls.__name__)
+        return logging_handler
+
+    def _format(self, output, sheets: typing.Dict[str, pd.DataFrame]):
+        rows = sum(len(dataframe) for dataframe in sheets.values())
+        if len(sheets) < 2 or self.max_workers == 1 or rows < self.min_rows:
+            return super(ParallelXLSXFormatter, self)._format(output=output, sheets=sheets)
+
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                parts = self._render_parts(sheets, directory=directory)
+            except Exception as e:
+                self.log().warning(f"Parallel sheet rendering failed, writing sheets serially: {e}")
+                return super(ParallelXLSXFormatter, self)._format(output=output, sheets=sheets)
+            skeleton = os.path.join(directory, "skeleton.xlsx")
+            workbook, _ = self._new_workbook(skeleton)
+            for sheet_name in sheets:
+                workbook.add_worksheet(sheet_name)
+            workbook.close()
+            self._assemble(output, skeleton=skeleton, parts=parts)
+        return output
+
+    def _render_parts(self, sheets: typing.Dict[str, pd.DataFrame], directory: str) -> typing.List[str]:
+        workers = self.max_workers or os.cpu_count() or 1
+        pool = _sheet_pool(workers)
+        # Largest sheets first so the longest render starts immediately
+        order = sorted(range(len(sheets)), key=lambda index: -list(sheets.values())[index].size)
+        items = list(sheets.items())
+        try:
+            futures = {index: pool.submit(_render_sheet, self, items[index][0], items[index][1],
+                                          os.path.join(directory, f"part{index}.xlsx"))
+                       for index in order}
+            return [futures[index].result() for index in range(len(items))]
+        except BrokenProcessPool:
+            # A worker died; the next report gets a fresh pool
+            _discard_sheet_pool(workers, pool)
+            raise
+
+    def _assemble(self, output, skeleton: str, parts: typing.List[str]):
+        with zipfile.ZipFile(skeleton) as template, \
+                zipfile.ZipFile(output, mode="w", compression=zipfile.ZIP_DEFLATED) as workbook:
+            for info in template.infolist():
+                target = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                target.compress_type = zipfile.ZIP_DEFLATED
+                match = self.WORKSHEET_PART.fullmatch(info.filename)
+                if match is None:
+                    workbook.writestr(target, template.read(info))
+                    continue
+                index = int(match.group(1)) - 1
+                with zipfile.ZipFile(parts[index]) as part:
+                    source_info = part.getinfo("xl/worksheets/sheet1.xml")
+                    with part.open(source_info) as source, \
+                            workbook.open(target, mode="w",
+                                          force_zip64=source_info.file_size >= zipfile.ZIP64_LIMIT) as destination:
+                        self._copy_worksheet(source, destination, selected=index == 0)
+
+    @staticmethod
+    def _copy_worksheet(source, destination, selected: bool):
+        # Each part was the first (selected) sheet of its own workbook; only the first sheet stays selected
+        head = source.read(1 << 16)
+        if not selected:
+            head = head.replace(b' tabSelected="1"', b"", 1)
+        destination.write(head)
+        shutil.copyfileobj(source, destination, 1 << 20)
+
+
 class OpenpyxlFormatter(Formatter):
     # TODO:: NOT USED
 
@@ -1,19 +1,121 @@
+import queue
+import threading
 import typing as t
 from io import BytesIO
 
-import pandas as pd
+if t.TYPE_CHECKING:
+    import pandas as pd
+
+
+class StreamClosed(Exception):
+    pass
+
+
+class GeneratorSink:
+    """
+    Write-only, non-seekable file object that hands what is written to a consuming generator in chunks of
+    `chunk_size` bytes.  At most `max_chunks` chunks are buffered, so a slow consumer throttles the writer.
+    """
+    _END = object()
+
+    def __init__(self, chunk_size: int = 1 << 20, max_chunks: int = 4):
+        self.chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._chunks: queue.Queue = queue.Queue(maxsize=max_chunks)
+        self._cancelled = threading.Event()
+        self._closed_raised = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self.chunk_size:
+            self._put(bytes(self._buffer[:self.chunk_size]))
+            del self._buffer[:self.chunk_size]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def finish(self, error: t.Optional[BaseException] = None):
+        if error is None and self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        self._put(error if error is not None else self._END)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _put(self, item):
+        while True:
+            if self._cancelled.is_set():
+                if self._closed_raised:
+                    return  # writes made while the writer unwinds (e.g. zip finalisers) are dropped
+                self._closed_raised = True
+                raise StreamClosed("The consumer stopped reading the stream")
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self) -> t.Iterator[bytes]:
+        try:
+            while True:
+                item = self._chunks.get()
+                if item is self._END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Unblocks the writer if the consumer goes away early (e.g. the client disconnects)
+            self.cancel()
 
 
 class Formatter:
+    mimetype = "application/octet-stream"
+    extension = "bin"
 
-    def format(self, sheets: t.Dict[str, pd.DataFrame]):
+    def format(self, sheets: t.Dict[str, "pd.DataFrame"]):
         raise NotImplementedError
 
-    def format_bytesIO(self, sheets: t.Dict[str, pd.DataFrame]) -> BytesIO:
+    def format_bytesIO(self, sheets: t.Dict[str, "pd.DataFrame"]) -> BytesIO:
         output = BytesIO()
         formatted_output = self._format(output=output, sheets=sheets)
         formatted_bytes = formatted_output.getvalue()
         return formatted_bytes
 
-    def _format(self, output, sheets: t.Dict[str, pd.DataFrame]):
+    def format_stream(self, sheets: t.Dict[str, "pd.DataFrame"], chunk_size: int = 1 << 20) -> t.Iterator[bytes]:
+        formatted_bytes = self.format_bytesIO(sheets=sheets)
+        for start in range(0, len(formatted_bytes), chunk_size):
+            yield formatted_bytes[start:start + chunk_size]
+
+    def format_generator(self, sheets: t.Dict[str, "pd.DataFrame"], chunk_size: int = 1 << 20) -> t.Iterator[bytes]:
+        """
+        Run `_format` on a background thread writing into a GeneratorSink, yielding bytes as they are produced.
+        Only formatters that can write to a non-seekable stream support this.
+        """
+        sink = GeneratorSink(chunk_size=chunk_size)
+
+        def produce():
+            try:
+                self._format(output=sink, sheets=sheets)
+            except StreamClosed:
+                return
+            except BaseException as e:
+                sink.finish(error=e)
+                return
+            sink.finish()
+
+        writer = threading.Thread(target=produce, name=f"{type(self).__name__}-writer", daemon=True)
+        writer.start()
+        try:
+            yield from sink
+        finally:
+            sink.cancel()
+            writer.join()
+
+    def _format(self, output, sheets: t.Dict[str, "pd.DataFrame"]):
         return output
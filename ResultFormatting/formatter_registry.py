@@ -0,0 +1,47 @@
+import typing as t
+
+from config import Config
+from lazy_imports import LazyRegistry
+
+from .formatter import Formatter
+
+DEFAULT_FORMAT = "xlsx"
+
+# Sheets are only rendered on worker processes when XLSX_SHEET_WORKERS opts in, and then only for large reports
+XLSX_FORMATTER = "ParallelXLSXFormatter" if (Config.XLSX_SHEET_WORKERS or 0) > 1 else "StreamingXLSXFormatter"
+
+# Formatter modules (xlsxwriter, openpyxl, pyarrow) are imported when a format is first looked up
+FORMATTERS: t.Mapping[str, t.Type[Formatter]] = LazyRegistry({
+    "xlsx": f"ResultFormatting.excel_formatter:{XLSX_FORMATTER}",
+    "parquet": "ResultFormatting.columnar_formatter:ParquetBundleFormatter",
+    "feather": "ResultFormatting.columnar_formatter:FeatherBundleFormatter",
+    "csv": "ResultFormatting.columnar_formatter:CSVBundleFormatter",
+})
+
+
+class UnknownFormatError(ValueError):
+    pass
+
+
+def available_formats() -> t.List[str]:
+    return [name for name, formatter in FORMATTERS.items() if getattr(formatter, "available", lambda: True)()]
+
+
+def format_mimetypes() -> t.Dict[str, str]:
+    """
+    Accept-header mimetype of every available format, the default format first.
+    """
+    mimetypes = {}
+    for name in available_formats():
+        formatter = FORMATTERS[name]
+        for mimetype in getattr(formatter, "accept_mimetypes", None) or (formatter.mimetype,):
+            mimetypes.setdefault(mimetype, name)
+    return mimetypes
+
+
+def formatter_for(format_name: t.Optional[str] = None) -> Formatter:
+    format_name = (format_name or DEFAULT_FORMAT).lower()
+    if format_name not in available_formats():
+        raise UnknownFormatError(f"Unknown or unavailable format '{format_name}', "
+                                 f"expected one of {available_formats()}")
+    return FORMATTERS[format_name]()
@@ -4,11 +4,25 @@ from config import Config
 #from .extensions import mongo, bootstrap
 #from .extensions import mongo
 
+
+def preload_modules():
+    """
+    Import every pipeline, processor and formatter up front.  Processes that fork workers after creating the app
+    (e.g. gunicorn with preload_app) can call this so the workers share the imported modules.
+    """
+    from Processing.processor_registry import PROCESSORS
+    from Processing.TestDataPipelines import PIPELINES
+    from ResultFormatting.formatter_registry import FORMATTERS
+
+    for registry in (PIPELINES, PROCESSORS, FORMATTERS):
+        registry.load_all()
+
+
 def create_app(config_class=Config):
     app = Flask(__name__)
 
     app.config.from_object(config_class)
-    print(app.config)
+    app.logger.debug(f"Creating app with {config_class.__name__} ({app.config.get('ENVIRONMENT')})")
     #bootstrap.init_app(app)
     #mongo.init_app(app)
 
@@ -16,6 +30,12 @@ def create_app(config_class=Config):
     from .api import bp as api_bp
     app.register_blueprint(api_bp, url_prefix="/api")
 
-    print(config_class)
+    # pandas options are process-global, so copy-on-write is set for the whole process rather than per request
+    from Processing.pandas_options import configure_copy_on_write
+    configure_copy_on_write(config_class.PIPELINE_COPY_ON_WRITE)
+
+    # Pipelines and formatters are otherwise imported by the first request that needs them
+    if app.config.get("PRELOAD_MODULES"):
+        preload_modules()
 
-    return app
\ No newline at end of file
+    return app
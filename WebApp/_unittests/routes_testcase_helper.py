@@ -0,0 +1,63 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from celery_worker import celeryapp
+from config import Config
+from Processing.RepoProcessors.stub_repository import StubRepository, StubRepositoryServer
+from WebApp import create_app
+
+
+def repository_dataframe() -> pd.DataFrame:
+    rows = []
+    for runid in (6799, 6800):
+        for testpoint in ("V3P3", "V5P0"):
+            for capture in range(3):
+                rows.append({"runid": runid, "project": "Clara Peak", "test_category": "Off to Aux and Main",
+                             "status.status": "Complete", "waveforms.testpoint": testpoint,
+                             "waveforms.capture": capture, "waveforms.max": 3.3 + capture * 0.01,
+                             "waveforms.min": -0.01 * capture,
+                             "waveforms.location": f"/captures/{runid}/{testpoint}/{capture}.bin"})
+    return pd.DataFrame(rows)
+
+
+SEQUENCING_REQUEST = {"product": "Clara Peak", "runid_status": ["Complete"], "runid_list": [6799]}
+OVERVIEW_REQUEST = {"product": "Clara Peak", "runid_status": ["Complete"],
+                    "test_category_list": ["Off to Aux and Main"], "runid_list": [6799]}
+
+
+class PipelineRoutesTestCaseHelper(unittest.TestCase):
+    """
+    Serves `repository_dataframe` from a stub repository and creates an app that queries it, with Celery jobs run
+    eagerly against an in-memory result backend.
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        dataframe = repository_dataframe()
+        cls.repository = StubRepository({"sequencing_processor": dataframe, "waveform_processor": dataframe})
+        cls.server = StubRepositoryServer(cls.repository).start()
+        celeryapp.conf.update(broker_url="memory://", result_backend="cache+memory://",
+                              task_always_eager=True, task_store_eager_result=True)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.stop()
+
+    def setUp(self) -> None:
+        self.cache_directory = tempfile.TemporaryDirectory()
+        self.patches = [mock.patch.object(Config, "REPOSITORY_URL", self.server.host_url),
+                        mock.patch.object(Config, "RESULT_CACHE_DIR", self.cache_directory.name)]
+        for patch in self.patches:
+            patch.start()
+        self.app = create_app(config_class=Config)
+        self.app.config.update(TESTING=True)
+        self.client = self.app.test_client()
+        self.repository.requests.clear()
+
+    def tearDown(self) -> None:
+        for patch in self.patches:
+            patch.stop()
+        self.cache_directory.cleanup()
@@ -0,0 +1,60 @@
+import unittest
+from unittest import mock
+
+from celery_worker import celeryapp
+from config import Config
+from Processing.TestDataPipelines import SequencingDataProcessingPipeline
+from WebApp.tasks import JobResultStore
+from routes_testcase_helper import SEQUENCING_REQUEST, PipelineRoutesTestCaseHelper
+
+
+class PipelineJobsTestCase(PipelineRoutesTestCaseHelper):
+
+    def test_async_job_round_trip(self):
+        submitted = self.client.post("/api/sequencing_pipeline/async", json=SEQUENCING_REQUEST)
+        self.assertEqual(submitted.status_code, 202)
+        job = submitted.get_json()
+
+        status = self.client.get(job["status_url"]).get_json()
+        self.assertEqual(status["state"], "SUCCESS")
+        self.assertListEqual(status["sheets"], ["Title", "Repository Data", "Sequencing", "Power-on Time"])
+
+        result = self.client.get(job["result_url"])
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.data, self.client.post("/api/sequencing_pipeline", json=SEQUENCING_REQUEST).data)
+        # The workbook is kept in the Celery result backend, which the web and worker processes share
+        self.assertEqual(celeryapp.backend.get(JobResultStore.KEY_PREFIX + job["job_id"]), result.data)
+
+    def test_job_results_need_shared_storage(self):
+        app = mock.Mock(backend=object())
+        with mock.patch.object(Config, "RESULT_CACHE_DIR", ""):
+            with self.assertRaises(RuntimeError):
+                JobResultStore.from_config(app=app)
+        self.assertIsNotNone(JobResultStore.from_config(app=app).cache)
+
+    def test_jobs_are_not_started_without_shared_storage(self):
+        store = mock.patch("WebApp.tasks.job_result_store",
+                           lambda: JobResultStore.from_config(app=mock.Mock(backend=object())))
+        with store, mock.patch.object(Config, "RESULT_CACHE_DIR", ""), \
+                mock.patch("WebApp.tasks.run_pipeline.apply_async") as apply_async:
+            submitted = self.client.post("/api/sequencing_pipeline/async", json=SEQUENCING_REQUEST)
+        self.assertEqual(submitted.status_code, 503)
+        self.assertIn("RESULT_CACHE_DIR", submitted.get_json()["error"])
+        apply_async.assert_not_called()
+
+    def test_unknown_job_is_not_ready(self):
+        response = self.client.get("/api/jobs/does-not-exist/result")
+        self.assertEqual(response.status_code, 409)
+
+    def test_pipeline_reports_progress(self):
+        progress = []
+        for parallel in (False, True):
+            pipeline = SequencingDataProcessingPipeline(parallel=parallel)
+            pipeline.progress_callback = lambda step, completed, total: progress.append((completed, total))
+            pipeline.process_data(json_request={"product": "Clara Peak", "runid_list": [6799]})
+            self.assertListEqual(progress, [(i, 5) for i in range(1, 6)])
+            progress.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
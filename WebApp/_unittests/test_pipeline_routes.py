@@ -0,0 +1,148 @@
+import json
+import unittest
+import zipfile
+from io import BytesIO
+from unittest import mock
+
+import pandas as pd
+
+from Processing import DataProcessingPipeline
+from ResultFormatting import XLSXFormatter
+from routes_testcase_helper import OVERVIEW_REQUEST, SEQUENCING_REQUEST, PipelineRoutesTestCaseHelper
+
+
+class PipelineRoutesTestCase(PipelineRoutesTestCaseHelper):
+
+    def _sheets(self, response) -> dict:
+        return pd.read_excel(BytesIO(response.data), sheet_name=None)
+
+    def test_overview_pipeline(self):
+        response = self.client.post("/api/overview_pipeline", json=OVERVIEW_REQUEST)
+        self.assertEqual(response.status_code, 200)
+        sheets = self._sheets(response)
+        self.assertListEqual(list(sheets.keys()), ["Combination Waveforms", "Title", "Repository Data"])
+
+    def test_repeat_request_is_served_from_cache(self):
+        # Streamed responses are produced (and cached) as they are read
+        first = self.client.post("/api/sequencing_pipeline", json=SEQUENCING_REQUEST, buffered=True)
+        second = self.client.post("/api/sequencing_pipeline", json=SEQUENCING_REQUEST, buffered=True)
+        self.assertEqual(first.headers["X-Result-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Result-Cache"], "HIT")
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(len(self.repository.requests), 1)
+
+    def test_streamed_response_matches_buffered(self):
+        streamed = self.client.post("/api/overview_pipeline?stream=1", json=OVERVIEW_REQUEST)
+        self.assertTrue(streamed.is_streamed)
+        streamed_data = streamed.data
+        self.assertEqual(streamed.mimetype, XLSXFormatter.mimetype)
+        self.assertEqual(streamed.headers["X-Result-Cache"], "MISS")
+
+        buffered = self.client.post("/api/overview_pipeline?stream=0", json=OVERVIEW_REQUEST)
+        self.assertEqual(buffered.headers["X-Result-Cache"], "HIT")
+        self.assertEqual(streamed_data, buffered.data)
+        for sheet_name, dataframe in self._sheets(streamed).items():
+            pd.testing.assert_frame_equal(dataframe, self._sheets(buffered)[sheet_name])
+
+    def test_conditional_request(self):
+        first = self.client.post("/api/sequencing_pipeline", json=SEQUENCING_REQUEST, buffered=True)
+        etag, weak = first.get_etag()
+        self.assertIsNotNone(etag)
+        # Regenerated workbooks are equivalent but not byte-identical
+        self.assertTrue(weak)
+
+        unchanged = self.client.post("/api/sequencing_pipeline", json=SEQUENCING_REQUEST,
+                                     headers={"If-None-Match": f'"{etag}"'})
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(unchanged.data, b"")
+        self.assertEqual(len(self.repository.requests), 1)
+
+    def test_failed_pipeline_is_an_error(self):
+        with mock.patch.object(DataProcessingPipeline, "process_data", return_value=None):
+            for stream in ("1", "0"):
+                response = self.client.post(f"/api/sequencing_pipeline?stream={stream}", json=SEQUENCING_REQUEST)
+                self.assertEqual(response.status_code, 502, stream)
+                self.assertIn("error", response.get_json())
+                self.assertIsNone(response.get_etag()[0])
+
+    def test_output_format_selection(self):
+        by_parameter = self.client.post("/api/overview_pipeline?format=csv", json=OVERVIEW_REQUEST, buffered=True)
+        self.assertEqual(by_parameter.mimetype, "application/zip")
+        self.assertIn("test.csv.zip", by_parameter.headers["Content-Disposition"])
+        with zipfile.ZipFile(BytesIO(by_parameter.data)) as bundle:
+            self.assertListEqual(bundle.namelist(), ["Combination Waveforms.csv.gz", "Title.csv.gz",
+                                                     "Repository Data.csv.gz"])
+
+        by_accept = self.client.post("/api/overview_pipeline", json=OVERVIEW_REQUEST, headers={"Accept": "text/csv"},
+                                     buffered=True)
+        self.assertEqual(by_accept.data, by_parameter.data)
+
+        unknown = self.client.post("/api/overview_pipeline?format=pdf", json=OVERVIEW_REQUEST)
+        self.assertEqual(unknown.status_code, 406)
+
+    def test_invalid_request_is_rejected(self):
+        for payload in (None, {"runid_list": [6799]}, dict(SEQUENCING_REQUEST, runid_list="6799"),
+                        dict(SEQUENCING_REQUEST, pba="K12345")):
+            response = self.client.post("/api/sequencing_pipeline", json=payload)
+            self.assertEqual(response.status_code, 400, payload)
+            self.assertIn("error", response.get_json())
+        self.assertListEqual(self.repository.requests, [])
+
+    def test_batch_queries_the_repository_once(self):
+        requests = [dict(SEQUENCING_REQUEST, runid_list=[6799]), dict(SEQUENCING_REQUEST, runid_list=[6800]),
+                    dict(SEQUENCING_REQUEST, runid_list=[6799, 6800]), dict(SEQUENCING_REQUEST, runid_list=[6801])]
+        response = self.client.post("/api/sequencing_pipeline/batch", json={"requests": requests})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/zip")
+        self.assertEqual(len(self.repository.requests), 1)
+        self.assertListEqual(self.repository.requests[0][1]["runid_list"], [6799, 6800, 6801])
+
+        with zipfile.ZipFile(BytesIO(response.data)) as bundle:
+            manifest = json.loads(bundle.read("manifest.json"))
+            self.assertListEqual([entry["request"] for entry in manifest], requests)
+            # Runid 6801 has no rows in the merged response, so it gets no report
+            self.assertListEqual([entry.get("file") for entry in manifest],
+                                 ["report_001.xlsx", "report_002.xlsx", "report_003.xlsx", None])
+            self.assertIn("error", manifest[3])
+            for entry in manifest[:3]:
+                batched = pd.read_excel(BytesIO(bundle.read(entry["file"])), sheet_name=None)
+                single = self._sheets(self.client.post("/api/sequencing_pipeline?stream=0", json=entry["request"]))
+                self.assertEqual(single.keys(), batched.keys())
+                for sheet_name in ("Repository Data", "Sequencing"):
+                    pd.testing.assert_frame_equal(batched[sheet_name], single[sheet_name])
+            self.assertListEqual(sorted(pd.read_excel(BytesIO(bundle.read("report_003.xlsx")),
+                                                      sheet_name="Repository Data")["runid"].unique()), [6799, 6800])
+
+        # Reports served by the single routes are now cached, so a repeated batch does not query at all
+        self.repository.requests.clear()
+        repeated = self.client.post("/api/sequencing_pipeline/batch", json={"requests": requests[:3]})
+        with zipfile.ZipFile(BytesIO(repeated.data)) as bundle:
+            self.assertListEqual([entry["cache"] for entry in json.loads(bundle.read("manifest.json"))], ["HIT"] * 3)
+        self.assertListEqual(self.repository.requests, [])
+
+    def test_runids_without_data_are_not_cached(self):
+        request = dict(SEQUENCING_REQUEST, runid_list=[6801])
+        for _ in range(2):
+            response = self.client.post("/api/sequencing_pipeline?stream=0", json=request)
+            self.assertEqual(response.headers["X-Result-Cache"], "BYPASS")
+            self.assertIsNone(response.get_etag()[0])
+        self.assertEqual(len(self.repository.requests), 2)
+
+        batch = self.client.post("/api/sequencing_pipeline/batch", json={"requests": [request, request]})
+        with zipfile.ZipFile(BytesIO(batch.data)) as bundle:
+            self.assertListEqual([entry.get("file") for entry in json.loads(bundle.read("manifest.json"))],
+                                 [None] * 2)
+        batch = self.client.post("/api/sequencing_pipeline/batch", json={"requests": [request, request]})
+        self.assertEqual(len(self.repository.requests), 4)
+
+    def test_invalid_batch_is_rejected(self):
+        for payload in ({"requests": []}, [SEQUENCING_REQUEST], {"requests": [SEQUENCING_REQUEST, {"product": 1}]}):
+            response = self.client.post("/api/overview_pipeline/batch", json=payload)
+            self.assertEqual(response.status_code, 400, payload)
+        self.app.config["PIPELINE_BATCH_MAX_REQUESTS"] = 2
+        response = self.client.post("/api/overview_pipeline/batch", json={"requests": [OVERVIEW_REQUEST] * 3})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,45 +1,305 @@
-from flask import jsonify, request, make_response
+import json
+import typing as t
+import zipfile
+
+from flask import Response, jsonify, request, make_response, current_app, stream_with_context, url_for
 from io import BytesIO
 
-from Processing.TestDataPipelines import SequencingDataProcessingPipeline, OverviewDataProcessingPipeline
-from ResultFormatting.excel_formatter import OpenpyxlFormatter, XLSXFormatter
+# Only light modules are imported here; pipelines and formatters are loaded by the first request that uses them
+from Processing.pipeline_request import InvalidPipelineRequest, PipelineRequestObject
+from Processing.result_cache import PipelineResultCache, is_cacheable, request_hash
+from Processing.TestDataPipelines import PIPELINES
+from ResultFormatting.formatter import Formatter
+from ResultFormatting.formatter_registry import DEFAULT_FORMAT, UnknownFormatError, format_mimetypes, formatter_for
 
 from . import bp
 
+if t.TYPE_CHECKING:
+    from Processing import DataProcessingPipeline
+
+
+def result_cache() -> PipelineResultCache:
+    cache = current_app.extensions.get("result_cache")
+    if cache is None:
+        cache = PipelineResultCache(
+            directory=current_app.config.get("RESULT_CACHE_DIR") or PipelineResultCache.default_directory(),
+            max_bytes=current_app.config.get("RESULT_CACHE_MAX_BYTES", 1 << 30))
+        current_app.extensions["result_cache"] = cache
+    return cache
 
-@bp.route('/sequencing_pipeline', methods=["POST", "GET"])
-def sequencing():
-    pipeline = SequencingDataProcessingPipeline()
-    json_request = {"product": "Clara Peak",
-                    "runid_status": ["Complete"],
-                    # "test_category_list": ["Off to Aux and Main"],
-                    "runid_list": [6799]
-                    }
+
+def _request_formatter() -> Formatter:
+    """
+    Output format from the `format` query parameter, else the best match for the Accept header, else XLSX.
+    """
+    format_name = request.args.get("format")
+    if format_name is None:
+        mimetypes = format_mimetypes()
+        best_match = request.accept_mimetypes.best_match(list(mimetypes))
+        format_name = mimetypes.get(best_match, DEFAULT_FORMAT)
+    return formatter_for(format_name)
+
+
+def _pipeline_workbook(pipeline: "DataProcessingPipeline", json_request: dict, formatter: Formatter = None):
+    formatter = formatter or formatter_for()
+    use_cache = current_app.config.get("RESULT_CACHE_ENABLED") and is_cacheable(json_request)
+    key = request_hash(json_request, pipeline=pipeline, formatter=formatter)
+    if use_cache:
+        excel_bytes = result_cache().get_bytes(key)
+        if excel_bytes is not None:
+            return excel_bytes, "HIT", True
 
     sheets = pipeline.process_data(json_request=json_request)
-    formatter = XLSXFormatter()
+    if sheets is None:
+        return None, "BYPASS", False
     excel_bytes: BytesIO = formatter.format_bytesIO(sheets=sheets)
+    # Reports missing runids or sheets of failed processors may be complete on the next run
+    complete = is_cacheable(json_request, sheets=sheets)
+    if use_cache and complete:
+        result_cache().put_bytes(key, excel_bytes)
+    return excel_bytes, "MISS" if use_cache and complete else "BYPASS", complete
 
-    response = make_response(excel_bytes)
-    response.headers.set('Content-Disposition', 'attachment',
-                         filename=f'test.xlsx')
-    return response
 
+def _read_chunks(handle, chunk_size: int):
+    with handle:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
 
-@bp.route('/overview_pipeline', methods=["POST", "GET"])
-def overview():
-    pipeline = OverviewDataProcessingPipeline()
-    json_request = {"product": "Clara Peak",
-                    "runid_status": ["Complete"],
-                    "test_category_list": ["Off to Aux and Main"],
-                    "runid_list": [6799]
-                    }
+
+def _streamed_pipeline_workbook(pipeline: "DataProcessingPipeline", json_request: dict, formatter: Formatter = None):
+    """
+    Like `_pipeline_workbook`, but returns a generator that writes the workbook while the response is being
+    sent.  The pipeline itself runs before the response starts, so a failed run can still get an error status.
+    """
+    formatter = formatter or formatter_for()
+    chunk_size = current_app.config.get("RESULT_STREAM_CHUNK_BYTES", 1 << 16)
+    use_cache = current_app.config.get("RESULT_CACHE_ENABLED") and is_cacheable(json_request)
+    key = request_hash(json_request, pipeline=pipeline, formatter=formatter)
+    if use_cache:
+        handle = result_cache().open_bytes(key)
+        if handle is not None:
+            return _read_chunks(handle, chunk_size=chunk_size), "HIT", True
 
     sheets = pipeline.process_data(json_request=json_request)
-    formatter = XLSXFormatter()
-    excel_bytes: BytesIO = formatter.format_bytesIO(sheets=sheets)
+    if sheets is None:
+        return None, "BYPASS", False
+    chunks = formatter.format_generator(sheets=sheets, chunk_size=chunk_size)
+    complete = is_cacheable(json_request, sheets=sheets)
+    if use_cache and complete:
+        return result_cache().tee_bytes(key, chunks), "MISS", complete
+    return chunks, "BYPASS", complete
+
+
+def _workbook_etag(pipeline: "DataProcessingPipeline", json_request: dict, formatter: Formatter):
+    # Only requests over completed runids are immutable, so only they get a validator.  It is weak: the report's
+    # content is fixed, but regenerated workbooks are not byte-identical (e.g. their creation time).
+    if not is_cacheable(json_request):
+        return None
+    return request_hash(json_request, pipeline=pipeline, formatter=formatter)
+
 
-    response = make_response(excel_bytes)
+def _workbook_response(excel_bytes, cache_status: str, etag: str = None, formatter: Formatter = None):
+    formatter = formatter or formatter_for()
+    if not isinstance(excel_bytes, (bytes, bytearray)):
+        excel_bytes = stream_with_context(excel_bytes)
+    response = Response(excel_bytes, mimetype=formatter.mimetype)
     response.headers.set('Content-Disposition', 'attachment',
-                         filename=f'test.xlsx')
+                         filename=f'test.{formatter.extension}')
+    response.headers.set('Vary', 'Accept')
+    response.headers.set('X-Result-Cache', cache_status)
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _pipeline_response(pipeline: "DataProcessingPipeline", json_request: dict):
+    try:
+        formatter = _request_formatter()
+    except UnknownFormatError as e:
+        return jsonify({"error": str(e)}), 406
+
+    etag = _workbook_etag(pipeline=pipeline, json_request=json_request, formatter=formatter)
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    if request.args.get("stream", str(current_app.config.get("RESULT_STREAMING", True))).lower() in ("1", "true"):
+        excel_bytes, cache_status, complete = _streamed_pipeline_workbook(pipeline=pipeline,
+                                                                          json_request=json_request,
+                                                                          formatter=formatter)
+    else:
+        excel_bytes, cache_status, complete = _pipeline_workbook(pipeline=pipeline, json_request=json_request,
+                                                                 formatter=formatter)
+    if excel_bytes is None:
+        return jsonify({"error": "The repository query failed, no report was produced"}), 502
+    if not complete:
+        # An incomplete report must not be revalidated as if it were the final one
+        etag = None
+    return _workbook_response(excel_bytes, cache_status=cache_status, etag=etag, formatter=formatter)
+
+
+def _pipeline_request() -> dict:
+    """
+    The validated report request in the JSON body.
+    """
+    return PipelineRequestObject.from_dict(request.get_json(silent=True)).to_dict()
+
+
+def _batch_requests() -> t.List[dict]:
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get("requests"), list) or not payload["requests"]:
+        raise InvalidPipelineRequest("Request body must be a JSON object with a non-empty 'requests' list")
+    max_requests = current_app.config.get("PIPELINE_BATCH_MAX_REQUESTS", 100)
+    if len(payload["requests"]) > max_requests:
+        raise InvalidPipelineRequest(f"At most {max_requests} requests can be batched, got {len(payload['requests'])}")
+    json_requests = []
+    for index, adict in enumerate(payload["requests"]):
+        try:
+            json_requests.append(PipelineRequestObject.from_dict(adict).to_dict())
+        except InvalidPipelineRequest as e:
+            raise InvalidPipelineRequest(f"requests[{index}]: {e}") from None
+    return json_requests
+
+
+def _batch_response(pipeline: "DataProcessingPipeline", json_requests: t.List[dict], formatter: Formatter):
+    """
+    A zip with one report per request, named by position, and a manifest.json describing each entry.  Cached
+    reports are reused; the others are produced by one batched pipeline run.
+    """
+    use_cache = current_app.config.get("RESULT_CACHE_ENABLED")
+    reports: t.List[t.Optional[bytes]] = [None] * len(json_requests)
+    cache_status = ["BYPASS"] * len(json_requests)
+    keys = [request_hash(json_request, pipeline=pipeline, formatter=formatter) for json_request in json_requests]
+    for index, json_request in enumerate(json_requests):
+        if use_cache and is_cacheable(json_request):
+            reports[index] = result_cache().get_bytes(keys[index])
+            cache_status[index] = "HIT" if reports[index] is not None else "MISS"
+
+    pending = [index for index, report in enumerate(reports) if report is None]
+    if pending:
+        batch = pipeline.process_batch(json_requests=[json_requests[index] for index in pending])
+        for index, sheets in zip(pending, batch):
+            if sheets is None:
+                continue
+            reports[index] = formatter.format_bytesIO(sheets=sheets)
+            if cache_status[index] == "MISS" and is_cacheable(json_requests[index], sheets=sheets):
+                result_cache().put_bytes(keys[index], reports[index])
+
+    manifest = []
+    output = BytesIO()
+    # Reports are compressed already (xlsx and the sheet bundles are zips themselves)
+    with zipfile.ZipFile(output, mode="w", compression=zipfile.ZIP_STORED) as bundle:
+        for index, (json_request, report) in enumerate(zip(json_requests, reports), start=1):
+            entry = {"request": json_request}
+            if report is None:
+                entry["error"] = "No data available for this request"
+            else:
+                entry["file"] = f"report_{index:03d}.{formatter.extension}"
+                entry["cache"] = cache_status[index - 1]
+                bundle.writestr(entry["file"], report)
+            manifest.append(entry)
+        bundle.writestr("manifest.json", json.dumps(manifest, indent=2))
+
+    response = Response(output.getvalue(), mimetype="application/zip")
+    response.headers.set('Content-Disposition', 'attachment', filename=f'batch.{formatter.extension}.zip')
+    response.headers.set('Vary', 'Accept')
     return response
+
+
+def _pipeline_batch(pipeline_name: str):
+    try:
+        formatter = _request_formatter()
+    except UnknownFormatError as e:
+        return jsonify({"error": str(e)}), 406
+    return _batch_response(pipeline=PIPELINES[pipeline_name](), json_requests=_batch_requests(), formatter=formatter)
+
+
+def _submit_pipeline_job(pipeline_name: str, json_request: dict):
+    from WebApp.tasks import job_result_store, run_pipeline
+
+    # Job results are written by the workers and served by any web process, so no job is started if they cannot be
+    # shared.  Checked here rather than in create_app, which would import Celery when the web app starts
+    try:
+        job_result_store()
+    except RuntimeError as e:
+        current_app.logger.error(str(e))
+        return jsonify({"error": str(e)}), 503
+    job = run_pipeline.apply_async(args=(pipeline_name, json_request))
+    return jsonify({"job_id": job.id,
+                    "status_url": url_for("api.job_status", job_id=job.id),
+                    "result_url": url_for("api.job_result", job_id=job.id)}), 202
+
+
+@bp.route('/sequencing_pipeline', methods=["POST"])
+def sequencing():
+    pipeline = PIPELINES["sequencing"]()
+    json_request = _pipeline_request()
+
+    return _pipeline_response(pipeline=pipeline, json_request=json_request)
+
+
+@bp.route('/overview_pipeline', methods=["POST"])
+def overview():
+    pipeline = PIPELINES["overview"]()
+    json_request = _pipeline_request()
+
+    return _pipeline_response(pipeline=pipeline, json_request=json_request)
+
+
+@bp.route('/sequencing_pipeline/batch', methods=["POST"])
+def sequencing_batch():
+    return _pipeline_batch(pipeline_name="sequencing")
+
+
+@bp.route('/overview_pipeline/batch', methods=["POST"])
+def overview_batch():
+    return _pipeline_batch(pipeline_name="overview")
+
+
+@bp.route('/sequencing_pipeline/async', methods=["POST"])
+def sequencing_async():
+    return _submit_pipeline_job(pipeline_name="sequencing", json_request=_pipeline_request())
+
+
+@bp.route('/overview_pipeline/async', methods=["POST"])
+def overview_async():
+    return _submit_pipeline_job(pipeline_name="overview", json_request=_pipeline_request())
+
+
+@bp.errorhandler(InvalidPipelineRequest)
+def invalid_pipeline_request(error):
+    return jsonify({"error": str(error)}), 400
+
+
+@bp.route('/jobs/<job_id>', methods=["GET"])
+def job_status(job_id):
+    from WebApp.tasks import run_pipeline
+
+    job = run_pipeline.AsyncResult(job_id)
+    status = {"job_id": job_id, "state": job.state}
+    if job.state == "PROGRESS":
+        status["progress"] = job.info
+    elif job.state == "SUCCESS":
+        status["sheets"] = job.result.get("sheets")
+        status["result_url"] = url_for("api.job_result", job_id=job_id)
+    elif job.state == "FAILURE":
+        status["error"] = str(job.result)
+    return jsonify(status)
+
+
+@bp.route('/jobs/<job_id>/result', methods=["GET"])
+def job_result(job_id):
+    from WebApp.tasks import job_result_store, run_pipeline
+
+    job = run_pipeline.AsyncResult(job_id)
+    if job.state != "SUCCESS":
+        return jsonify({"job_id": job_id, "state": job.state}), 409
+    # Written by whichever worker ran the job, so it is read from the shared job result store
+    workbook = job_result_store().get(job.result["result_key"])
+    if workbook is None:
+        return jsonify({"job_id": job_id, "error": "Result is no longer available"}), 410
+    return _workbook_response(workbook, cache_status="HIT")
@@ -0,0 +1,109 @@
+import asyncio
+import typing as t
+
+from celery.backends.base import BaseKeyValueStoreBackend
+
+from celery_worker import celeryapp
+from config import Config
+from Processing import PipelineResultCache, is_cacheable, request_hash
+from Processing.TestDataPipelines import PIPELINES
+from ResultFormatting import formatter_for
+
+PROGRESS = "PROGRESS"
+
+
+class JobResultStore:
+    """
+    Formatted workbooks of finished jobs, where both the worker that writes them and every web process that serves
+    them can reach them: the Celery result backend when it is a key-value store (e.g. redis), otherwise a result
+    cache directory that must be explicitly configured, e.g. on a volume shared by the web and worker containers.
+    """
+    KEY_PREFIX = "pipeline-result-"
+
+    def __init__(self, backend: t.Optional[BaseKeyValueStoreBackend] = None,
+                 cache: t.Optional[PipelineResultCache] = None):
+        self.backend = backend
+        self.cache = cache
+
+    @classmethod
+    def from_config(cls, app=celeryapp, config=Config) -> "JobResultStore":
+        if isinstance(app.backend, BaseKeyValueStoreBackend):
+            return cls(backend=app.backend)
+        if not config.RESULT_CACHE_DIR:
+            raise RuntimeError(f"The Celery result backend {type(app.backend).__name__} cannot store job results; "
+                               f"set RESULT_CACHE_DIR to a directory shared by the web and worker processes")
+        return cls(cache=PipelineResultCache.from_config(config))
+
+    def put(self, key: str, data: bytes):
+        if self.backend is not None:
+            self.backend.set(self.KEY_PREFIX + key, data)
+        else:
+            self.cache.put_bytes(key, data)
+
+    def get(self, key: str) -> t.Optional[bytes]:
+        if self.backend is not None:
+            return self.backend.get(self.KEY_PREFIX + key)
+        return self.cache.get_bytes(key)
+
+
+def job_result_store() -> JobResultStore:
+    return JobResultStore.from_config()
+
+
+def job_result_cache() -> PipelineResultCache:
+    # Content-addressed reports of completed runids, reused across jobs run by this worker
+    return PipelineResultCache.from_config(Config)
+
+
+async def process_data_async(pipeline, json_request: t.Dict):
+    """
+    Run a pipeline on an event loop of its own, so the shards of a large repository query are fetched
+    concurrently.  The loop's repository client is closed with it.
+    """
+    # The web app imports this module too, and it does not need the repository clients
+    from Processing.RepoProcessors.async_repository_client import AsyncRepositoryClient
+
+    try:
+        return await pipeline.process_data_async(json_request=json_request)
+    finally:
+        await AsyncRepositoryClient.shared().close()
+
+
+@celeryapp.task(bind=True, name="WebApp.tasks.run_pipeline")
+def run_pipeline(self, pipeline_name: str, json_request: t.Dict) -> t.Dict:
+    """
+    Run a named DataProcessingPipeline through `process_data_async` and store the formatted workbook in the job
+    result store under the job id.  Per-processor progress is published as the PROGRESS state.
+    """
+    pipeline = PIPELINES[pipeline_name]()
+    formatter = formatter_for()
+    cache = job_result_cache()
+    store = job_result_store()
+    # Completed requests share the content-addressed entry used by the synchronous routes
+    cacheable = is_cacheable(json_request)
+    cache_key = request_hash(json_request, pipeline=pipeline, formatter=formatter) if cacheable else None
+    steps = [type(pipeline.processors[0]).__name__] + \
+        [processor.dataframe_name for processor in pipeline.processors[1:]]
+
+    workbook = cache.get_bytes(cache_key) if cacheable else None
+    if workbook is not None:
+        store.put(self.request.id, workbook)
+        return {"result_key": self.request.id, "sheets": None, "cached": True}
+
+    task_id = self.request.id
+
+    def report(step: str, completed: int, total: int):
+        # Steps finish on worker threads, which do not see the task's request context
+        self.update_state(task_id=task_id, state=PROGRESS,
+                          meta={"step": step, "completed": completed, "total": total, "steps": steps})
+
+    pipeline.progress_callback = report
+    sheets = asyncio.run(process_data_async(pipeline, json_request=json_request))
+    if sheets is None:
+        raise RuntimeError(f"Pipeline '{pipeline_name}' returned no data")
+    workbook = formatter.format_bytesIO(sheets=sheets)
+    # An incomplete report is only stored for this job, not under the request's content address
+    if cacheable and is_cacheable(json_request, sheets=sheets):
+        cache.put_bytes(cache_key, workbook)
+    store.put(self.request.id, workbook)
+    return {"result_key": self.request.id, "sheets": list(sheets), "cached": False}
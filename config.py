@@ -15,4 +15,49 @@ class Config():
     SECRET_KEY = os.environ.get("SECRET_KEY") or "this_key_is_secret_1987"
     ENVIRONMENT = os.environ.get("ENVIRONMENT") or "DEVELOPMENT"
     REPOSITORY_URL = os.environ.get("REPOSITORY_URL") or "http://127.0.0.1:5001"
-
+    REPOSITORY_POOL_SIZE = int(os.environ.get("REPOSITORY_POOL_SIZE") or 10)
+    REPOSITORY_CONNECT_TIMEOUT = float(os.environ.get("REPOSITORY_CONNECT_TIMEOUT") or 5)
+    REPOSITORY_READ_TIMEOUT = float(os.environ.get("REPOSITORY_READ_TIMEOUT") or 300)
+    REPOSITORY_RETRIES = int(os.environ.get("REPOSITORY_RETRIES") or 3)
+    REPOSITORY_BACKOFF_FACTOR = float(os.environ.get("REPOSITORY_BACKOFF_FACTOR") or 0.5)
+    REPOSITORY_STREAM_CHUNK_BYTES = int(os.environ.get("REPOSITORY_STREAM_CHUNK_BYTES") or 1 << 20)
+    REPOSITORY_STREAM_CHUNK_ROWS = int(os.environ.get("REPOSITORY_STREAM_CHUNK_ROWS") or 50000)
+    # Runids per concurrent repository query for large requests, 0 sends every request as one query
+    REPOSITORY_SHARD_SIZE = int(os.environ.get("REPOSITORY_SHARD_SIZE") or 0)
+    REPOSITORY_SHARD_CONCURRENCY = int(os.environ.get("REPOSITORY_SHARD_CONCURRENCY") or 4)
+    REPOSITORY_SHARD_RETRIES = int(os.environ.get("REPOSITORY_SHARD_RETRIES") or 1)
+    REPOSITORY_NORMALIZE_DTYPES = (os.environ.get("REPOSITORY_NORMALIZE_DTYPES") or "true").lower() == "true"
+    REPOSITORY_ARROW_STRINGS = (os.environ.get("REPOSITORY_ARROW_STRINGS") or "false").lower() == "true"
+    PIPELINE_COPY_ON_WRITE = (os.environ.get("PIPELINE_COPY_ON_WRITE") or "true").lower() == "true"
+    PIPELINE_INCREMENTAL = (os.environ.get("PIPELINE_INCREMENTAL") or "false").lower() == "true"
+    # Most report requests the batch routes accept in one call
+    PIPELINE_BATCH_MAX_REQUESTS = int(os.environ.get("PIPELINE_BATCH_MAX_REQUESTS") or 100)
+    # Reduce the overview's "Combination Waveforms" statistics in Mongo instead of from the repository rows
+    OVERVIEW_SERVER_STATISTICS = (os.environ.get("OVERVIEW_SERVER_STATISTICS") or "false").lower() == "true"
+    REPOSITORY_COLUMNAR_TRANSPORT = (os.environ.get("REPOSITORY_COLUMNAR_TRANSPORT") or "true").lower() == "true"
+    MONGO_URI = os.environ.get("MONGO_URI") or "mongodb://192.168.1.226:27017/"
+    MONGO_DATABASE = os.environ.get("MONGO_DATABASE") or "ATS2"
+    MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE") or 50)
+    MONGO_BATCH_SIZE = int(os.environ.get("MONGO_BATCH_SIZE") or 1000)
+    TESTPOINT_CACHE_TTL = float(os.environ.get("TESTPOINT_CACHE_TTL") or 3600)
+    TESTPOINT_CACHE_MAX_ENTRIES = int(os.environ.get("TESTPOINT_CACHE_MAX_ENTRIES") or 4096)
+    TESTPOINT_CACHE_PATH = os.environ.get("TESTPOINT_CACHE_PATH") or ""
+    RESULT_CACHE_ENABLED = (os.environ.get("RESULT_CACHE_ENABLED") or "true").lower() == "true"
+    RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR") or ""
+    RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES") or 1 << 30)
+    INCREMENTAL_CACHE_DIR = os.environ.get("INCREMENTAL_CACHE_DIR") or ""
+    INCREMENTAL_CACHE_MAX_BYTES = int(os.environ.get("INCREMENTAL_CACHE_MAX_BYTES") or 4 << 30)
+    RESULT_STREAMING = (os.environ.get("RESULT_STREAMING") or "true").lower() == "true"
+    RESULT_STREAM_CHUNK_BYTES = int(os.environ.get("RESULT_STREAM_CHUNK_BYTES") or 1 << 16)
+    # Setting more than one worker makes xlsx reports of at least XLSX_PARALLEL_MIN_ROWS rows render in parallel
+    XLSX_SHEET_WORKERS = int(os.environ.get("XLSX_SHEET_WORKERS") or 0) or None
+    XLSX_PARALLEL_MIN_ROWS = int(os.environ.get("XLSX_PARALLEL_MIN_ROWS") or 200000)
+    CELERY_ALWAYS_EAGER = (os.environ.get("CELERY_ALWAYS_EAGER") or "false").lower() == "true"
+    PRELOAD_MODULES = (os.environ.get("PRELOAD_MODULES") or "false").lower() == "true"
+    WAVEFORM_DTYPE = os.environ.get("WAVEFORM_DTYPE") or "<f4"
+    WAVEFORM_HEADER_BYTES = int(os.environ.get("WAVEFORM_HEADER_BYTES") or 0)
+    WAVEFORM_MEMORY_BUDGET_BYTES = int(os.environ.get("WAVEFORM_MEMORY_BUDGET_BYTES") or 2 << 30)
+    WAVEFORM_LOADER_WORKERS = int(os.environ.get("WAVEFORM_LOADER_WORKERS") or 0) or None
+    WAVEFORM_SAMPLE_RATE = float(os.environ.get("WAVEFORM_SAMPLE_RATE") or 1.25e9)
+    WAVEFORM_LOWPASS_CUTOFF = float(os.environ.get("WAVEFORM_LOWPASS_CUTOFF") or 20e6)
+    WAVEFORM_LOWPASS_ORDER = int(os.environ.get("WAVEFORM_LOWPASS_ORDER") or 4)
@@ -0,0 +1,71 @@
+"""
+Deferred imports, so web and worker processes only load pandas, the Excel writers, Mongo and friends once a
+request actually needs them.
+"""
+import importlib
+import typing as t
+from collections.abc import Mapping
+
+
+def import_string(path: str) -> t.Any:
+    """
+    Import "package.module:attribute" and return the attribute.
+    """
+    module_name, _, attribute = path.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute) if attribute else module
+
+
+def lazy_exports(package: str,
+                 exports: t.Dict[str, str]) -> t.Tuple[t.Callable[[str], t.Any], t.Callable[[], t.List[str]]]:
+    """
+    `__getattr__` and `__dir__` for a package that re-exports `name` from the (relative) submodule
+    `exports[name]`, importing the submodule on first access (PEP 562).
+    """
+
+    def __getattr__(name: str) -> t.Any:
+        try:
+            module_name = exports[name]
+        except KeyError:
+            raise AttributeError(f"module '{package}' has no attribute '{name}'") from None
+        value = getattr(importlib.import_module(module_name, package), name)
+        # Later lookups find the attribute directly and no longer reach __getattr__
+        setattr(importlib.import_module(package), name, value)
+        return value
+
+    def __dir__() -> t.List[str]:
+        return sorted(set(vars(importlib.import_module(package))) | set(exports))
+
+    return __getattr__, __dir__
+
+
+class LazyRegistry(Mapping):
+    """
+    Name -> object mapping whose values are import strings, resolved (and cached) when a name is looked up.
+    Iterating the registry lists the names without importing anything.
+    """
+
+    def __init__(self, paths: t.Dict[str, str]):
+        self.paths = dict(paths)
+        self._loaded: t.Dict[str, t.Any] = {}
+
+    def __getitem__(self, name: str) -> t.Any:
+        if name not in self._loaded:
+            self._loaded[name] = import_string(self.paths[name])
+        return self._loaded[name]
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def load_all(self):
+        """
+        Import every entry, e.g. before forking workers so they share the imported modules.
+        """
+        for name in self.paths:
+            self[name]